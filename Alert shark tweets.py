@@ -1,6 +1,8 @@
 import time
 import tweepy
 import logging
+import threading
+from alert_dispatch import TwitterSink
 from alert_pricebar import test_display as btc_price_display
 from eth_pricebar import test_display as eth_price_display
 from btc_monitor import BitcoinWhaleTracker  # Fixed import path
@@ -77,16 +79,26 @@ class TwitterBot:
         
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger('TwitterBot')
+        
+        # All tweets, price updates and whale alerts alike, are posted from
+        # one queue spaced between_alerts apart, so the monitor never waits
+        self.twitter = TwitterSink(self.client, min_interval=self.wait_times['between_alerts'],
+                                   retries=1, transform=self.mark_high_risk)
+        self.whale_tracker.dispatcher.add_sink(self.twitter)
+        self.whale_thread = None
+
+    def mark_high_risk(self, message, alert):
+        """Head alerts involving high-risk entities with an urgent banner"""
+        if alert is not None and any(entity in message.lower() for entity in self.high_risk_entities):
+            return "🚨 URGENT ALERT 🚨\n" + message
+        return message
 
     def post_tweet(self, message):
-        try:
-            # Use v2 create_tweet instead of update_status
-            tweet = self.client.create_tweet(text=message)
-            self.logger.info(f"Tweet posted successfully with id: {tweet.data['id']}")
+        """Queue a tweet; the Twitter sink posts it (v2 create_tweet)"""
+        if self.twitter.submit(message):
             return True
-        except Exception as e:
-            self.logger.error(f"Failed to tweet: {e}")
-            return False
+        self.logger.error("Failed to tweet: queue full")
+        return False
 
     def check_price_update(self):
         """Run and post price status from alert_pricebar.py"""
@@ -101,23 +113,14 @@ class TwitterBot:
             return None
 
     def check_whale_alert(self):
-        """Run and post whale alerts with proper timing"""
+        """Keep the whale monitor running; its alerts are tweeted from the queue as they are found"""
         try:
-            alerts = self.whale_tracker.monitor_transactions()
-            
-            if alerts:
-                for alert in alerts:
-                    # High risk check
-                    if any(entity in alert.lower() for entity in self.high_risk_entities):
-                        alert = "🚨 URGENT ALERT 🚨\n" + alert
-                    
-                    # Post with delay between alerts
-                    if self.post_tweet(alert):
-                        self.logger.info(f"Posted whale alert: {alert[:50]}...")
-                        time.sleep(self.wait_times['between_alerts'])
-                return True
-            
-            return False
+            if self.whale_thread is None or not self.whale_thread.is_alive():
+                self.whale_thread = threading.Thread(target=self.whale_tracker.monitor_transactions,
+                                                     name='whale-monitor', daemon=True)
+                self.whale_thread.start()
+                self.logger.info("Whale monitor started")
+            return True
             
         except Exception as e:
             self.logger.error(f"Error in whale alert: {e}")
@@ -167,7 +170,6 @@ class TwitterBot:
                     self.logger.info("Step 3: Checking BTC monitor...")
                     if self.check_whale_alert():
                         self.last_updates['whale_alert'] = current_time
-                        time.sleep(self.wait_times['between_alerts'])
                 
                 # Small delay before next cycle
                 time.sleep(15)
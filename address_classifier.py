@@ -0,0 +1,142 @@
+import re
+
+
+class PrefixTrie:
+    """Character trie mapping address prefixes to the best (lowest) entity rank"""
+
+    # Key used inside a trie node to store the rank of a prefix ending there.
+    # Address characters are never empty strings, so it cannot collide.
+    RANK = ''
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, prefix, rank):
+        """Register a prefix, keeping the lowest rank when a prefix repeats"""
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        if rank < node.get(self.RANK, rank + 1):
+            node[self.RANK] = rank
+
+    def best_rank(self, address):
+        """Walk the address once and return the lowest rank of any matching prefix"""
+        node = self.root
+        best = node.get(self.RANK)
+        for char in address:
+            node = node.get(char)
+            if node is None:
+                break
+            rank = node.get(self.RANK)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+
+class AddressClassifier:
+    """Precompiled lookup structure behind BitcoinWhaleTracker.identify_address
+
+    Built once from ``known_addresses`` and ``exchange_patterns``. Exact
+    addresses resolve through a dict, and pattern entities through one trie
+    walk over their prefixes/known ranges plus one combined regex. The result
+    is the same as scanning the entities in insertion order and returning the
+    first match.
+
+    With a LabelDatabase, known_addresses only holds overrides: they are
+    checked before the database, and the database's own addresses for an
+    entity named there are ignored. Mapping an entity to None hides it.
+    """
+
+    def __init__(self, known_addresses, exchange_patterns, clusters=None, database=None):
+        self.clusters = clusters  # Optional AddressClusters for co-spent addresses
+        self.database = database
+        self.hidden_entities = set(known_addresses) if database is not None else set()
+
+        # Exact address index; the first entity listing an address wins
+        self.address_index = {}
+        for entity, info in known_addresses.items():
+            if info is None:
+                continue
+            label = {'name': entity, 'type': info['type']}
+            for address in info['addresses']:
+                self.address_index.setdefault(address, label)
+
+        # Pattern entities are ranked by their position in exchange_patterns
+        self.pattern_labels = []
+        self.prefix_trie = PrefixTrie()
+        groups = []
+        self.first_regex_rank = None
+        for rank, (exchange, patterns) in enumerate(exchange_patterns.items()):
+            self.pattern_labels.append({'name': exchange, 'type': 'exchange'})
+            for prefix in list(patterns['prefixes']) + list(patterns['known_ranges']):
+                self.prefix_trie.insert(prefix, rank)
+            if patterns['patterns']:
+                alternatives = '|'.join(f"(?:{pattern})" for pattern in patterns['patterns'])
+                groups.append(f"(?P<rank{rank}>{alternatives})")
+                if self.first_regex_rank is None:
+                    self.first_regex_rank = rank
+
+        # Alternation tries the groups left to right, so the first group that
+        # matches is the lowest-ranked regex entity, as with re.match in a loop
+        self.combined_regex = re.compile('|'.join(groups)) if groups else None
+
+    def known_label(self, address):
+        """The label of an exactly listed address, or None; the dict is shared"""
+        label = self.address_index.get(address)
+        if label is None and self.database is not None:
+            label = self.database.get(address)
+            if label is not None and label['name'] in self.hidden_entities:
+                label = None
+        return label
+
+    def classify(self, address):
+        """Return {'name', 'type'} for an address, or None if nothing matches"""
+        label = self.known_label(address)
+        if label is None:
+            label = self._cluster_label(address)
+        if label is None:
+            label = self._pattern_label(address)
+        return dict(label) if label is not None else None
+
+    def classify_many(self, addresses):
+        """Labels for many addresses at once: {address: label} for those that match
+
+        Repeated addresses are looked up once and no per-address copies are
+        made, which matters for payout transactions with hundreds of outputs.
+        The labels are shared; do not modify them.
+        """
+        labels = {}
+        index = self.address_index
+        for address in set(addresses):
+            label = index.get(address)
+            if label is None and self.database is not None:
+                label = self.known_label(address)
+            if label is None:
+                label = self._cluster_label(address)
+            if label is None:
+                label = self._pattern_label(address)
+            if label is not None:
+                labels[address] = label
+        return labels
+
+    def _cluster_label(self, address):
+        # Addresses co-spent with a known address inherit its label
+        if self.clusters is None:
+            return None
+        anchor = self.clusters.anchor(address)
+        return self.known_label(anchor) if anchor is not None else None
+
+    def _pattern_label(self, address):
+        rank = self.prefix_trie.best_rank(address)
+
+        # The regex can only win if some regex entity ranks above the trie hit
+        if self.combined_regex is not None and (rank is None or self.first_regex_rank < rank):
+            match = self.combined_regex.match(address)
+            if match:
+                regex_rank = int(match.lastgroup[len('rank'):])
+                if rank is None or regex_rank < rank:
+                    rank = regex_rank
+
+        if rank is None:
+            return None
+        return self.pattern_labels[rank]
@@ -0,0 +1,201 @@
+import logging
+import sys
+from array import array
+from collections import Counter
+
+logger = logging.getLogger('AddressClusters')
+
+# Rough resident cost of one address: a ~40 char string, its dict slot and
+# its parent and rank entries. Used to turn a byte budget into a count.
+NODE_BYTES = sys.getsizeof('x' * 42) + 104 + 9
+
+
+def looks_like_coinjoin(tx):
+    """True for transactions with several equal-valued outputs, as CoinJoins have
+
+    Their inputs belong to different owners, so they must not be merged.
+    """
+    outputs = tx.get('out', ())
+    if len(outputs) < 3:
+        return False
+    _, count = Counter(out.get('value') for out in outputs).most_common(1)[0]
+    return count >= 3 and count * 2 >= len(outputs)
+
+
+class AddressClusters:
+    """Incremental common-input-ownership clustering over a disjoint-set forest
+
+    Addresses spent together as inputs of one transaction are assumed to
+    share an owner and are merged. Addresses are interned to dense integer
+    IDs; parents and ranks live in flat arrays, with path halving on find
+    and union by rank, so each input costs near-constant time.
+
+    Known (labelled) addresses are registered with mark(); anchor() returns
+    the first known address in an address's cluster, so a classifier can
+    hand its label to every address co-spent with it. Merges are never
+    undone, including those from blocks later orphaned: the co-spend still
+    shows common ownership.
+
+    When known addresses are too many to mark up front (a LabelDatabase),
+    is_known is asked instead about each address as it enters the forest.
+
+    The forest holds at most max_addresses addresses (derived from
+    max_bytes when not given). When full it is compacted to the clusters
+    that have an anchor, the only ones that lend a label; if those alone
+    fill it, new addresses are no longer clustered. With track_dirty,
+    new and changed nodes are kept until take_dirty() hands them to a
+    checkpoint.
+    """
+
+    def __init__(self, max_addresses=None, max_bytes=256 * 1024 * 1024, is_known=None, track_dirty=False):
+        self.max_addresses = max_addresses or max(1, max_bytes // NODE_BYTES)
+        self.is_known = is_known
+        self.ids = {}  # address -> id
+        self.parent = array('q')
+        self.rank = bytearray()
+        self.anchors = {}  # root id -> first known address in the cluster
+        self.track_dirty = track_dirty
+        self.new_nodes = []  # ids created since the last take_dirty()
+        self.changed = set()  # existing ids whose parent/rank changed since then
+        self.reset = False  # Compacted since the last take_dirty(): every node is renumbered
+        self.compactions = 0
+        self.full = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _id(self, address, create=True):
+        node = self.ids.get(address)
+        if node is None and create:
+            if len(self.ids) >= self.max_addresses and not self.compact():
+                return None
+            node = len(self.parent)
+            self.ids[address] = node
+            self.parent.append(node)
+            self.rank.append(0)
+            if self.track_dirty:
+                self.new_nodes.append((node, address))
+            if self.is_known is not None and self.is_known(address):
+                self.anchors[node] = address
+        return node
+
+    def compact(self):
+        """Drop the clusters without an anchor; False when that frees no room"""
+        if self.full:
+            return False
+        kept = [(node, address, self.find(node)) for address, node in self.ids.items()]
+        kept = [(node, address, root) for node, address, root in kept if root in self.anchors]
+        kept.sort()
+        if len(kept) >= self.max_addresses // 2:
+            # Labelled clusters alone fill half the forest; compacting again
+            # would soon churn, so stop adding addresses
+            self.full = True
+            logger.warning(f"Address clusters are full with {len(kept):,} addresses in labelled clusters; "
+                           f"new addresses are no longer clustered")
+            return False
+
+        new_id = {node: index for index, (node, _, _) in enumerate(kept)}
+        self.ids = {address: new_id[node] for node, address, _ in kept}
+        # Every node points straight at its root, so ranks are 1 for roots with members
+        self.parent = array('q', (new_id[root] for _, _, root in kept))
+        self.rank = bytearray(len(kept))
+        for node, _, root in kept:
+            if node != root:
+                self.rank[new_id[root]] = 1
+        self.anchors = {new_id[root]: address for root, address in self.anchors.items() if root in new_id}
+        self.compactions += 1
+        if self.track_dirty:
+            self.reset = True
+            self.new_nodes = [(new_id[node], address) for node, address, _ in kept]
+            self.changed = set()
+        return True
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]  # Path halving
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        """Merge the clusters of two ids and return the new root"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        if self.track_dirty:
+            self.changed.add(root_b)
+        if self.rank[root_a] == self.rank[root_b]:
+            self.rank[root_a] += 1
+            if self.track_dirty:
+                self.changed.add(root_a)
+
+        # Keep the surviving cluster's anchor, else inherit the merged one's
+        anchor = self.anchors.pop(root_b, None)
+        if anchor is not None:
+            self.anchors.setdefault(root_a, anchor)
+        return root_a
+
+    def add_transactions(self, transactions):
+        """Merge the input addresses of each transaction (one block or chunk)"""
+        for tx in transactions:
+            inputs = tx.get('inputs', ())
+            if len(inputs) < 2 or looks_like_coinjoin(tx):
+                continue
+            addresses = [address for address in (inp.get('prev_out', {}).get('addr') for inp in inputs)
+                         if address is not None]
+            compactions = self.compactions
+            nodes = [self._id(address) for address in addresses]
+            if self.compactions != compactions:  # Renumbered part-way: look them up again
+                nodes = [self._id(address) for address in addresses]
+            first = None
+            for node in nodes:
+                if node is None:
+                    continue
+                if first is None:
+                    first = node
+                elif node != first:
+                    first = self.union(first, node)
+
+    def mark(self, address):
+        """Register a known address as the anchor of its cluster, unless it already has one"""
+        node = self._id(address)
+        if node is not None:
+            self.anchors.setdefault(self.find(node), address)
+
+    def anchor(self, address):
+        """First known address clustered with this one, or None"""
+        node = self.ids.get(address)
+        if node is None:
+            return None
+        return self.anchors.get(self.find(node))
+
+    def take_dirty(self):
+        """(new rows, changed rows, reset) since the last call, for incremental persistence
+
+        New rows are (id, address, parent, rank); changed rows (parent, rank, id).
+        reset means the forest was compacted and the new rows replace every
+        saved node.
+        """
+        new_ids = {node for node, _ in self.new_nodes}
+        new_rows = [(node, address, self.parent[node], self.rank[node]) for node, address in self.new_nodes]
+        changed_rows = [(self.parent[node], self.rank[node], node) for node in self.changed if node not in new_ids]
+        reset = self.reset
+        self.new_nodes = []
+        self.changed = set()
+        self.reset = False
+        return new_rows, changed_rows, reset
+
+    def load(self, rows):
+        """Rebuild the forest from (id, address, parent, rank) rows ordered by id"""
+        known = []
+        for node, address, parent, rank in rows:
+            self.ids[address] = node
+            self.parent.append(parent)
+            self.rank.append(rank)
+            if self.is_known is not None and self.is_known(address):
+                known.append((node, address))
+        for node, address in known:
+            self.anchors.setdefault(self.find(node), address)
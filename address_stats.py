@@ -0,0 +1,162 @@
+import sqlite3
+import sys
+from collections import OrderedDict
+from datetime import datetime
+
+
+class AddressStats:
+    """Activity counters for one address"""
+
+    __slots__ = ('received_count', 'sent_count', 'total_received', 'total_sent', 'last_seen')
+
+    def __init__(self, received_count=0, sent_count=0, total_received=0, total_sent=0, last_seen=None):
+        self.received_count = received_count
+        self.sent_count = sent_count
+        self.total_received = total_received
+        self.total_sent = total_sent
+        self.last_seen = last_seen
+
+    def as_row(self, address):
+        last_seen = self.last_seen.timestamp() if self.last_seen else None
+        return (address, self.received_count, self.sent_count,
+                self.total_received, self.total_sent, last_seen)
+
+    @classmethod
+    def from_row(cls, row):
+        received_count, sent_count, total_received, total_sent, last_seen = row
+        if last_seen is not None:
+            last_seen = datetime.fromtimestamp(last_seen)
+        return cls(received_count, sent_count, total_received, total_sent, last_seen)
+
+
+# Rough resident cost of one entry: the slots record, a ~40 char address
+# string and its OrderedDict slot. Used to turn a byte budget into a count.
+ENTRY_BYTES = sys.getsizeof(AddressStats()) + sys.getsizeof('x' * 42) + 104
+
+
+class AddressStatsStore:
+    """Bounded per-address statistics with least-recently-updated eviction
+
+    Holds at most max_entries records (derived from max_bytes when not
+    given). When full, the least recently updated tenth of a percent is
+    evicted in one batch. With spill_path set, evicted records are written
+    to a SQLite file and transparently loaded back on the next access.
+    With track_dirty, updated records are also kept until take_dirty()
+    hands them to a checkpoint; without it nothing outlives eviction.
+
+    checkpoint_db is the connection of a TrackerCheckpoint to spill into
+    instead. Evictions then write nothing themselves: updated records stay
+    dirty until the checkpoint's save() writes them in its own transaction,
+    and are read back from the dirty set until then.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=64 * 1024 * 1024, spill_path=None, track_dirty=False,
+                 checkpoint_db=None):
+        self.max_entries = max_entries or max(1, max_bytes // ENTRY_BYTES)
+        self.evict_batch = max(1, self.max_entries // 1000)
+        self.entries = OrderedDict()
+        self.evicted = 0
+        # Entries updated since the last take_dirty(), for checkpoints
+        self.dirty = {} if track_dirty or checkpoint_db is not None else None
+
+        self.spill = checkpoint_db
+        self.owns_spill = False  # Whether evictions and close() write to the spill
+        if checkpoint_db is None and spill_path:
+            self.owns_spill = True
+            self.spill = sqlite3.connect(spill_path)
+            self.spill.execute(
+                "CREATE TABLE IF NOT EXISTS address_stats ("
+                "address TEXT PRIMARY KEY, received_count INTEGER, sent_count INTEGER, "
+                "total_received REAL, total_sent REAL, last_seen REAL)"
+            )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, address):
+        return address in self.entries
+
+    def items(self):
+        return self.entries.items()
+
+    def _load_spilled(self, address):
+        if not self.owns_spill and self.dirty:
+            stats = self.dirty.get(address)  # Evicted since the last checkpoint
+            if stats is not None:
+                return stats
+        if self.spill is None:
+            return None
+        row = self.spill.execute(
+            "SELECT received_count, sent_count, total_received, total_sent, last_seen "
+            "FROM address_stats WHERE address = ?", (address,)
+        ).fetchone()
+        return AddressStats.from_row(row) if row else None
+
+    def _evict(self):
+        victims = [self.entries.popitem(last=False) for _ in range(min(self.evict_batch, len(self.entries)))]
+        self.evicted += len(victims)
+        if self.owns_spill:
+            with self.spill:
+                self.spill.executemany(
+                    "INSERT OR REPLACE INTO address_stats VALUES (?, ?, ?, ?, ?, ?)",
+                    [stats.as_row(address) for address, stats in victims]
+                )
+
+    def get(self, address):
+        """Return the stats for an address without creating an entry"""
+        stats = self.entries.get(address)
+        if stats is None:
+            stats = self._load_spilled(address)
+        return stats
+
+    def update(self, address, is_sender, btc_amount, timestamp):
+        """Record one send or receive for an address"""
+        stats = self.entries.get(address)
+        if stats is None:
+            stats = self._load_spilled(address) or AddressStats()
+            if len(self.entries) >= self.max_entries:
+                self._evict()
+            self.entries[sys.intern(address)] = stats
+        else:
+            self.entries.move_to_end(address)
+
+        if is_sender:
+            stats.sent_count += 1
+            stats.total_sent += btc_amount
+        else:
+            stats.received_count += 1
+            stats.total_received += btc_amount
+        stats.last_seen = timestamp
+        if self.dirty is not None:
+            self.dirty[address] = stats
+        return stats
+
+    def take_dirty(self):
+        """Return rows for the entries updated since the last call, and reset"""
+        if self.dirty is None:
+            return []
+        rows = [stats.as_row(address) for address, stats in self.dirty.items()]
+        self.dirty.clear()
+        return rows
+
+    def load(self, rows):
+        """Preload entries from (address, ...) rows, oldest first, e.g. from a checkpoint"""
+        for row in rows:
+            if len(self.entries) >= self.max_entries:
+                self._evict()
+            self.entries[sys.intern(row[0])] = AddressStats.from_row(row[1:])
+
+    def close(self):
+        """Write resident entries to the spill file, if any, and close it
+
+        A checkpoint's connection is left alone: what changed since its last
+        save() is dropped, like the block height it goes with.
+        """
+        if self.owns_spill:
+            with self.spill:
+                self.spill.executemany(
+                    "INSERT OR REPLACE INTO address_stats VALUES (?, ?, ?, ?, ?, ?)",
+                    [stats.as_row(address) for address, stats in self.entries.items()]
+                )
+            self.spill.close()
+        self.spill = None
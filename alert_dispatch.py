@@ -0,0 +1,282 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+from http_client import get_client
+from metrics import ALERT_DELIVERY_ERRORS, ALERT_DELIVERY_SECONDS, ALERT_QUEUE_DEPTH, ALERTS_DROPPED
+
+logger = logging.getLogger('AlertDispatch')
+
+# What a sink does with a new alert when its queue is full
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'coalesce')
+
+
+class _Pending:
+    __slots__ = ('message', 'alert', 'profile', 'submitted', 'coalesced')
+
+    def __init__(self, message, alert, profile):
+        self.message = message
+        self.alert = alert
+        self.profile = profile
+        self.submitted = time.monotonic()
+        self.coalesced = 0
+
+
+def _volume(pending):
+    return (pending.alert or {}).get('btc_volume', 0)
+
+
+class AlertSink(ABC):
+    """One alert destination with its own bounded queue and worker threads
+
+    submit() never blocks: when the queue is full the overflow policy
+    drops the oldest or the newest alert, or coalesces the new one into
+    the last queued alert, which is delivered with a count of the alerts
+    folded into it (the largest of them by BTC volume is kept).
+    min_interval spaces deliveries, e.g. tweets, and failed deliveries
+    that retryable() accepts are retried retries times, retry_delay *
+    attempt seconds apart. All of the waiting happens on the sink's
+    workers, never in the caller.
+
+    accept(message, alert) filters alerts and transform(message, alert)
+    rewrites the message for this sink only; profiles limits the sink to
+    alerts from the named subscriber profiles. Subclasses implement
+    deliver().
+    """
+
+    def __init__(self, name, workers=1, max_queue=1000, overflow='drop_oldest', min_interval=0,
+                 retries=0, retry_delay=1.0, accept=None, transform=None, profiles=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}; use one of {', '.join(OVERFLOW_POLICIES)}")
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.min_interval = min_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.accept = accept
+        self.transform = transform
+        self.profiles = set(profiles) if profiles else None
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.pace_lock = threading.Lock()
+        self.next_delivery = 0.0
+        self.active = 0
+        self.closing = False
+        self.threads = []
+        self.delivered = 0
+
+    @abstractmethod
+    def deliver(self, message, alert, profile):
+        """Send one alert; raise to have it retried or reported"""
+
+    def retryable(self, error):
+        return True
+
+    def start(self):
+        for index in range(self.workers - len(self.threads)):
+            thread = threading.Thread(target=self._work, name=f'sink-{self.name}-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, message, alert=None, profile=None):
+        """Queue an alert for delivery; returns False when it was dropped or filtered out"""
+        if self.profiles is not None and profile not in self.profiles:
+            return False
+        if self.accept is not None and not self.accept(message, alert):
+            return False
+        if self.transform is not None:
+            message = self.transform(message, alert)
+        pending = _Pending(message, alert, profile)
+        with self.condition:
+            if self.closing:
+                return False
+            if len(self.queue) >= self.max_queue:
+                ALERTS_DROPPED.labels(self.name, self.overflow).inc()
+                if self.overflow == 'drop_newest':
+                    return False
+                if self.overflow == 'coalesce' and self.queue:
+                    last = self.queue[-1]
+                    if _volume(pending) > _volume(last):
+                        last.message, last.alert, last.profile = pending.message, pending.alert, pending.profile
+                    last.coalesced += 1
+                    return True
+                if self.queue:
+                    self.queue.popleft()
+            self.queue.append(pending)
+            ALERT_QUEUE_DEPTH.labels(self.name).set(len(self.queue))
+            self.condition.notify()
+        return True
+
+    def _pace(self):
+        # Reserve the next delivery slot, then wait for it outside the lock
+        if not self.min_interval:
+            return
+        with self.pace_lock:
+            now = time.monotonic()
+            slot = max(now, self.next_delivery)
+            self.next_delivery = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.closing:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                pending = self.queue.popleft()
+                ALERT_QUEUE_DEPTH.labels(self.name).set(len(self.queue))
+                self.active += 1
+            try:
+                self._deliver(pending)
+            finally:
+                with self.condition:
+                    self.active -= 1
+                    self.condition.notify_all()
+
+    def _deliver(self, pending):
+        message = pending.message
+        if pending.coalesced:
+            message = f"{message}\n(+{pending.coalesced} more alerts)"
+        for attempt in range(self.retries + 1):
+            self._pace()
+            try:
+                self.deliver(message, pending.alert, pending.profile)
+            except Exception as e:
+                ALERT_DELIVERY_ERRORS.labels(self.name).inc()
+                if attempt >= self.retries or not self.retryable(e):
+                    logger.error(f"Error delivering alert to {self.name}: {e}")
+                    return
+                time.sleep(self.retry_delay * (attempt + 1))
+                continue
+            self.delivered += 1
+            ALERT_DELIVERY_SECONDS.labels(self.name).observe(time.monotonic() - pending.submitted)
+            return
+
+    def close(self, timeout=10):
+        """Stop accepting alerts and wait up to timeout seconds for the queue to drain"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+            while (self.queue or self.active) and self.threads:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+        # Workers exit once the queue is empty
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        return not self.queue
+
+
+class ConsoleSink(AlertSink):
+    """Print alerts, in order; with show_profile each is headed by its profile name"""
+
+    def __init__(self, show_profile=False, **kwargs):
+        kwargs.setdefault('max_queue', 10000)
+        super().__init__('console', **kwargs)
+        self.show_profile = show_profile
+
+    def deliver(self, message, alert, profile):
+        if self.show_profile and profile:
+            print(f"[{profile}]")
+        print(message)
+
+
+class FileSink(AlertSink):
+    """Append alerts to a JSON-lines file"""
+
+    def __init__(self, path, name='file', **kwargs):
+        super().__init__(name, **kwargs)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def deliver(self, message, alert, profile):
+        line = json.dumps({'time': time.time(), 'profile': profile, 'message': message, 'alert': alert},
+                          ensure_ascii=False, default=str)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class TwitterSink(AlertSink):
+    """Tweet alerts through a tweepy Client, spaced min_interval seconds apart
+
+    Rate-limit errors are retried with growing waits (60s, 120s, ...), on
+    the sink's worker; other errors, such as rejected credentials or a
+    duplicate status, would fail again and are not.
+    """
+
+    def __init__(self, client, name='twitter', min_interval=30, retries=3, retry_delay=60,
+                 overflow='coalesce', max_queue=50, **kwargs):
+        super().__init__(name, min_interval=min_interval, retries=retries, retry_delay=retry_delay,
+                         overflow=overflow, max_queue=max_queue, **kwargs)
+        self.client = client
+
+    def deliver(self, message, alert, profile):
+        tweet = self.client.create_tweet(text=message)
+        logger.info(f"Tweet posted successfully with id: {tweet.data['id']}")
+
+    def retryable(self, error):
+        # tweepy.TooManyRequests carries the 429 response
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        return status == 429 or 'rate limit' in str(error).lower()
+
+
+class WebhookSink(AlertSink):
+    """POST alerts as JSON to a URL, by default a local receiver"""
+
+    def __init__(self, url='http://127.0.0.1:8787/alerts', name='webhook', http=None, workers=2,
+                 retries=2, **kwargs):
+        super().__init__(name, workers=workers, retries=retries, **kwargs)
+        self.url = url
+        self.http = http or get_client()
+
+    def deliver(self, message, alert, profile):
+        status = self.http.post_json(self.url, {'message': message, 'profile': profile, 'alert': alert})
+        if status >= 300:
+            raise RuntimeError(f"{self.url} answered {status}")
+
+
+class AlertDispatcher:
+    """Fans alerts out to sinks without waiting for any of them
+
+    The detection side calls submit(); every sink queues the alert and
+    delivers it from its own workers, so a slow or rate-limited sink only
+    backs up (and eventually drops or coalesces) its own queue.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = []
+        for sink in sinks:
+            self.add_sink(sink)
+
+    def add_sink(self, sink):
+        sink.start()
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+            sink.close(timeout=0)
+
+    def sink(self, name):
+        return next((sink for sink in self.sinks if sink.name == name), None)
+
+    def submit(self, message, alert=None, profile=None):
+        for sink in self.sinks:
+            sink.submit(message, alert, profile)
+
+    def close(self, timeout=10):
+        """Drain every sink, sharing timeout seconds between them"""
+        deadline = time.monotonic() + timeout
+        for sink in self.sinks:
+            sink.close(max(0, deadline - time.monotonic()))
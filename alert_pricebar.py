@@ -1,15 +1,13 @@
+from price_service import get_price_service
+
 def test_display():
     """Test function to display crypto price status without Twitter posting"""
-    import requests
     import json
     from pathlib import Path
     import time
     
     # Constants and API endpoints
     BTC_ATH = 1000000
-    COINGECKO_API = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin,ethereum&vs_currencies=usd"
-    CRYPTOCOMPARE_API = "https://min-api.cryptocompare.com/data/pricemulti?fsyms=BTC,ETH&tsyms=USD"
-    COINSTATS_API = "https://api.coinstats.app/public/v1/markets?coinId="
     PRICE_HISTORY_FILE = Path('btc_price_history.json')
 
     # Add Unicode arrow constants
@@ -38,52 +36,10 @@ def test_display():
             pass
 
     def get_btc_price():
-        try:
-            # Try CoinGecko first
-            response = requests.get(COINGECKO_API, timeout=10)
-            response.raise_for_status()
-            return float(response.json()["bitcoin"]["usd"])
-        except Exception as e:
-            print(f"Error fetching from CoinGecko: {e}")
-            try:
-                # Try CryptoCompare as backup
-                response = requests.get(CRYPTOCOMPARE_API, timeout=10)
-                response.raise_for_status()
-                return float(response.json()["BTC"]["USD"])
-            except Exception as e:
-                print(f"Error fetching from CryptoCompare: {e}")
-                try:
-                    # Try CoinStats as final backup
-                    response = requests.get(COINSTATS_API + "bitcoin", timeout=10)
-                    response.raise_for_status()
-                    return float(response.json()["pairs"][0]["price"])
-                except Exception as e:
-                    print(f"Error fetching from CoinStats: {e}")
-                    return 0.0
+        return get_price_service().price('BTC') or 0.0
 
     def get_eth_price():
-        try:
-            # Try CoinGecko first
-            response = requests.get(COINGECKO_API, timeout=10)
-            response.raise_for_status()
-            return float(response.json()["ethereum"]["usd"])
-        except Exception as e:
-            print(f"Error fetching from CoinGecko: {e}")
-            try:
-                # Try CryptoCompare as backup
-                response = requests.get(CRYPTOCOMPARE_API, timeout=10)
-                response.raise_for_status()
-                return float(response.json()["ETH"]["USD"])
-            except Exception as e:
-                print(f"Error fetching from CryptoCompare: {e}")
-                try:
-                    # Try CoinStats as final backup
-                    response = requests.get(COINSTATS_API + "ethereum", timeout=10)
-                    response.raise_for_status()
-                    return float(response.json()["pairs"][0]["price"])
-                except Exception as e:
-                    print(f"Error fetching from CoinStats: {e}")
-                    return 0.0
+        return get_price_service().price('ETH') or 0.0
             
     def get_progress_bar(percentage):
         filled = min(int(percentage / 10), 10)
@@ -0,0 +1,218 @@
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+
+# Formats of cached block bodies the parsers understand
+BLOCK_FORMATS = ('rawblock', 'block-height')
+
+
+def is_rawblock(data):
+    """True when parsed JSON is a blockchain.info /rawblock body
+
+    bitcoind's getblock has the same 'hash' and 'tx' keys, but its tx
+    list holds txids (or vin/vout transactions), which the monitors'
+    parsers would silently read as a block without transactions.
+    """
+    if not isinstance(data, dict) or 'hash' not in data or not isinstance(data.get('tx'), list):
+        return False
+    return all(isinstance(tx, dict) and 'inputs' in tx and 'out' in tx for tx in data['tx'])
+
+
+class _CacheWriter:
+    """Compressed temp file that only becomes visible in the cache on commit()"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        fd, self.temp_path = tempfile.mkstemp(dir=cache.root, suffix='.tmp')
+        os.close(fd)
+        self.file = gzip.open(self.temp_path, 'wb', compresslevel=5)
+        self.committed = False
+
+    def write(self, data):
+        self.file.write(data)
+
+    def commit(self, key, height=None, fmt='rawblock'):
+        """Move the finished file into place under its hash and index it"""
+        self.file.close()
+        self.cache._install(self.temp_path, key, height, fmt)
+        self.committed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self.committed:
+            self.file.close()
+            try:
+                os.remove(self.temp_path)
+            except FileNotFoundError:
+                pass
+        return False
+
+
+class TeeReader:
+    """Async reader that copies every chunk it returns into a cache writer"""
+
+    def __init__(self, content, sink):
+        self.content = content
+        self.sink = sink
+
+    async def read(self, n=-1):
+        data = await self.content.read(n)
+        if data:
+            self.sink.write(data)
+        return data
+
+
+class MeteredReader:
+    """Async reader that counts the bytes it returns and the time spent waiting for them"""
+
+    def __init__(self, content):
+        self.content = content
+        self.bytes = 0
+        self.wait = 0.0
+
+    async def read(self, n=-1):
+        started = time.perf_counter()
+        data = await self.content.read(n)
+        self.wait += time.perf_counter() - started
+        self.bytes += len(data)
+        return data
+
+
+class AsyncFileReader:
+    """Async read() over a blocking file, for parsers that expect a stream"""
+
+    def __init__(self, f):
+        self.f = f
+
+    async def read(self, n=-1):
+        return await asyncio.to_thread(self.f.read, n)
+
+
+class BlockCache:
+    """Content-addressed, size-bounded on-disk cache of blockchain.info JSON
+
+    Bodies are stored gzip-compressed under their block (or transaction)
+    hash, which never changes for the same content. A SQLite index maps
+    heights to hashes and tracks sizes and last access for LRU eviction.
+    Files are written to a temp file and renamed into place, so concurrent
+    readers, including other processes, never see a partial body.
+    """
+
+    def __init__(self, root='block_cache', max_bytes=2 * 1024 ** 3):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.root / 'index.db'
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, height INTEGER, format TEXT, size INTEGER, last_access REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_height ON entries (height)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the cache usable from
+        # any thread or process without sharing sqlite handles
+        db = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def path_for(self, key):
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def __contains__(self, key):
+        return self.path_for(key).exists()
+
+    def hash_at(self, height):
+        """Hash of the cached main-chain block at a height, or None"""
+        with self._connect() as db:
+            row = db.execute(
+                f"SELECT key FROM entries WHERE height = ? AND format IN ({', '.join('?' * len(BLOCK_FORMATS))}) "
+                "ORDER BY last_access DESC LIMIT 1", (height, *BLOCK_FORMATS)
+            ).fetchone()
+        return row[0] if row else None
+
+    def format_of(self, key):
+        """Body format of a cached key ('rawblock', 'block-height' or 'rawtx')"""
+        with self._connect() as db:
+            row = db.execute("SELECT format FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def open(self, key):
+        """Open a cached body for reading (decompressed bytes), or return None"""
+        try:
+            f = gzip.open(self.path_for(key), 'rb')
+        except FileNotFoundError:
+            return None
+        with self._connect() as db:
+            db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return f
+
+    def load(self, key):
+        """Parsed JSON for a cached key, or None"""
+        f = self.open(key)
+        if f is None:
+            return None
+        with f:
+            return json.load(f)
+
+    def writer(self):
+        """Start writing a body; call commit(key, ...) on the result to keep it"""
+        return _CacheWriter(self)
+
+    def store(self, key, body, height=None, fmt='rawblock'):
+        """Cache a complete raw JSON body"""
+        with self.writer() as sink:
+            sink.write(body)
+            sink.commit(key, height, fmt)
+
+    def _install(self, temp_path, key, height, fmt):
+        path = self.path_for(key)
+        path.parent.mkdir(exist_ok=True)
+        os.chmod(temp_path, 0o644)  # mkstemp creates 0600; other readers need access
+        os.replace(temp_path, path)
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, height, fmt, path.stat().st_size, time.time())
+            )
+        self.evict()
+
+    def discard(self, key):
+        """Remove an entry, e.g. a block that was orphaned by a reorg"""
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+        with self._connect() as db:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self._connect() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.path_for(key))
+                except FileNotFoundError:
+                    pass
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def segment_sums(values, counts):
+    """Sum consecutive runs of values, one run per count, with np.add.reduceat
+
+    reduceat returns the element at the offset for empty runs (and cannot
+    index past the end), so a trailing zero is appended and empty runs are
+    zeroed afterwards.
+    """
+    if len(counts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    sums = np.add.reduceat(np.append(values, 0), offsets)
+    sums[counts == 0] = 0
+    return sums
+
+
+class BlockColumns:
+    """Columnar input/output values for a list of blockchain.info transactions
+
+    The block is flattened once into value arrays plus per-transaction
+    counts; totals and fees for every transaction are then single vector
+    operations.
+    """
+
+    def __init__(self, transactions):
+        n = len(transactions)
+        self.input_counts = np.fromiter(
+            (len(tx.get('inputs', ())) for tx in transactions), dtype=np.int64, count=n)
+        self.output_counts = np.fromiter(
+            (len(tx.get('out', ())) for tx in transactions), dtype=np.int64, count=n)
+        self.input_values = np.fromiter(
+            (inp.get('prev_out', {}).get('value', 0) for tx in transactions for inp in tx.get('inputs', ())),
+            dtype=np.int64, count=int(self.input_counts.sum()))
+        self.output_values = np.fromiter(
+            (out.get('value', 0) for tx in transactions for out in tx.get('out', ())),
+            dtype=np.int64, count=int(self.output_counts.sum()))
+
+        self.input_totals = segment_sums(self.input_values, self.input_counts)
+        self.output_totals = segment_sums(self.output_values, self.output_counts)
+        self.fees = self.input_totals - self.output_totals
+
+    def over_threshold(self, min_btc, satoshi_to_btc):
+        """Indexes of transactions whose input total is at least min_btc"""
+        # Same float comparison as process_transaction, so both paths agree
+        return np.flatnonzero(self.input_totals / satoshi_to_btc >= min_btc)
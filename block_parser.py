@@ -0,0 +1,165 @@
+import json
+
+try:
+    import ijson
+except ImportError:  # Fall back to parsing the whole body at once
+    ijson = None
+
+# Transaction fields the whale pipeline reads, relative to one transaction.
+# Scripts, witnesses, spending outpoints etc. are never materialised.
+TX_FIELDS = (
+    'hash',
+    'time',
+    'inputs',
+    'inputs.item',
+    'inputs.item.prev_out',
+    'inputs.item.prev_out.value',
+    'inputs.item.prev_out.addr',
+    'out',
+    'out.item',
+    'out.item.value',
+    'out.item.addr'
+)
+
+SCALAR_EVENTS = ('string', 'number', 'boolean', 'null')
+
+# Bodies that are already on disk (cached or replayed blocks), up to this
+# size, are parsed whole with json.loads, which takes a third to a half of
+# the CPU time of ijson's event stream (see scripts/benchmark_pipeline.py).
+# Downloads are always streamed: memory stays bounded by one transaction
+# and classification starts before the body has fully arrived
+STREAM_THRESHOLD = 16 * 1024 * 1024
+READ_SIZE = 256 * 1024
+
+
+def _project_output(output):
+    projected = {'value': output.get('value', 0)}
+    if 'addr' in output:
+        projected['addr'] = output['addr']
+    return projected
+
+
+def project_transaction(tx):
+    """Reduce a blockchain.info transaction to the fields in TX_FIELDS
+
+    Keys missing from the source stay missing, so .get() defaults in
+    process_transaction behave exactly as on the full transaction.
+    """
+    projected = {}
+    if 'hash' in tx:
+        projected['hash'] = tx['hash']
+    if 'time' in tx:
+        projected['time'] = tx['time']
+    if 'inputs' in tx:
+        projected['inputs'] = [
+            {'prev_out': _project_output(inp['prev_out'])} if 'prev_out' in inp else {}
+            for inp in tx['inputs']
+        ]
+    if 'out' in tx:
+        projected['out'] = [_project_output(out) for out in tx['out']]
+    return projected
+
+
+def _blocks_at(data, block_prefix):
+    """Resolve an ijson-style prefix ('' or 'blocks.item') against parsed JSON"""
+    nodes = [data]
+    for part in block_prefix.split('.') if block_prefix else []:
+        if part == 'item':
+            nodes = [item for node in nodes for item in node]
+        else:
+            nodes = [node[part] for node in nodes]
+    return nodes
+
+
+async def _read_up_to(content, limit):
+    """Read until the stream ends or passes limit bytes; returns the bytes and whether it ended"""
+    chunks = []
+    size = 0
+    while size <= limit:
+        chunk = await content.read(min(READ_SIZE, limit + 1 - size))
+        if not chunk:
+            return b''.join(chunks), True
+        chunks.append(chunk)
+        size += len(chunk)
+    return b''.join(chunks), False
+
+
+class _PrefixedReader:
+    """Async reader that returns already-read bytes before the rest of a stream"""
+
+    def __init__(self, prefix, content):
+        self.prefix = prefix
+        self.content = content
+
+    async def read(self, n=-1):
+        # ijson probes the stream type with read(0)
+        if self.prefix and n != 0:
+            data, self.prefix = self.prefix, b''
+            return data
+        return await self.content.read(n)
+
+
+def _parsed_transactions(data, tx_prefix, header):
+    """Projected transactions of an already parsed block body"""
+    block_prefix, _, tx_key = tx_prefix.rpartition('.')
+    for block in _blocks_at(data, block_prefix):
+        if block.get('main_chain') is False:
+            continue
+        if header is not None:
+            header.update({k: v for k, v in block.items() if not isinstance(v, (dict, list))})
+        for tx in block.get(tx_key, []):
+            # Like the stream parser, skip entries that are not objects (txids)
+            if isinstance(tx, dict):
+                yield project_transaction(tx)
+
+
+async def iter_block_transactions(content, tx_prefix='tx', header=None, stream_threshold=0):
+    """Yield projected transactions from a block JSON stream as they are parsed
+
+    content is an async file-like object such as aiohttp's response.content.
+    tx_prefix locates the transaction list: 'tx' for /rawblock and
+    'blocks.item.tx' for /block-height. Transactions of blocks flagged
+    main_chain=false are skipped. The scalar fields of the main-chain
+    block (hash, height, prev_block, ...) are copied into header when
+    given, once that block has been read.
+
+    Bodies are streamed with ijson when it is installed; with a
+    stream_threshold (e.g. STREAM_THRESHOLD for local files), bodies of
+    up to that many bytes are parsed with json.loads instead.
+    """
+    block_prefix = tx_prefix.rpartition('.')[0]
+    field_prefix = f"{block_prefix}." if block_prefix else ''
+    item_prefix = f"{tx_prefix}.item"
+
+    if ijson is None:
+        for tx in _parsed_transactions(json.loads(await content.read()), tx_prefix, header):
+            yield tx
+        return
+    body, complete = await _read_up_to(content, stream_threshold)
+    if complete:
+        for tx in _parsed_transactions(json.loads(body), tx_prefix, header):
+            yield tx
+        return
+    content = _PrefixedReader(body, content)
+
+    keep = {item_prefix} | {f"{item_prefix}.{field}" for field in TX_FIELDS}
+    block = {}
+    builder = None
+    async for prefix, event, value in ijson.parse_async(content, use_float=True):
+        if builder is not None:
+            if prefix in keep:
+                builder.event(event, value)
+                if prefix == item_prefix and event == 'end_map':
+                    if block.get('main_chain') is not False:
+                        yield builder.value
+                    builder = None
+        elif prefix == item_prefix and event == 'start_map':
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == block_prefix and event == 'start_map':
+            block = {}
+        elif prefix == block_prefix and event == 'end_map':
+            if header is not None and block.get('main_chain') is not False:
+                header.update(block)
+        elif event in SCALAR_EVENTS and prefix.startswith(field_prefix) and '.' not in prefix[len(field_prefix):]:
+            block[prefix[len(field_prefix):]] = value
@@ -1,28 +1,106 @@
 # -*- coding: UTF-8 -*-
-import re
-import requests
 import time
 import os
+import threading
+from itertools import islice
 from datetime import datetime
-from collections import defaultdict
+from collections import OrderedDict, deque
+
+from address_classifier import AddressClassifier
+from alert_dispatch import AlertDispatcher, ConsoleSink, FileSink, WebhookSink
+from address_clusters import AddressClusters
+from address_stats import AddressStats, AddressStatsStore
+from block_cache import BLOCK_FORMATS, AsyncFileReader, BlockCache, MeteredReader, TeeReader
+from block_filter import BlockColumns
+from block_parser import STREAM_THRESHOLD, iter_block_transactions
+from block_replay import RecordedBlockSource
+from chain_tracker import ChainTipTracker
+from http_client import get_client
+from label_db import LabelDatabase
+from mempool import BlockchainInfoMempoolSource, ReplayMempoolSource
+from metrics import (ALERTS, BLOCK_ALERT_LAG_SECONDS, BLOCK_BYTES, BLOCK_FETCH_SECONDS, BLOCK_PARSE_SECONDS,
+                     CLASSIFY_SECONDS, LAST_BLOCK, POLL_SECONDS, TRANSACTIONS, start_metrics_server)
+from price_service import StaticPriceService, get_price_service
+from subscriber_profiles import PROFILES, SubscriberProfile, build_profiles
+from tracker_state import TrackerCheckpoint
+from tx_attribution import attribute_transaction
 
 class BitcoinWhaleTracker:
-    def __init__(self, min_btc=1000):  # Changed from 500 to 1000
+    def __init__(self, min_btc=1000, stats_budget_mb=64, stats_spill_path=None,
+                 block_cache_dir='block_cache', block_cache_mb=2048, profiles=None, state_path=None,
+                 label_db=None):  # Changed from 500 to 1000
         self.base_url = "https://blockchain.info"
-        self.min_btc = min_btc
+        # Each block is fetched and filtered once, at the lowest threshold,
+        # and every alert is fanned out to the profiles it qualifies for
+        self.profiles = profiles or [SubscriberProfile('default', min_btc)]
+        self.min_btc = min(profile.min_btc for profile in self.profiles)
         self.satoshi_to_btc = 100000000
-        self.processed_blocks = set()  # Track processed blocks
+        self.chain = ChainTipTracker(depth=1000)  # Recent blocks, for duplicates and reorgs
+        self.mempool_alerts = OrderedDict()  # Tx hash -> alert announced before confirmation
+        self.max_mempool_alerts = 10000
+        self.mempool_lock = threading.Lock()
         self.last_block_height = None  # Track last block height
+        self.http = get_client()  # Shared keep-alive connection pool
+        self.price_service = get_price_service()  # Cached USD prices shared with other monitors
+        self.max_fetch_workers = 4  # Concurrent block downloads during catch-up
+        self.max_catchup_blocks = 144  # Backfill at most ~1 day of missed blocks
+        self.filter_chunk_size = 512  # Streamed transactions per vectorised threshold pass
+        self.quiet = False  # Format alerts without printing them (replays)
+        # Alerts are handed to the sinks through queues, so a slow sink
+        # (e.g. a rate-limited Twitter account) never holds up block processing
+        self.dispatcher = AlertDispatcher([
+            ConsoleSink(show_profile=len(self.profiles) > 1, accept=lambda message, alert: not self.quiet)
+        ])
+        # Local copy of downloaded blocks, consulted before the API
+        self.block_cache = None
+        if block_cache_dir:
+            self.block_cache = BlockCache(block_cache_dir, max_bytes=block_cache_mb * 1024 * 1024)
         
-        # Address statistics tracking
-        self.address_stats = defaultdict(lambda: {
-            'received_count': 0,
-            'sent_count': 0,
-            'total_received': 0,
-            'total_sent': 0,
-            'last_seen': None
-        })
+        # Checkpoint file to resume from (restored below, once the labels are set up)
+        self.state = TrackerCheckpoint(state_path) if state_path else None
+        
+        # Address statistics tracking, bounded so long-running monitors don't
+        # grow forever; evicted entries go to stats_spill_path when set, or
+        # to the checkpoint file through its own transactions
+        self.address_stats = AddressStatsStore(
+            max_bytes=stats_budget_mb * 1024 * 1024,
+            spill_path=stats_spill_path,
+            track_dirty=bool(state_path),  # Only a checkpoint ever takes the dirty rows
+            checkpoint_db=self.state.db if self.state is not None and not stats_spill_path else None
+        )
+        
+        # Address labels come from a compiled, memory-mapped label database
+        # when one is given (see label_db.py); otherwise from the built-in tables
+        self.label_db = None
+        if label_db:
+            self.label_db = LabelDatabase(label_db)
+            self.known_addresses = {}
+            self.exchange_patterns = dict(self.label_db.exchange_patterns)
+            self.stablecoin_addresses = dict(self.label_db.stablecoin_addresses)
+            print(f"Mapped {len(self.label_db)} address labels from {label_db}")
+        else:
+            self.load_default_labels()
         
+        # Addresses co-spent with a labelled address inherit its label
+        self.clusters = AddressClusters(is_known=self.label_db.__contains__ if self.label_db else None,
+                                        track_dirty=bool(state_path))
+        
+        # Compile the label tables once; identify_address runs for both
+        # sides of every whale transaction
+        self.build_classifiers()
+        
+        # Pick up where the last run stopped
+        if self.state is not None:
+            self.restore_state()
+        
+        # Known addresses anchor their clusters (after restoring, so IDs line up)
+        for known_addresses in [self.known_addresses] + [profile.known_addresses for profile in self.profiles]:
+            for info in known_addresses.values():
+                for address in (info or {}).get('addresses', ()):
+                    self.clusters.mark(address)
+
+    def load_default_labels(self):
+        """Built-in address labels, used when no label database is given"""
         # Known addresses database (keeping original database)
         self.known_addresses = {
             'binance': {
@@ -746,102 +824,394 @@ class BitcoinWhaleTracker:
             }
         })
 
+    def build_classifiers(self):
+        """(Re)build the engine's and the profiles' classifiers from the current label tables"""
+        self.address_classifier = AddressClassifier(self.known_addresses, self.exchange_patterns,
+                                                    self.clusters, self.label_db)
+        for profile in self.profiles:
+            profile.bind(self.known_addresses, self.exchange_patterns, self.clusters, self.label_db)
+
+    def reload_labels(self):
+        """Pick up a rebuilt label database file, if there is one"""
+        if self.label_db is None or not self.label_db.reload_if_changed():
+            return
+        self.exchange_patterns = dict(self.label_db.exchange_patterns)
+        self.stablecoin_addresses = dict(self.label_db.stablecoin_addresses)
+        self.build_classifiers()
+
+    def restore_state(self):
+        """Load the last checkpoint: block height, recent chain window and address stats"""
+        self.last_block_height = self.state.get_meta('last_block_height')
+        for height, block_hash, prev_hash, alerts in self.state.load_chain():
+            self.chain.connect(height, block_hash, prev_hash, alerts)
+        self.address_stats.load(self.state.load_address_stats(self.address_stats.max_entries))
+        self.clusters.load(self.state.load_clusters())
+        if self.last_block_height is not None:
+            print(f"Restored state at block {self.last_block_height}: {len(self.chain)} recent blocks, "
+                  f"{len(self.address_stats)} addresses, {len(self.clusters)} clustered addresses")
+
+    def checkpoint(self, height=None):
+        """Persist what changed since the last checkpoint, in one transaction
+
+        height is the last fully processed block; a restart resumes after it.
+        """
+        if self.state is None:
+            return
+        try:
+            self.state.save(self.address_stats.take_dirty(), self.chain,
+                            self.last_block_height if height is None else height,
+                            self.clusters.take_dirty())
+        except Exception as e:
+            print(f"Error saving checkpoint: {e}")
+
+    def close(self, timeout=10):
+        """Drain the alert sinks and close the checkpoint and stats spill files"""
+        self.dispatcher.close(timeout)
+        self.address_stats.close()
+        if self.state is not None:
+            self.state.close()
+            self.state = None
+        self.block_cache = None
+
     def get_latest_block(self):
-        """Get the latest block hash and ensure we don't process duplicates"""
+        """Get the blocks mined since the last poll as (height, hash) pairs, oldest first
+
+        Heights skipped between two polls are returned with a hash of None;
+        fetch_blocks resolves them by height. last_block_height is left to
+        advance as blocks are processed, so a block that could not be
+        fetched is asked for again by the next poll.
+        """
         try:
-            response = requests.get(f"{self.base_url}/latestblock")
-            block_data = response.json()
+            block_data = self.http.get_json(f"{self.base_url}/latestblock")
             current_height = block_data['height']
             current_hash = block_data['hash']
             
             # If this is our first block, initialize
             if self.last_block_height is None:
-                self.last_block_height = current_height
-                return current_hash
+                return [(current_height, current_hash)]
                 
-            # If we've seen this block already, return None
-            if current_hash in self.processed_blocks:
-                return None
+            # If we've seen this block already, nothing to do
+            if current_hash in self.chain:
+                return []
                 
-            # If this is a new block
+            # If this is a new block, include every height we have not seen yet
             if current_height > self.last_block_height:
-                self.last_block_height = current_height
-                # Keep track of last 1000 blocks to manage memory
-                if len(self.processed_blocks) > 1000:
-                    self.processed_blocks.clear()
-                self.processed_blocks.add(current_hash)
+                first_height = max(self.last_block_height + 1,
+                                   current_height - self.max_catchup_blocks + 1)
+                if first_height > self.last_block_height + 1:
+                    print(f"Skipping {first_height - self.last_block_height - 1} blocks "
+                          f"beyond the {self.max_catchup_blocks} block catch-up limit")
+                missed = [(height, None) for height in range(first_height, current_height)]
+                if missed:
+                    print(f"\nCatching up {len(missed)} missed block(s) from height {first_height}")
                 print(f"\nNew Block: {current_height} | Hash: {current_hash[:8]}...")
-                return current_hash
+                return missed + [(current_height, current_hash)]
                 
-            return None
+            # An unseen block at or below our height means the tip was
+            # replaced; connect_block works out which blocks it orphaned
+            print(f"\nReplaced tip at height {current_height} | Hash: {current_hash[:8]}...")
+            return [(current_height, current_hash)]
             
         except Exception as e:
             print(f"Error getting latest block: {e}")
+            return []
+
+    async def stream_block(self, height, block_hash, header=None):
+        """Stream one block's transactions, reduced to whale-relevant fields, as they download
+
+        Blocks without a known hash are resolved by height. The block's
+        hash, prev_block, height etc. are written into header once read.
+        """
+        if block_hash is None and self.block_cache is not None:
+            block_hash = self.block_cache.hash_at(height)
+
+        # Serve from the local cache when we have the block already
+        fmt = self.block_cache.format_of(block_hash) if self.block_cache and block_hash else None
+        cached = self.block_cache.open(block_hash) if fmt in BLOCK_FORMATS else None
+        if cached is not None:
+            tx_prefix = 'tx' if fmt == 'rawblock' else 'blocks.item.tx'
+            count = 0
+            with cached:
+                async for tx in self._parse_metered(AsyncFileReader(cached), tx_prefix, header, 'cache',
+                                                    STREAM_THRESHOLD):
+                    count += 1
+                    yield tx
+            if count:
+                return
+            # Every block has a coinbase transaction: this body is in another
+            # format (e.g. bitcoind's, cached by an older fetcher), so replace it
+            self.block_cache.discard(block_hash)
+
+        if block_hash is None:
+            url = f"{self.base_url}/block-height/{height}?format=json"
+            tx_prefix = 'blocks.item.tx'
+            fmt = 'block-height'
+        else:
+            url = f"{self.base_url}/rawblock/{block_hash}"
+            tx_prefix = 'tx'
+            fmt = 'rawblock'
+        if header is None:
+            header = {}
+        async with self.http.stream(url, timeout=60) as response:
+            if self.block_cache is None:
+                async for tx in self._parse_metered(response.content, tx_prefix, header, 'network'):
+                    yield tx
+                return
+            # Keep a compressed copy of the body while parsing it
+            with self.block_cache.writer() as sink:
+                async for tx in self._parse_metered(TeeReader(response.content, sink), tx_prefix, header, 'network'):
+                    yield tx
+                if header.get('hash'):
+                    sink.commit(header['hash'], header.get('height', height), fmt)
+
+    async def _parse_metered(self, content, tx_prefix, header, source, stream_threshold=0):
+        """iter_block_transactions, recording wait-for-data and parse time separately"""
+        reader = MeteredReader(content)
+        busy = 0.0
+        resumed = time.perf_counter()
+        async for tx in iter_block_transactions(reader, tx_prefix, header, stream_threshold):
+            busy += time.perf_counter() - resumed
+            yield tx
+            resumed = time.perf_counter()
+        busy += time.perf_counter() - resumed
+        BLOCK_FETCH_SECONDS.observe(reader.wait)
+        BLOCK_PARSE_SECONDS.observe(max(0.0, busy - reader.wait))
+        BLOCK_BYTES.labels(source).inc(reader.bytes)
+
+    async def fetch_block(self, height, block_hash):
+        """Download one block into a (transactions, header) pair"""
+        header = {}
+        transactions = [tx async for tx in self.stream_block(height, block_hash, header)]
+        return transactions, header
+
+    def get_block_transactions(self, block_hash, header=None):
+        """Get all transactions in a block, yielding each as soon as it is parsed
+
+        A failed download raises, rather than passing for an empty block.
+        """
+        yield from self.http.iterate(self.stream_block(None, block_hash, header))
+
+    def get_block_transactions_at_height(self, height, header=None):
+        """Get all transactions in the main-chain block at a height"""
+        yield from self.http.iterate(self.stream_block(height, None, header))
+
+    def fetch_blocks(self, blocks):
+        """Download blocks concurrently, yielding (height, transactions, header) in height order
+
+        header is filled in by the time transactions has been consumed.
+        The first block that fails to download raises, and the blocks after
+        it are not yielded, so no height is ever skipped.
+        """
+        # A single new block is the common case: classify its transactions
+        # while the rest of the block is still downloading
+        if len(blocks) == 1:
+            height, block_hash = blocks[0]
+            header = {}
+            if block_hash is None:
+                yield height, self.get_block_transactions_at_height(height, header), header
+            else:
+                yield height, self.get_block_transactions(block_hash, header), header
+            return
+
+        def result(height, future):
+            try:
+                return (height, *future.result())
+            except Exception as e:
+                raise RuntimeError(f"Error getting block at height {height}: {e}") from e
+
+        # Keep a bounded window of downloads in flight so a long catch-up
+        # does not hold every block in memory at once; the client's per-host
+        # limit caps how many of them actually hit the network together
+        window = 2 * self.max_fetch_workers
+        pending = deque()
+        try:
+            for height, block_hash in blocks:
+                pending.append((height, self.http.submit(self.fetch_block(height, block_hash))))
+                if len(pending) >= window:
+                    yield result(*pending.popleft())
+            while pending:
+                yield result(*pending.popleft())
+        finally:
+            for height, future in pending:
+                future.cancel()
+
+    def process_block(self, height, transactions):
+        """Run every transaction of a block through the whale pipeline and return its alerts"""
+        processed_count = 0
+        alerts = []
+        
+        classify_time = 0.0
+        try:
+            for chunk in self.chunk_transactions(transactions):
+                started = time.perf_counter()
+                processed_count += len(chunk)
+                # Cluster first, so whales in this chunk already see the merges
+                self.clusters.add_transactions(chunk)
+                for tx, whale_tx in self.find_whales(chunk):
+                    alerts.append(whale_tx)
+                    # Transactions seen in the mempool or re-mined after a reorg
+                    # were announced already
+                    tx_hash = whale_tx['transaction_hash']
+                    announced = self.confirm_mempool_alert(tx_hash)
+                    if not announced and not self.chain.is_alerted(tx_hash):
+                        self.publish(whale_tx, tx)
+                classify_time += time.perf_counter() - started
+        except Exception:
+            # A streamed block that fails part-way is processed again by the
+            # next poll; hold its alerts as announced so they are not repeated
+            with self.mempool_lock:
+                for whale_tx in alerts:
+                    self.mempool_alerts[whale_tx['transaction_hash']] = whale_tx
+            raise
+        
+        CLASSIFY_SECONDS.observe(classify_time)
+        TRANSACTIONS.labels('btc').inc(processed_count)
+        LAST_BLOCK.labels('btc').set(height)
+        if not self.quiet:
+            print(f"Block {height}: processed {processed_count} transactions, found {len(alerts)} whale movements")
+        return alerts
+
+    def chunk_transactions(self, transactions):
+        """Split a block into lists for find_whales; streamed blocks go in fixed-size chunks"""
+        if isinstance(transactions, list):
+            yield transactions
+            return
+        iterator = iter(transactions)
+        while True:
+            chunk = list(islice(iterator, self.filter_chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def find_whales(self, transactions):
+        """Yield (transaction, alert) pairs for whales in a list, filtering it in one vector pass
+
+        Totals and fees for every transaction come from BlockColumns, so only
+        the few transactions over min_btc reach process_transaction.
+        """
+        columns = BlockColumns(transactions)
+        for index in columns.over_threshold(self.min_btc, self.satoshi_to_btc):
+            tx = transactions[index]
+            yield tx, self.process_transaction(
+                tx,
+                input_value=int(columns.input_totals[index]),
+                output_value=int(columns.output_totals[index])
+            )
+
+    def process_unconfirmed(self, tx):
+        """Classify a mempool transaction and announce it once, before it is mined"""
+        # Stats are only updated when the transaction confirms
+        whale_tx = self.process_transaction(tx, record_stats=False)
+        if not whale_tx:
             return None
+        
+        tx_hash = whale_tx['transaction_hash']
+        with self.mempool_lock:
+            if tx_hash in self.mempool_alerts or self.chain.is_alerted(tx_hash):
+                return None
+            self.mempool_alerts[tx_hash] = whale_tx
+            while len(self.mempool_alerts) > self.max_mempool_alerts:
+                self.mempool_alerts.popitem(last=False)
+        
+        whale_tx['confirmed'] = False
+        self.publish(whale_tx, tx)
+        return whale_tx
 
-    def get_block_transactions(self, block_hash):
-        """Get all transactions in a block"""
+    def confirm_mempool_alert(self, tx_hash):
+        """Forget a pending mempool alert once its transaction is mined; True if there was one"""
+        with self.mempool_lock:
+            return self.mempool_alerts.pop(tx_hash, None) is not None
+
+    def monitor_mempool(self, source):
+        """Alert on whale transactions from a mempool source until it runs dry"""
+        print(f"Watching the mempool for transactions over {self.min_btc} BTC...")
         try:
-            response = requests.get(f"{self.base_url}/rawblock/{block_hash}")
-            return response.json()['tx']
+            for tx in self.http.iterate(source.transactions()):
+                self.process_unconfirmed(tx)
         except Exception as e:
-            print(f"Error getting block transactions: {e}")
-            return []
+            print(f"Error in mempool feed: {e}")
+
+    def connect_block(self, height, header, alerts):
+        """Record a processed block on the chain tracker, handling reorgs"""
+        block_hash = header.get('hash')
+        if not block_hash:
+            return
+        prev_hash = header.get('prev_block')
+
+        # If the block does not build on our chain, walk back to the fork
+        # point and process the replacement blocks we never saw
+        branch = []
+        parent_height, parent_hash = height - 1, prev_hash
+        while (parent_hash and self.chain.is_fork(parent_height, parent_hash)
+               and len(branch) < self.max_catchup_blocks):
+            try:
+                transactions, parent_header = self.http.run(self.fetch_block(parent_height, parent_hash))
+            except Exception as e:
+                print(f"Error getting replacement block {parent_hash[:8]}...: {e}")
+                break
+            branch.append((parent_height, parent_hash, transactions, parent_header))
+            parent_height, parent_hash = parent_height - 1, parent_header.get('prev_block')
+
+        if branch:
+            print(f"\nReorg detected: {len(branch)} replacement block(s) below height {height}")
+        orphaned = []
+        for branch_height, branch_hash, transactions, branch_header in reversed(branch):
+            branch_alerts = self.process_block(branch_height, transactions)
+            orphaned += self.chain.connect(branch_height, branch_hash, branch_header.get('prev_block'), branch_alerts)
+
+        orphaned += self.chain.connect(height, block_hash, prev_hash, alerts)
+        for orphan_height, orphan_hash in orphaned:
+            if not self.quiet:
+                print(f"Orphaned block {orphan_height} | Hash: {orphan_hash[:8]}...")
+            if self.block_cache is not None:
+                self.block_cache.discard(orphan_hash)
+        for retracted in self.chain.take_retractions():
+            self.retract(retracted)
+
+    def retract(self, alert):
+        """Tell the sinks of every profile that got an alert that its transaction left the main chain"""
+        message = (f"↩️ Retracted: {alert['btc_volume']:,.0f} #btc transfer "
+                   f"{alert['transaction_hash'][:8]}... is no longer in the main chain")
+        retraction = dict(alert, retracted=True)
+        for profile in self.profiles:
+            if alert['btc_volume'] >= profile.min_btc:
+                self.dispatcher.submit(message, retraction, profile.name)
 
     def get_address_label(self, address):
         """Get the entity label for an address"""
-        for entity, info in self.known_addresses.items():
-            if address in info['addresses']:
-                return f"({entity.upper()} {info['type']})"
+        label = self.address_classifier.known_label(address)
+        if label is not None:
+            return f"({label['name'].upper()} {label['type']})"
         return ""
 
     def update_address_stats(self, address, is_sender, btc_amount, timestamp):
         """Update statistics for an address"""
-        stats = self.address_stats[address]
-        if is_sender:
-            stats['sent_count'] += 1
-            stats['total_sent'] += btc_amount
-        else:
-            stats['received_count'] += 1
-            stats['total_received'] += btc_amount
-        stats['last_seen'] = timestamp
+        self.address_stats.update(address, is_sender, btc_amount, timestamp)
 
     def get_address_summary(self, address):
         """Get formatted summary of address activity"""
-        stats = self.address_stats[address]
+        # Reading must not create an entry for addresses we have never seen
+        stats = self.address_stats.get(address) or AddressStats()
         entity_label = self.get_address_label(address)
         return (f"{entity_label} "
-                f"[↑{stats['sent_count']}|↓{stats['received_count']}] "
-                f"Total: ↑{stats['total_sent']:.2f}|↓{stats['total_received']:.2f} BTC")
+                f"[↑{stats.sent_count}|↓{stats.received_count}] "
+                f"Total: ↑{stats.total_sent:.2f}|↓{stats.total_received:.2f} BTC")
 
     def identify_address(self, address):
         """Enhanced address identification with pattern matching"""
-        # First check known addresses
-        for entity, info in self.known_addresses.items():
-            if address in info['addresses']:
-                return {
-                    'name': entity,
-                    'type': info['type']
-                }
+        # Known addresses first, then addresses clustered with them, then
+        # exchange prefixes/patterns in declaration order (see AddressClassifier)
+        return self.address_classifier.classify(address)
 
-        # Then check patterns
-        for exchange, patterns in self.exchange_patterns.items():
-            # Check prefixes
-            if any(address.startswith(prefix) for prefix in patterns['prefixes']):
-                return {'name': exchange, 'type': 'exchange'}
-            
-            # Check regex patterns
-            if any(re.match(pattern, address) for pattern in patterns['patterns']):
-                return {'name': exchange, 'type': 'exchange'}
-            
-            # Check known ranges
-            if any(address.startswith(range_prefix) for range_prefix in patterns['known_ranges']):
-                return {'name': exchange, 'type': 'exchange'}
-                
-        return None
+    def determine_transaction_type(self, sender, receiver, classifier=None, attribution=None):
+        """Enhanced transaction type determination including stablecoin mints/burns
 
-    def determine_transaction_type(self, sender, receiver):
-        """Enhanced transaction type determination including stablecoin mints/burns"""
+        classifier replaces the engine's own labels, for profiles that override them.
+        With an attribution (see attribute_transaction) the sending and
+        receiving entities come from every input and output, not just the
+        first address on each side.
+        """
+        identify_address = classifier.classify if classifier else self.identify_address
         
         # Check for stablecoin mint/burn
         for stablecoin, addresses in self.stablecoin_addresses.items():
@@ -850,26 +1220,30 @@ class BitcoinWhaleTracker:
                 return {
                     'type': f'{stablecoin.upper()}_MINT',
                     'from_entity': {'name': f'{stablecoin}_mint', 'type': 'stablecoin'},
-                    'to_entity': self.identify_address(receiver)
+                    'to_entity': identify_address(receiver)
                 }
             # Check for burn
             elif receiver == addresses['burn_address']:
                 return {
                     'type': f'{stablecoin.upper()}_BURN',
-                    'from_entity': self.identify_address(sender),
+                    'from_entity': identify_address(sender),
                     'to_entity': {'name': f'{stablecoin}_burn', 'type': 'stablecoin'}
                 }
             # Check for treasury movement
             elif sender == addresses['treasury'] or receiver == addresses['treasury']:
                 return {
                     'type': f'{stablecoin.upper()}_TREASURY',
-                    'from_entity': self.identify_address(sender),
-                    'to_entity': self.identify_address(receiver)
+                    'from_entity': identify_address(sender),
+                    'to_entity': identify_address(receiver)
                 }
 
         # Continue with existing checks
-        sender_info = self.identify_address(sender)
-        receiver_info = self.identify_address(receiver)
+        if attribution is not None:
+            sender_info = attribution['from_entity']
+            receiver_info = attribution['to_entity']
+        else:
+            sender_info = identify_address(sender)
+            receiver_info = identify_address(receiver)
         
         if sender_info and receiver_info:
             return {
@@ -896,10 +1270,15 @@ class BitcoinWhaleTracker:
                 'to_entity': None
             }
 
-    def process_transaction(self, tx):
-        """Process a single transaction and return if it meets criteria"""
+    def process_transaction(self, tx, record_stats=True, input_value=None, output_value=None):
+        """Process a single transaction and return if it meets criteria
+
+        input_value/output_value (satoshis) may be passed in when already
+        summed, as find_whales does.
+        """
         # Calculate total input value
-        input_value = sum(inp.get('prev_out', {}).get('value', 0) for inp in tx.get('inputs', []))
+        if input_value is None:
+            input_value = sum(inp.get('prev_out', {}).get('value', 0) for inp in tx.get('inputs', []))
         btc_value = input_value / self.satoshi_to_btc
         
         # Only process transactions over minimum BTC threshold
@@ -915,16 +1294,23 @@ class BitcoinWhaleTracker:
         timestamp = datetime.fromtimestamp(tx.get('time', 0))
         
         # Update address statistics
-        self.update_address_stats(sender, True, btc_value, timestamp)
-        self.update_address_stats(receiver, False, btc_value, timestamp)
+        if record_stats:
+            self.update_address_stats(sender, True, btc_value, timestamp)
+            self.update_address_stats(receiver, False, btc_value, timestamp)
         
-        # Get transaction type and entities involved
-        tx_info = self.determine_transaction_type(sender, receiver)
+        # Get transaction type and entities involved, from every input and output
+        attribution = self.attribute_transaction(tx)
+        tx_info = self.determine_transaction_type(sender, receiver, attribution=attribution)
         
         # Calculate fee
-        output_value = sum(out.get('value', 0) for out in tx.get('out', []))
+        if output_value is None:
+            output_value = sum(out.get('value', 0) for out in tx.get('out', []))
         fee = (input_value - output_value) / self.satoshi_to_btc
         
+        # Value the transaction at the price of its own time; cached per hour
+        tx_time = tx.get('time')
+        btc_price = self.price_service.historical_price(tx_time) if tx_time else self.price_service.price()
+        
         return {
             'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
             'transaction_hash': tx.get('hash', 'Unknown'),
@@ -932,12 +1318,51 @@ class BitcoinWhaleTracker:
             'receiver': receiver,
             'btc_volume': round(btc_value, 4),
             'fee_btc': round(fee, 8),
+            'btc_price': btc_price,
             'tx_type': tx_info['type'],
             'from_entity': tx_info['from_entity'],
-            'to_entity': tx_info['to_entity']
+            'to_entity': tx_info['to_entity'],
+            'entity_inputs': attribution['inputs'],
+            'entity_outputs': attribution['outputs'],
+            'entity_flows': attribution['flows']
         }
 
+    def attribute_transaction(self, tx, classifier=None):
+        """Per-entity input/output totals and flows for a transaction, labelled in one batch"""
+        classifier = classifier or self.address_classifier
+        return attribute_transaction(tx, classifier.classify_many, self.satoshi_to_btc)
+
+    def publish(self, whale_tx, tx=None):
+        """Deliver an alert to every profile whose threshold it meets
+
+        Profiles with their own labels re-attribute tx when it is given.
+        """
+        for profile in self.profiles:
+            if whale_tx['btc_volume'] < profile.min_btc:
+                continue
+            alert = whale_tx
+            if profile.classifier is not None:
+                attribution = self.attribute_transaction(tx, profile.classifier) if tx is not None else None
+                tx_info = self.determine_transaction_type(whale_tx['sender'], whale_tx['receiver'],
+                                                          profile.classifier, attribution)
+                alert = dict(whale_tx, tx_type=tx_info['type'],
+                             from_entity=tx_info['from_entity'], to_entity=tx_info['to_entity'])
+                if attribution is not None:
+                    alert.update(entity_inputs=attribution['inputs'], entity_outputs=attribution['outputs'],
+                                 entity_flows=attribution['flows'])
+            message = (profile.formatter or self.format_transaction)(alert)
+            profile.alert_count += 1
+            ALERTS.labels('btc', profile.name).inc()
+            self.dispatcher.submit(message, alert, profile.name)
+
     def print_transaction(self, tx):
+        """Format and print one alert in the default format"""
+        message = self.format_transaction(tx)
+        if not self.quiet:
+            print(message)
+        return message
+
+    def format_transaction(self, tx):
         """Format transaction alerts with clean exchange detection"""
         # Determine emoji based on type and amount
         tx_type = tx['tx_type'].lower()
@@ -958,12 +1383,13 @@ class BitcoinWhaleTracker:
 
         # Format amounts with commas
         btc_formatted = f"{btc_amount:,.0f}"
-        usd_value = btc_amount * 96073.862
-        usd_formatted = f"{usd_value:,.0f}"
+        btc_price = tx.get('btc_price')
+        # Without a known price the USD values are left out rather than shown as $0
+        usd_part = f" ({btc_amount * btc_price:,.0f} USD)" if btc_price else ""
         
         # Format fee
         fee_sats = tx['fee_btc'] * 100000000
-        fee_usd = tx['fee_btc'] * 96073.862
+        fee_usd_part = f" (${tx['fee_btc'] * btc_price:.0f})" if btc_price else ""
         
         # Get entity names (lowercase)
         from_entity = tx['from_entity']['name'].lower() if tx['from_entity'] else "unknown"
@@ -977,9 +1403,9 @@ class BitcoinWhaleTracker:
         
         # Base message
         message = (
-            f"{emoji} {btc_formatted} #btc ({usd_formatted} USD) transferred "
+            f"{emoji} {btc_formatted} #btc{usd_part} transferred "
             f"({clean_type}) from #{from_entity} to #{to_entity} "
-            f"for {fee_sats:.2f} sats (${fee_usd:.0f}) fees"
+            f"for {fee_sats:.2f} sats{fee_usd_part} fees"
         )
         
         # Add exchange transfer prefix if applicable
@@ -990,38 +1416,181 @@ class BitcoinWhaleTracker:
         if btc_amount > 1000:
             message = "𓆟  alert shark 𓆞\n" + message
         
-        print(message)
+        # Flag mempool alerts that have not been mined yet
+        if tx.get('confirmed') is False:
+            message = "⏳ Unconfirmed:\n" + message
+        
         return message
 
-    def monitor_transactions(self):
-        """Main method to track whale transactions"""
+    def poll(self):
+        """Process the blocks mined since the last poll, oldest first
+
+        A block that fails to download stops the batch and raises; the
+        height only advances past blocks that were processed, so the next
+        poll asks for the failed one again.
+        """
+        self.reload_labels()
+        with POLL_SECONDS.labels('btc').time():
+            blocks = self.get_latest_block()
+        
+        for height, transactions, header in self.fetch_blocks(blocks):
+            alerts = self.process_block(height, transactions)
+            if header.get('time'):
+                BLOCK_ALERT_LAG_SECONDS.observe(time.time() - header['time'])
+            self.connect_block(height, header, alerts)
+            self.last_block_height = height
+            self.checkpoint(height)
+
+    def monitor_transactions(self, mempool_source=None):
+        """Main method to track whale transactions
+
+        With a mempool_source, unconfirmed transactions are alerted from a
+        background thread as well, and not alerted again once mined.
+        """
         print(f"Tracking Bitcoin transactions over {self.min_btc} BTC...")
         print("Waiting for new blocks...")
         
+        if mempool_source is not None:
+            threading.Thread(target=self.monitor_mempool, args=(mempool_source,),
+                             name='mempool', daemon=True).start()
+        
         while True:
             try:
-                block_hash = self.get_latest_block()
-                
-                if block_hash:
-                    transactions = self.get_block_transactions(block_hash)
-                    processed_count = 0
-                    whale_count = 0
-                    
-                    for tx in transactions:
-                        processed_count += 1
-                        whale_tx = self.process_transaction(tx)
-                        if whale_tx:
-                            whale_count += 1
-                            self.print_transaction(whale_tx)
-                    
-                    print(f"Processed {processed_count} transactions, found {whale_count} whale movements")
-                
+                self.poll()
                 time.sleep(30)  # Check every 30 seconds
                 
             except Exception as e:
                 print(f"Error in main loop: {e}")
                 time.sleep(30)
 
+    def replay_blocks(self, source, start_height, end_height):
+        """Run recorded blocks through the whale pipeline as fast as possible
+
+        Blocks come from a RecordedBlockSource instead of the API, with no
+        polling delay, so thresholds and labels can be tuned against history.
+        Returns throughput and alert counts.
+        """
+        print(f"Replaying blocks {start_height}-{end_height} for transactions over {self.min_btc} BTC...")
+        block_count = tx_count = 0
+        alert_types = {}
+        started = time.perf_counter()
+        
+        for height, transactions, header in source.blocks(start_height, end_height):
+            alerts = self.process_block(height, transactions)
+            if header.get('hash'):
+                self.chain.connect(height, header['hash'], header.get('prev_block'), alerts)
+            self.last_block_height = height
+            block_count += 1
+            tx_count += len(transactions)
+            for alert in alerts:
+                alert_types[alert['tx_type']] = alert_types.get(alert['tx_type'], 0) + 1
+        
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        report = {
+            'blocks': block_count,
+            'missing_blocks': end_height - start_height + 1 - block_count,
+            'transactions': tx_count,
+            'alerts': sum(alert_types.values()),
+            'alerts_by_type': alert_types,
+            'seconds': elapsed,
+            'blocks_per_second': block_count / elapsed,
+            'transactions_per_second': tx_count / elapsed
+        }
+        
+        print(f"\nReplayed {block_count} blocks ({report['missing_blocks']} not recorded), "
+              f"{tx_count:,} transactions in {elapsed:.2f}s")
+        print(f"{report['blocks_per_second']:,.1f} blocks/s | "
+              f"{report['transactions_per_second']:,.0f} tx/s | {report['alerts']} alerts")
+        for tx_type, count in sorted(alert_types.items(), key=lambda item: -item[1]):
+            print(f"  {tx_type}: {count}")
+        if len(self.profiles) > 1:
+            report['alerts_by_profile'] = {profile.name: profile.alert_count for profile in self.profiles}
+            for name, count in report['alerts_by_profile'].items():
+                print(f"  profile {name}: {count}")
+        return report
+
 if __name__ == "__main__":
-    tracker = BitcoinWhaleTracker(min_btc=1000)  # Changed from 500 to 1000
-    tracker.monitor_transactions()  # Changed from track_whale_transactions to monitor_transactions
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Bitcoin whale transaction monitor')
+    parser.add_argument('--mempool', action='store_true',
+                        help='Also alert on unconfirmed transactions from the live mempool feed')
+    parser.add_argument('--mempool-replay', type=str,
+                        help='Replay unconfirmed transactions from a JSON-lines file instead')
+    parser.add_argument('--replay', type=int, nargs=2, metavar=('START', 'END'),
+                        help='Backtest recorded blocks in a height range instead of monitoring')
+    parser.add_argument('--scan', type=int, nargs=2, metavar=('START', 'END'),
+                        help='Scan recorded blocks in a height range in parallel worker processes, resumably')
+    parser.add_argument('--workers', type=int,
+                        help='Worker processes for --scan (default: one per CPU)')
+    parser.add_argument('--shard-size', type=int, default=500,
+                        help='Blocks per --scan shard')
+    parser.add_argument('--scan-state', type=str, default='scan_state.db',
+                        help='Checkpoint file of completed --scan shards and their merged address stats')
+    parser.add_argument('--scan-output', type=str, default='scan_alerts.jsonl',
+                        help='JSON-lines file for the alerts found by --scan')
+    parser.add_argument('--replay-dir', type=str,
+                        help='Directory of block_<height>.json files to replay, besides the block cache')
+    parser.add_argument('--min-btc', type=float, default=1000,
+                        help='Alert threshold in BTC')
+    parser.add_argument('--profiles', type=str,
+                        help=f"Comma-separated alert profiles to serve from one poller ({', '.join(PROFILES)}); "
+                             f"overrides --min-btc")
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not print individual alerts')
+    parser.add_argument('--state', type=str, default='tracker_state.db',
+                        help='Checkpoint file for stats and chain state across restarts (empty to disable)')
+    parser.add_argument('--metrics-port', type=int, default=9101,
+                        help='Serve Prometheus metrics on localhost at this port (0 to disable)')
+    parser.add_argument('--btc-price', type=float,
+                        help='Value replayed or scanned alerts at a fixed USD price (by default they are '
+                             'not valued, so no price lookups are made)')
+    parser.add_argument('--online-prices', action='store_true',
+                        help='Value replayed or scanned alerts at historical prices looked up from price APIs')
+    parser.add_argument('--label-db', type=str,
+                        help='Compiled label database to use instead of the built-in address tables '
+                             '(see scripts/compile_labels.py); reloaded when the file changes')
+    parser.add_argument('--alert-file', type=str,
+                        help='Also append alerts to this JSON-lines file')
+    parser.add_argument('--webhook', type=str,
+                        help='Also POST alerts as JSON to this URL, e.g. http://127.0.0.1:8787/alerts')
+    args = parser.parse_args()
+    
+    if args.scan:
+        from historical_scan import scan_history
+        try:
+            scan_history(*args.scan, workers=args.workers, shard_size=args.shard_size,
+                         state_path=args.scan_state, output_path=args.scan_output, replay_dir=args.replay_dir,
+                         min_btc=args.min_btc, profiles=args.profiles.split(',') if args.profiles else None,
+                         label_db=args.label_db, btc_price=args.btc_price,
+                         online_prices=args.online_prices)
+        except ValueError as e:
+            print(f"Error: {e}")
+            raise SystemExit(1)
+        raise SystemExit(0)
+    
+    profiles = build_profiles(args.profiles.split(',')) if args.profiles else None
+    tracker = BitcoinWhaleTracker(min_btc=args.min_btc, profiles=profiles,
+                                  state_path=None if args.replay else args.state or None,
+                                  label_db=args.label_db)  # Changed from 500 to 1000
+    tracker.quiet = args.quiet
+    if args.alert_file:
+        tracker.dispatcher.add_sink(FileSink(args.alert_file))
+    if args.webhook:
+        tracker.dispatcher.add_sink(WebhookSink(args.webhook, http=tracker.http))
+    if args.metrics_port and not args.replay:
+        start_metrics_server(args.metrics_port)
+    if args.replay:
+        if args.btc_price or not args.online_prices:
+            tracker.price_service = StaticPriceService({'BTC': args.btc_price} if args.btc_price else {})
+        source = RecordedBlockSource(args.replay_dir, tracker.block_cache)
+        tracker.replay_blocks(source, *args.replay)
+        tracker.close()
+        raise SystemExit(0)
+    
+    mempool_source = None
+    if args.mempool_replay:
+        mempool_source = ReplayMempoolSource(args.mempool_replay)
+    elif args.mempool:
+        mempool_source = BlockchainInfoMempoolSource(tracker.http)
+    tracker.monitor_transactions(mempool_source)  # Changed from track_whale_transactions to monitor_transactions
\ No newline at end of file
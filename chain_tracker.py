@@ -0,0 +1,96 @@
+from collections import deque
+
+
+class ChainTipTracker:
+    """Bounded window of recent main-chain blocks with reorg detection
+
+    Keeps (height, hash, prev_hash) for the last `depth` blocks plus the
+    whale alerts emitted from each one. Connecting a block that does not
+    extend the current tip orphans the blocks it replaces. Their alerts are
+    held back until the new branch is fully connected; alerts for
+    transactions that were mined again on the new branch are moved over,
+    and the rest are handed out by take_retractions().
+    """
+
+    def __init__(self, depth=1000):
+        self.depth = depth
+        self.blocks = deque()  # (height, hash, prev_hash), oldest first
+        self.heights = {}  # block hash -> height, for O(1) duplicate checks
+        self.by_height = {}  # height -> block hash on the current chain
+        self.alerts = {}  # block hash -> {tx hash: alert}
+        self.alert_blocks = {}  # tx hash -> block hash it was announced from
+        self.pending_retractions = {}  # tx hash -> alert from an orphaned block
+
+    def __contains__(self, block_hash):
+        return block_hash in self.heights
+
+    def __len__(self):
+        return len(self.blocks)
+
+    @property
+    def tip(self):
+        """(height, hash, prev_hash) of the newest block, or None"""
+        return self.blocks[-1] if self.blocks else None
+
+    def is_fork(self, height, block_hash):
+        """True if we hold a different block at this height"""
+        known = self.by_height.get(height)
+        return known is not None and known != block_hash
+
+    def is_alerted(self, tx_hash):
+        """True if an alert for this transaction was already emitted"""
+        return tx_hash in self.alert_blocks
+
+    def _drop(self, block, orphaned):
+        height, block_hash, _ = block
+        del self.heights[block_hash]
+        if self.by_height.get(height) == block_hash:
+            del self.by_height[height]
+        block_alerts = self.alerts.pop(block_hash, {})
+        if orphaned:
+            self.pending_retractions.update(block_alerts)
+        else:
+            for tx_hash in block_alerts:
+                if self.alert_blocks.get(tx_hash) == block_hash:
+                    del self.alert_blocks[tx_hash]
+
+    def connect(self, height, block_hash, prev_hash, alerts=()):
+        """Make a block the new tip and return the (height, hash) pairs it orphaned"""
+        if block_hash in self.heights:
+            return []
+
+        # Everything at or above this height is on a losing branch now, and
+        # so is a parent at height - 1 that this block does not build on
+        orphaned = []
+        while self.blocks and (
+            self.blocks[-1][0] >= height
+            or (prev_hash and self.blocks[-1][0] == height - 1 and self.blocks[-1][1] != prev_hash)
+        ):
+            block = self.blocks.pop()
+            self._drop(block, orphaned=True)
+            orphaned.append(block[:2])
+
+        self.blocks.append((height, block_hash, prev_hash))
+        self.heights[block_hash] = height
+        self.by_height[height] = block_hash
+
+        block_alerts = {}
+        for alert in alerts:
+            tx_hash = alert['transaction_hash']
+            block_alerts[tx_hash] = alert
+            self.pending_retractions.pop(tx_hash, None)
+            self.alert_blocks[tx_hash] = block_hash
+        self.alerts[block_hash] = block_alerts
+
+        while len(self.blocks) > self.depth:
+            self._drop(self.blocks.popleft(), orphaned=False)
+
+        return orphaned
+
+    def take_retractions(self):
+        """Return alerts from orphaned blocks that the new branch did not confirm"""
+        retracted = list(self.pending_retractions.values())
+        for tx_hash in self.pending_retractions:
+            self.alert_blocks.pop(tx_hash, None)
+        self.pending_retractions.clear()
+        return retracted
@@ -0,0 +1,17 @@
+import importlib.util
+import sys
+import types
+
+# keys.py holds API credentials and is not committed; the modules that
+# import it get placeholders, so their offline paths can be tested
+if importlib.util.find_spec('keys') is None:
+    keys = types.ModuleType('keys')
+    for name in ('ETHERSCAN_API_KEY', 'YOUR_ETHERSCAN_API_KEY', 'TRON_API_KEY', 'SOLANA_RPC_URL', 'bearer_token',
+                 'consumer_key', 'consumer_secret', 'access_token', 'access_token_secret'):
+        setattr(keys, name, 'test')
+    sys.modules['keys'] = keys
+
+# test_tweet.py posts to Twitter with tweepy and real credentials
+collect_ignore = []
+if importlib.util.find_spec('tweepy') is None:
+    collect_ignore.append('test_tweet.py')
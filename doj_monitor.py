@@ -1,13 +1,20 @@
-import requests
 import json
 import time
 from datetime import datetime
 import logging
 from pathlib import Path
 
+from block_cache import BlockCache
+from http_client import get_client
+from metrics import ALERTS, POLL_SECONDS, TRANSACTIONS, start_metrics_server
+from price_service import get_price_service
+
 class DOJMonitor:
     def __init__(self):
         self.setup_logging()
+        self.http = get_client()  # Shared keep-alive connection pool
+        self.block_cache = BlockCache('block_cache')  # Shared with the BTC monitor
+        self.price_service = get_price_service()  # Cached, so logging a sweep costs one price call
         
         # DOJ and related agencies' Bitcoin addresses
         self.monitored_addresses = {
@@ -78,18 +85,13 @@ class DOJMonitor:
     def check_address_balance(self, address: str) -> dict:
         """Check current balance and transactions for an address"""
         try:
-            response = requests.get(
-                f'https://blockchain.info/address/{address}?format=json',
-                timeout=10
-            )
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'balance': data['final_balance'] / 100000000,  # Convert satoshis to BTC
-                    'total_received': data['total_received'] / 100000000,
-                    'total_sent': data['total_sent'] / 100000000,
-                    'n_tx': data['n_tx']
-                }
+            data = self.http.get_json(f'https://blockchain.info/address/{address}?format=json')
+            return {
+                'balance': data['final_balance'] / 100000000,  # Convert satoshis to BTC
+                'total_received': data['total_received'] / 100000000,
+                'total_sent': data['total_sent'] / 100000000,
+                'n_tx': data['n_tx']
+            }
         except Exception as e:
             self.logger.error(f"Error checking address {address}: {e}")
         return None
@@ -104,44 +106,37 @@ class DOJMonitor:
     def get_transaction_details(self, address: str, tx_hash: str) -> dict:
         """Get detailed transaction information"""
         try:
-            response = requests.get(
-                f'https://blockchain.info/rawtx/{tx_hash}',
-                timeout=10
-            )
-            if response.status_code == 200:
-                tx = response.json()
-                
-                # Calculate input and output addresses
-                inputs = [inp['prev_out']['addr'] for inp in tx['inputs'] if 'prev_out' in inp]
-                outputs = [out['addr'] for out in tx['out']]
-                
-                # Determine if address is sender or receiver
-                is_sender = address in inputs
-                
-                # Get the other party's address
-                other_addresses = outputs if is_sender else inputs
-                other_address = next((addr for addr in other_addresses if addr != address), "Unknown")
-                
-                return {
-                    'hash': tx_hash,
-                    'fee': tx['fee'] / 100000000,  # Convert satoshis to BTC
-                    'other_party': self.identify_address_type(other_address),
-                    'other_address': other_address
-                }
+            # Confirmed transactions never change, so serve them from the cache
+            tx = self.block_cache.load(tx_hash)
+            if tx is None:
+                tx = self.http.get_json(f'https://blockchain.info/rawtx/{tx_hash}')
+                if tx.get('block_height'):
+                    self.block_cache.store(tx_hash, json.dumps(tx).encode(), tx['block_height'], fmt='rawtx')
+            
+            # Calculate input and output addresses
+            inputs = [inp['prev_out']['addr'] for inp in tx['inputs'] if 'prev_out' in inp]
+            outputs = [out['addr'] for out in tx['out']]
+            
+            # Determine if address is sender or receiver
+            is_sender = address in inputs
+            
+            # Get the other party's address
+            other_addresses = outputs if is_sender else inputs
+            other_address = next((addr for addr in other_addresses if addr != address), "Unknown")
+            
+            return {
+                'hash': tx_hash,
+                'fee': tx['fee'] / 100000000,  # Convert satoshis to BTC
+                'other_party': self.identify_address_type(other_address),
+                'other_address': other_address
+            }
         except Exception as e:
             self.logger.error(f"Error getting transaction details: {e}")
             return None
 
     def get_btc_price(self) -> float:
         """Get current Bitcoin price in USD"""
-        try:
-            response = requests.get(
-                "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
-            )
-            return float(response.json()['bitcoin']['usd'])
-        except Exception as e:
-            self.logger.error(f"Error getting BTC price: {e}")
-            return 0
+        return self.price_service.price('BTC') or 0.0
 
     def log_transaction(self, agency: str, address: str, amount: float, tx_type: str, tx_hash: str):
         """Log transaction details in btc_monitor style"""
@@ -163,6 +158,7 @@ class DOJMonitor:
                 f"{'=' * 50}"
             )
             self.logger.info(message)
+            ALERTS.labels('doj', agency).inc()
 
     def monitor_addresses(self):
         """Main monitoring loop"""
@@ -170,44 +166,53 @@ class DOJMonitor:
         
         while True:
             try:
-                for agency, data in self.monitored_addresses.items():
-                    for address in data['addresses']:
-                        response = requests.get(
-                            f'https://blockchain.info/address/{address}?format=json',
-                            timeout=10
-                        )
-                        
-                        if response.status_code == 200:
-                            addr_data = response.json()
-                            current_data = {
-                                'balance': addr_data['final_balance'] / 100000000,
-                                'total_received': addr_data['total_received'] / 100000000,
-                                'total_sent': addr_data['total_sent'] / 100000000,
-                                'n_tx': addr_data['n_tx']
-                            }
-                            
-                            # Get latest transaction hash
-                            if addr_data['txs']:
-                                latest_tx = addr_data['txs'][0]['hash']
-                            else:
-                                latest_tx = None
+                # Fetch every monitored address at once instead of one by one
+                watched = [
+                    (data['description'], address)
+                    for data in self.monitored_addresses.values()
+                    for address in data['addresses']
+                ]
+                with POLL_SECONDS.labels('doj').time():
+                    responses = self.http.get_json_many(
+                        [f'https://blockchain.info/address/{address}?format=json' for _, address in watched]
+                    )
+                TRANSACTIONS.labels('doj').inc(len(watched))
+                
+                for (agency, address), addr_data in zip(watched, responses):
+                    if isinstance(addr_data, Exception):
+                        self.logger.error(f"Error checking address {address}: {addr_data}")
+                        continue
+                    
+                    current_data = {
+                        'balance': addr_data['final_balance'] / 100000000,
+                        'total_received': addr_data['total_received'] / 100000000,
+                        'total_sent': addr_data['total_sent'] / 100000000,
+                        'n_tx': addr_data['n_tx']
+                    }
+                    
+                    # Get latest transaction hash
+                    if addr_data['txs']:
+                        latest_tx = addr_data['txs'][0]['hash']
+                    else:
+                        latest_tx = None
 
-                            previous_data = self.address_history.get(address, {
-                                'balance': 0,
-                                'total_sent': 0,
-                                'total_received': 0
-                            })
-                            
-                            if current_data['total_sent'] > previous_data['total_sent'] and latest_tx:
-                                amount = current_data['total_sent'] - previous_data['total_sent']
-                                self.log_transaction(data['description'], address, amount, "Funds Sent", latest_tx)
-                            
-                            if current_data['total_received'] > previous_data['total_received'] and latest_tx:
-                                amount = current_data['total_received'] - previous_data['total_received']
-                                self.log_transaction(data['description'], address, amount, "Funds Received", latest_tx)
-                            
-                            self.address_history[address] = current_data
-                            self.save_address_history()
+                    previous_data = self.address_history.get(address, {
+                        'balance': 0,
+                        'total_sent': 0,
+                        'total_received': 0
+                    })
+                    
+                    if current_data['total_sent'] > previous_data['total_sent'] and latest_tx:
+                        amount = current_data['total_sent'] - previous_data['total_sent']
+                        self.log_transaction(agency, address, amount, "Funds Sent", latest_tx)
+                    
+                    if current_data['total_received'] > previous_data['total_received'] and latest_tx:
+                        amount = current_data['total_received'] - previous_data['total_received']
+                        self.log_transaction(agency, address, amount, "Funds Received", latest_tx)
+                    
+                    self.address_history[address] = current_data
+                
+                self.save_address_history()
                 
                 time.sleep(300)  # Check every 5 minutes
                 
@@ -216,5 +221,6 @@ class DOJMonitor:
                 time.sleep(60)  # Wait 1 minute on error
 
 if __name__ == "__main__":
+    start_metrics_server(9103)
     monitor = DOJMonitor()
     monitor.monitor_addresses()
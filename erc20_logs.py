@@ -0,0 +1,252 @@
+import itertools
+import re
+from decimal import ROUND_CEILING, Decimal
+
+import numpy as np
+
+from http_client import get_client
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+ZERO_ADDRESS = '0x' + '00' * 20
+
+# How providers word a refused eth_getLogs that a smaller block range would
+# satisfy (Infura, Alchemy, QuickNode, geth/erigon limits)
+RESULT_CAP = re.compile(r'more than \d+ results|too many|response size|range (is )?too (large|wide)|exceed', re.I)
+
+
+class JSONRPCError(RuntimeError):
+    """An error object returned by a JSON-RPC endpoint"""
+
+    def __init__(self, code, message, data=None):
+        super().__init__(f"JSON-RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+    @property
+    def rate_limited(self):
+        return 'rate' in str(self.message).lower()
+
+    @property
+    def result_cap(self):
+        """True when the request asked for more results than the endpoint serves at once"""
+        return not self.rate_limited and bool(RESULT_CAP.search(str(self.message)))
+
+
+class JSONRPCLogSource:
+    """Ethereum logs and block numbers from any JSON-RPC endpoint
+
+    Requests go through the shared HTTP client (on its loop) and, when a
+    rate_limiter is given, take one of its tokens each. Transient HTTP
+    failures are retried, and so are rate-limit errors after holding back
+    the limiter; other JSON-RPC errors raise JSONRPCError.
+    """
+
+    def __init__(self, url, http=None, rate_limiter=None, timeout=30, retries=3):
+        self.url = url
+        self.http = http or get_client()
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.retries = retries
+        self.request_ids = itertools.count(1)
+        self.calls = 0
+
+    async def call(self, method, params):
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            self.calls += 1
+            reply = await self.http.post(
+                self.url, {'jsonrpc': '2.0', 'id': next(self.request_ids), 'method': method, 'params': params},
+                timeout=self.timeout, retries=self.retries,
+                parse=lambda response: response.json(content_type=None)
+            )
+            error = reply.get('error')
+            if not error:
+                return reply['result']
+            error = JSONRPCError(error.get('code'), error.get('message'), error.get('data'))
+            if not error.rate_limited or self.rate_limiter is None or attempt >= self.retries:
+                raise error
+            self.rate_limiter.penalize(1.0 * (attempt + 1))
+
+    async def block_number(self):
+        return int(await self.call('eth_blockNumber', []), 16)
+
+    async def get_logs(self, addresses, from_block, to_block, topics=(TRANSFER_TOPIC,)):
+        """Logs of all the given contracts in an inclusive block range, in one request"""
+        return await self.call('eth_getLogs', [{
+            'address': list(addresses),
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+            'topics': list(topics)
+        }])
+
+
+class StubLogSource:
+    """In-memory stand-in for JSONRPCLogSource, serving a fixed list of raw logs
+
+    max_results mimics a provider's cap on eth_getLogs results: larger
+    queries fail the way such providers answer them.
+    """
+
+    def __init__(self, logs=(), latest_block=None, max_results=None):
+        self.logs = sorted(logs, key=lambda log: (int(log['blockNumber'], 16), int(log['logIndex'], 16)))
+        self.latest_block = latest_block
+        self.max_results = max_results
+        self.calls = 0
+
+    async def block_number(self):
+        self.calls += 1
+        if self.latest_block is not None:
+            return self.latest_block
+        return int(self.logs[-1]['blockNumber'], 16) if self.logs else 0
+
+    async def get_logs(self, addresses, from_block, to_block, topics=(TRANSFER_TOPIC,)):
+        self.calls += 1
+        addresses = {address.lower() for address in addresses}
+        logs = [log for log in self.logs
+                if log['address'].lower() in addresses
+                and from_block <= int(log['blockNumber'], 16) <= to_block
+                and all(topic is None or log['topics'][i:i + 1] == [topic] for i, topic in enumerate(topics))]
+        if self.max_results is not None and len(logs) > self.max_results:
+            raise JSONRPCError(-32005, f"query returned more than {self.max_results} results")
+        return logs
+
+
+def transfer_log(contract, sender, recipient, value, block, log_index, tx_hash=None):
+    """A raw Transfer log as eth_getLogs returns it, e.g. for a StubLogSource"""
+    def topic(address):
+        return '0x' + '00' * 12 + address.lower()[2:]
+
+    return {
+        'address': contract.lower(),
+        'topics': [TRANSFER_TOPIC, topic(sender), topic(recipient)],
+        'data': '0x' + format(value, '064x'),
+        'blockNumber': hex(block),
+        'logIndex': hex(log_index),
+        'transactionHash': tx_hash or '0x' + format(block, '032x') + format(log_index, '032x'),
+        'removed': False
+    }
+
+
+def _limbs(value):
+    """A uint256 as four uint64 limbs, most significant first"""
+    return [(value >> shift) & 0xFFFFFFFFFFFFFFFF for shift in (192, 128, 64, 0)]
+
+
+class TransferLogs:
+    """A batch of raw ERC-20 Transfer logs decoded into columns
+
+    tokens is a list of {'symbol', 'address', 'decimals'} dicts; logs of
+    other contracts, logs that are not standard Transfers (three topics,
+    one 32-byte word of data) and removed logs are skipped and counted.
+    Topics and data are hex-decoded in one pass each into byte matrices:
+    sender and recipient are (n, 20) uint8 arrays and amounts are (n, 4)
+    uint64 limbs of the uint256 value, so thresholds compare exactly
+    without converting amounts to floats.
+    """
+
+    def __init__(self, logs, tokens):
+        self.tokens = list(tokens)
+        token_index = {token['address'].lower(): i for i, token in enumerate(self.tokens)}
+        valid = [log for log in logs
+                 if not log.get('removed') and len(log['topics']) == 3 and len(log['data']) == 66
+                 and log['topics'][0] == TRANSFER_TOPIC and log['address'].lower() in token_index]
+        self.skipped = len(logs) - len(valid)
+        n = len(valid)
+
+        self.token = np.fromiter((token_index[log['address'].lower()] for log in valid), dtype=np.int16, count=n)
+        self.block = np.fromiter((int(log['blockNumber'], 16) for log in valid), dtype=np.int64, count=n)
+        self.log_index = np.fromiter((int(log['logIndex'], 16) for log in valid), dtype=np.int64, count=n)
+        self.hashes = [log['transactionHash'] for log in valid]
+        self.timestamps = [log.get('blockTimestamp') for log in valid]
+
+        topics = np.frombuffer(bytes.fromhex(''.join(log['topics'][1][2:] + log['topics'][2][2:] for log in valid)),
+                               dtype=np.uint8).reshape(n, 64)
+        self.sender = topics[:, 12:32]
+        self.recipient = topics[:, 44:64]
+        self.limbs = np.frombuffer(bytes.fromhex(''.join(log['data'][2:] for log in valid)),
+                                   dtype='>u8').reshape(n, 4).astype(np.uint64)
+
+        self.mints = ~self.sender.any(axis=1)
+        self.burns = ~self.recipient.any(axis=1)
+
+    def __len__(self):
+        return len(self.block)
+
+    def raw_amount(self, i):
+        """The exact integer amount of transfer i, in the token's base units"""
+        amount = 0
+        for limb in self.limbs[i]:
+            amount = (amount << 64) | int(limb)
+        return amount
+
+    def at_least(self, min_amount):
+        """Mask of transfers worth at least min_amount whole tokens, compared exactly
+
+        The threshold is scaled by each token's decimals into a uint256 and
+        compared limb by limb, most significant first.
+        """
+        thresholds = np.array([
+            _limbs(int((Decimal(str(min_amount)).scaleb(token['decimals'])).to_integral_value(ROUND_CEILING)))
+            for token in self.tokens
+        ], dtype=np.uint64).reshape(len(self.tokens), 4)[self.token]
+        greater = np.zeros(len(self), dtype=bool)
+        equal = np.ones(len(self), dtype=bool)
+        for limb in range(4):
+            greater |= equal & (self.limbs[:, limb] > thresholds[:, limb])
+            equal &= self.limbs[:, limb] == thresholds[:, limb]
+        return greater | equal
+
+    def indexes(self, mask):
+        """Indexes of the transfers in mask, in (block, log index) order"""
+        selected = np.flatnonzero(mask)
+        return selected[np.lexsort((self.log_index[selected], self.block[selected]))]
+
+    def over_threshold(self, min_amount):
+        return self.indexes(self.at_least(min_amount))
+
+    def touches(self, addresses):
+        """Mask of transfers sent from or to any of the given addresses"""
+        keys = np.frombuffer(b''.join(bytes.fromhex(address.lower()[2:]) for address in addresses),
+                             dtype=np.uint8).reshape(-1, 20).view('V20').ravel()
+        return (np.isin(np.ascontiguousarray(self.sender).view('V20').ravel(), keys)
+                | np.isin(np.ascontiguousarray(self.recipient).view('V20').ravel(), keys))
+
+    def columns(self, indexes):
+        """The selected transfers as a dict of arrays, e.g. for np.savez
+
+        Hashes are (n, 32) uint8 and timestamps -1 where the endpoint
+        did not include blockTimestamp.
+        """
+        return {
+            'block': self.block[indexes],
+            'log_index': self.log_index[indexes],
+            'token': self.token[indexes],
+            'sender': self.sender[indexes],
+            'recipient': self.recipient[indexes],
+            'limbs': self.limbs[indexes],
+            'tx_hash': np.frombuffer(bytes.fromhex(''.join(self.hashes[i][2:] for i in indexes)),
+                                     dtype=np.uint8).reshape(len(indexes), 32),
+            'timestamp': np.array([int(self.timestamps[i], 16) if self.timestamps[i] else -1 for i in indexes],
+                                  dtype=np.int64)
+        }
+
+    def transfer(self, i):
+        """Transfer i as a dict; amount is a Decimal of whole tokens, value the raw integer"""
+        token = self.tokens[self.token[i]]
+        value = self.raw_amount(i)
+        timestamp = self.timestamps[i]
+        return {
+            'token': token['symbol'],
+            'contract': token['address'],
+            'hash': self.hashes[i],
+            'block': int(self.block[i]),
+            'log_index': int(self.log_index[i]),
+            'from': '0x' + self.sender[i].tobytes().hex(),
+            'to': '0x' + self.recipient[i].tobytes().hex(),
+            'value': value,
+            'amount': Decimal(value).scaleb(-token['decimals']),
+            'timestamp': int(timestamp, 16) if timestamp else None
+        }
@@ -1,15 +1,13 @@
+from price_service import get_price_service
+
 def test_display():
     """Test function to display Ethereum price status"""
-    import requests
     import json
     from pathlib import Path
     import time
     
     # Constants and API endpoints
     ETH_ATH = 10000  # Ethereum's all-time high
-    COINGECKO_API = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin,ethereum&vs_currencies=usd"
-    CRYPTOCOMPARE_API = "https://min-api.cryptocompare.com/data/pricemulti?fsyms=ETH,BTC&tsyms=USD"
-    COINSTATS_API = "https://api.coinstats.app/public/v1/markets?coinId="
     PRICE_HISTORY_FILE = Path('eth_price_history.json')
 
     # Add Unicode arrow constants
@@ -39,22 +37,10 @@ def test_display():
 
     def get_crypto_prices():
         """Get both ETH and BTC prices for ratio calculation"""
-        try:
-            response = requests.get(COINGECKO_API, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return float(data["ethereum"]["usd"]), float(data["bitcoin"]["usd"])
-        except Exception as e:
-            print(f"Error fetching from CoinGecko: {e}")
-            try:
-                response = requests.get(CRYPTOCOMPARE_API, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                return float(data["ETH"]["USD"]), float(data["BTC"]["USD"])
-            except Exception as e:
-                print(f"Error fetching from CryptoCompare: {e}")
-                return 0.0, 0.0
-
+        # One cached request serves both symbols (and the BTC price bar)
+        prices = get_price_service().prices()
+        return prices.get('ETH', 0.0), prices.get('BTC', 0.0)
+            
     def get_progress_bar(percentage):
         """Ethereum-styled progress bar using blue squares"""
         filled = min(int(percentage / 10), 10)
@@ -0,0 +1,61 @@
+import re
+
+EVM_ADDRESS = re.compile(r'0x[0-9a-fA-F]{40}')
+
+
+def normalize_evm_address(address):
+    """The 20 address bytes of a '0x' + 40 hex digit address, or None if it is not one
+
+    Case is ignored, so checksummed (EIP-55) and lowercase spellings of
+    an address give the same key.
+    """
+    if not isinstance(address, str):
+        return None
+    address = address.strip()
+    if not EVM_ADDRESS.fullmatch(address):
+        return None
+    return bytes.fromhex(address[2:])
+
+
+class EVMLabelIndex:
+    """Entity labels for EVM addresses, keyed by their normalized 20 bytes
+
+    Built once from tables shaped like {entity: {'type', 'addresses'}}.
+    Lookups are one dict access whatever the spelling of the address.
+    Entries that are not valid addresses are skipped, and an address
+    listed by two entities keeps the first; both are recorded in problems
+    so the caller can report them.
+    """
+
+    def __init__(self, known_addresses=None):
+        self.index = {}  # 20-byte address -> shared {'name', 'type'} label
+        self.labels = {}  # entity -> label
+        self.problems = []
+        if known_addresses:
+            self.add(known_addresses)
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, known_addresses):
+        for entity, info in known_addresses.items():
+            label = self.labels.get(entity)
+            if label is None:
+                label = self.labels[entity] = {'name': entity, 'type': info['type']}
+            elif label['type'] != info['type']:
+                self.problems.append(f"{entity} is listed as both {label['type']} and {info['type']}; "
+                                     f"keeping {label['type']}")
+            for address in info['addresses']:
+                key = normalize_evm_address(address)
+                if key is None:
+                    self.problems.append(f"{entity}: {address!r} is not a valid address")
+                    continue
+                existing = self.index.setdefault(key, label)
+                if existing is not label:
+                    self.problems.append(f"{address} is listed by both {existing['name']} and {entity}; "
+                                         f"keeping {existing['name']}")
+
+    def get(self, address):
+        """The label of an address in any spelling, or None; the dict is shared"""
+        key = normalize_evm_address(address)
+        return self.index.get(key) if key is not None else None
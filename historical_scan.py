@@ -0,0 +1,258 @@
+import json
+import multiprocessing
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from address_stats import AddressStats
+from block_replay import RecordedBlockSource
+from btc_monitor import BitcoinWhaleTracker
+from price_service import StaticPriceService
+from subscriber_profiles import build_profiles
+
+# Per-process scan settings, set by _init_worker
+_worker_config = None
+
+
+def plan_shards(start_height, end_height, shard_size):
+    """Split an inclusive height range into (start, end) shards of shard_size blocks"""
+    return [(start, min(start + shard_size - 1, end_height))
+            for start in range(start_height, end_height + 1, shard_size)]
+
+
+def _init_worker(config):
+    global _worker_config
+    _worker_config = config
+
+
+def _new_tracker(config):
+    profiles = build_profiles(config['profiles']) if config['profiles'] else None
+    tracker = BitcoinWhaleTracker(min_btc=config['min_btc'], profiles=profiles,
+                                  block_cache_dir=config['block_cache_dir'], label_db=config['label_db'])
+    tracker.quiet = True
+    # Whale addresses only; a shard never needs to spill
+    tracker.address_stats.max_entries = 10_000_000
+    if config['btc_price'] or not config['online_prices']:
+        # Offline unless asked: without a fixed price, alerts carry no USD value
+        tracker.price_service = StaticPriceService({'BTC': config['btc_price']} if config['btc_price'] else {})
+    return tracker
+
+
+def scan_shard(shard):
+    """Run one shard of blocks through a fresh tracker, in a worker process
+
+    Every shard starts from the same empty state (stats, clusters, chain
+    window), so its result does not depend on which worker ran it or on
+    what that worker ran before.
+    """
+    config = _worker_config
+    start_height, end_height = shard
+    started = time.perf_counter()
+    tracker = _new_tracker(config)
+    try:
+        source = RecordedBlockSource(config['replay_dir'], tracker.block_cache)
+
+        block_count = tx_count = 0
+        alerts = []
+        for height, transactions, header in source.blocks(start_height, end_height):
+            for index, alert in enumerate(tracker.process_block(height, transactions)):
+                alerts.append(dict(alert, block_height=height, block_position=index))
+            block_count += 1
+            tx_count += len(transactions)
+
+        return {
+            'start': start_height,
+            'end': end_height,
+            'blocks': block_count,
+            'transactions': tx_count,
+            'alerts': alerts,
+            'alerts_by_profile': {profile.name: profile.alert_count for profile in tracker.profiles},
+            'stats': [stats.as_row(address) for address, stats in tracker.address_stats.items()],
+            'seconds': time.perf_counter() - started
+        }
+    finally:
+        # Workers run many shards; each one's sink thread and files go with it
+        tracker.close()
+
+
+class ScanCheckpoint:
+    """Completed shards of a historical scan in a SQLite (WAL) file
+
+    Each shard's totals, alerts and address stats are written in one
+    transaction when it finishes, so an interrupted scan resumes with the
+    shards still missing. The file is bound to one scan configuration.
+    """
+
+    def __init__(self, path, config):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS scan_shards ("
+                "start INTEGER PRIMARY KEY, end_height INTEGER, blocks INTEGER, transactions INTEGER, "
+                "alerts TEXT, alerts_by_profile TEXT, seconds REAL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS scan_address_stats ("
+                "shard INTEGER, address TEXT, received_count INTEGER, sent_count INTEGER, "
+                "total_received REAL, total_sent REAL, last_seen REAL, PRIMARY KEY (shard, address))"
+            )
+            # Merged result, in the checkpoint/spill layout so a tracker can load it
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS address_stats ("
+                "address TEXT PRIMARY KEY, received_count INTEGER, sent_count INTEGER, "
+                "total_received REAL, total_sent REAL, last_seen REAL)"
+            )
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+            if row is None:
+                self.db.execute("INSERT INTO meta VALUES ('config', ?)", (json.dumps(config, sort_keys=True),))
+            elif json.loads(row[0]) != config:
+                raise ValueError(f"{path} belongs to a scan with different settings: {row[0]}")
+
+    def completed(self):
+        return {row[0] for row in self.db.execute("SELECT start FROM scan_shards")}
+
+    def save(self, result):
+        shard = result['start']
+        with self.db:
+            self.db.execute("DELETE FROM scan_address_stats WHERE shard = ?", (shard,))
+            self.db.executemany(
+                "INSERT INTO scan_address_stats VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(shard, *row) for row in result['stats']]
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO scan_shards VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (shard, result['end'], result['blocks'], result['transactions'],
+                 json.dumps(result['alerts']), json.dumps(result['alerts_by_profile']), result['seconds'])
+            )
+
+    def shards(self):
+        """Saved shard results, by height"""
+        for start, end, blocks, transactions, alerts, alerts_by_profile, seconds in self.db.execute(
+                "SELECT * FROM scan_shards ORDER BY start"):
+            yield {'start': start, 'end': end, 'blocks': blocks, 'transactions': transactions,
+                   'alerts': json.loads(alerts), 'alerts_by_profile': json.loads(alerts_by_profile),
+                   'seconds': seconds}
+
+    def merge_address_stats(self):
+        """Combine the per-shard stats into address_stats, adding shards in height order"""
+        merged = {}
+        for shard, address, *row in self.db.execute(
+                "SELECT * FROM scan_address_stats ORDER BY shard, address"):
+            stats = AddressStats.from_row(row)
+            total = merged.get(address)
+            if total is None:
+                merged[address] = stats
+                continue
+            total.received_count += stats.received_count
+            total.sent_count += stats.sent_count
+            total.total_received += stats.total_received
+            total.total_sent += stats.total_sent
+            if stats.last_seen and (total.last_seen is None or stats.last_seen > total.last_seen):
+                total.last_seen = stats.last_seen
+        with self.db:
+            self.db.execute("DELETE FROM address_stats")
+            self.db.executemany("INSERT INTO address_stats VALUES (?, ?, ?, ?, ?, ?)",
+                                [stats.as_row(address) for address, stats in sorted(merged.items())])
+        return len(merged)
+
+    def close(self):
+        self.db.close()
+
+
+def scan_history(start_height, end_height, workers=None, shard_size=500, state_path='scan_state.db',
+                 output_path=None, replay_dir=None, block_cache_dir='block_cache', min_btc=1000,
+                 profiles=None, label_db=None, btc_price=None, online_prices=False):
+    """Whale detection over a height range of recorded blocks, in parallel
+
+    The range is split into shards that worker processes read from the
+    block cache or replay_dir. Finished shards are checkpointed to
+    state_path, and a rerun with the same settings only scans the rest.
+    Alerts are merged in (height, position) order and written to
+    output_path as JSON lines; per-shard address stats are summed into the
+    address_stats table of state_path. Clustering starts afresh in each
+    shard, so co-spends are not linked across shard boundaries.
+    Alerts are valued at btc_price, or looked up by time only with
+    online_prices; otherwise they have no USD value.
+    Returns a report like BitcoinWhaleTracker.replay_blocks.
+    """
+    config = {
+        'start': start_height, 'end': end_height, 'shard_size': shard_size, 'min_btc': min_btc,
+        'profiles': list(profiles or []), 'label_db': label_db, 'btc_price': btc_price,
+        'online_prices': online_prices, 'replay_dir': replay_dir, 'block_cache_dir': block_cache_dir
+    }
+    checkpoint = ScanCheckpoint(state_path, config)
+    shards = plan_shards(start_height, end_height, shard_size)
+    done = checkpoint.completed()
+    pending = [shard for shard in shards if shard[0] not in done]
+    workers = max(1, min(workers or multiprocessing.cpu_count(), len(pending) or 1))
+    print(f"Scanning blocks {start_height}-{end_height} in {len(shards)} shards "
+          f"({len(shards) - len(pending)} already done) with {workers} workers...")
+
+    started = time.perf_counter()
+    scanned_blocks = 0
+    if pending:
+        # Spawned workers do not inherit the parent's threads (HTTP loop, metrics)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(config,)) as executor:
+            futures = {executor.submit(scan_shard, shard): shard for shard in pending}
+            for finished, future in enumerate(as_completed(futures), 1):
+                shard = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error scanning blocks {shard[0]}-{shard[1]}: {e}")
+                    continue
+                checkpoint.save(result)
+                scanned_blocks += result['blocks']
+                print(f"Shard {shard[0]}-{shard[1]}: {result['blocks']} blocks, {len(result['alerts'])} alerts "
+                      f"in {result['seconds']:.1f}s ({finished}/{len(pending)})")
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    block_count = tx_count = 0
+    alert_types = {}
+    alerts_by_profile = {}
+    completed = 0
+    output = open(output_path, 'w', encoding='utf-8') if output_path else None
+    try:
+        for shard in checkpoint.shards():
+            completed += 1
+            block_count += shard['blocks']
+            tx_count += shard['transactions']
+            for name, count in shard['alerts_by_profile'].items():
+                alerts_by_profile[name] = alerts_by_profile.get(name, 0) + count
+            for alert in sorted(shard['alerts'], key=lambda a: (a['block_height'], a['block_position'])):
+                alert_types[alert['tx_type']] = alert_types.get(alert['tx_type'], 0) + 1
+                if output is not None:
+                    output.write(json.dumps(alert, ensure_ascii=False) + '\n')
+    finally:
+        if output is not None:
+            output.close()
+    address_count = checkpoint.merge_address_stats()
+    checkpoint.close()
+
+    report = {
+        'shards': len(shards),
+        'failed_shards': len(shards) - completed,
+        'blocks': block_count,
+        'missing_blocks': end_height - start_height + 1 - block_count,
+        'transactions': tx_count,
+        'alerts': sum(alert_types.values()),
+        'alerts_by_type': alert_types,
+        'alerts_by_profile': alerts_by_profile,
+        'addresses': address_count,
+        'seconds': elapsed,
+        'blocks_per_second': scanned_blocks / elapsed  # This run only, not resumed shards
+    }
+    print(f"\nScanned {block_count} blocks ({report['missing_blocks']} not recorded, "
+          f"{report['failed_shards']} shards failed), {tx_count:,} transactions in {elapsed:.2f}s")
+    print(f"{report['blocks_per_second']:,.1f} blocks/s | {report['alerts']} alerts | "
+          f"{address_count:,} whale addresses")
+    for tx_type, count in sorted(alert_types.items(), key=lambda item: -item[1]):
+        print(f"  {tx_type}: {count}")
+    if len(alerts_by_profile) > 1:
+        for name, count in alerts_by_profile.items():
+            print(f"  profile {name}: {count}")
+    return report
@@ -0,0 +1,275 @@
+import asyncio
+import contextlib
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from metrics import API_ERRORS, HTTP_SECONDS, RATE_LIMITED
+
+# Statuses worth retrying: rate limits and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AsyncHTTPClient:
+    """Shared keep-alive HTTP client running on its own event loop thread
+
+    Monitors are synchronous, so the client owns a background asyncio loop.
+    Synchronous code calls get_json(); code that wants several requests in
+    flight submits coroutines with submit() or uses get_json_many().
+    """
+
+    def __init__(self, timeout=10, max_per_host=4, retries=3, backoff=0.5, max_backoff=8.0,
+                 host_limits=None):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.host_limits = dict(host_limits or {})  # Per-host concurrency overrides
+        self.host_semaphores = {}
+        self.session = None
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='http-client', daemon=True)
+        self.thread.start()
+
+    def _get_session(self):
+        """Create the pooled session lazily, on the client loop"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=0,  # Per-host semaphores do the limiting
+                limit_per_host=max([self.max_per_host, *self.host_limits.values()]),
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': 'gzip, deflate'}
+            )
+        return self.session
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).hostname
+        semaphore = self.host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_limits.get(host, self.max_per_host))
+            self.host_semaphores[host] = semaphore
+        return semaphore
+
+    async def _sleep_before_retry(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring a numeric Retry-After"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        await asyncio.sleep(delay)
+
+    def _record_status(self, host, status):
+        if status == 429:
+            RATE_LIMITED.labels(host).inc()
+        if status >= 400:
+            API_ERRORS.labels(host).inc()
+
+    async def request(self, url, params=None, timeout=None, parse=None):
+        """GET a URL with retries and return parse(response), or the raw bytes"""
+        session = self._get_session()
+        request_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        host = urlsplit(url).hostname
+        async with self._host_semaphore(url):
+            for attempt in range(self.retries + 1):
+                started = time.perf_counter()
+                try:
+                    async with session.get(url, params=params, timeout=request_timeout) as response:
+                        self._record_status(host, response.status)
+                        if response.status in RETRY_STATUSES and attempt < self.retries:
+                            await self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+                            continue
+                        response.raise_for_status()
+                        if parse is not None:
+                            result = await parse(response)
+                        else:
+                            result = await response.read()
+                        HTTP_SECONDS.labels(host).observe(time.perf_counter() - started)
+                        return result
+                except aiohttp.ClientResponseError:
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    API_ERRORS.labels(host).inc()
+                    if attempt >= self.retries:
+                        raise
+                    await self._sleep_before_retry(attempt)
+
+    @contextlib.asynccontextmanager
+    async def stream(self, url, params=None, timeout=None):
+        """Open a GET response for incremental reading of response.content
+
+        Retries cover getting a usable status; once the body is streaming,
+        errors propagate to the caller. The timeout applies per socket read
+        rather than to the whole (possibly large) body.
+        """
+        session = self._get_session()
+        request_timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout,
+                                                sock_read=timeout or self.timeout)
+        host = urlsplit(url).hostname
+        async with self._host_semaphore(url):
+            for attempt in range(self.retries + 1):
+                started = time.perf_counter()
+                try:
+                    response = await session.get(url, params=params, timeout=request_timeout)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    API_ERRORS.labels(host).inc()
+                    if attempt >= self.retries:
+                        raise
+                    await self._sleep_before_retry(attempt)
+                    continue
+                # Time to the response headers; the body is timed by the reader
+                HTTP_SECONDS.labels(host).observe(time.perf_counter() - started)
+                self._record_status(host, response.status)
+                if response.status in RETRY_STATUSES and attempt < self.retries:
+                    response.release()
+                    await self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+                    continue
+                try:
+                    response.raise_for_status()
+                    yield response
+                finally:
+                    response.release()
+                return
+
+    def websocket(self, url, **kwargs):
+        """Open a websocket on the pooled session; use as an async context manager"""
+        return self._get_session().ws_connect(url, heartbeat=30, **kwargs)
+
+    async def fetch_json(self, url, params=None, timeout=None):
+        """GET a URL and decode the JSON body"""
+        return await self.request(url, params=params, timeout=timeout,
+                                  parse=lambda response: response.json(content_type=None))
+
+    def submit(self, coro):
+        """Schedule a coroutine on the client loop and return a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """Run a coroutine on the client loop and wait for its result"""
+        return self.submit(coro).result()
+
+    def iterate(self, async_iterable, buffer=256):
+        """Consume an async iterable from synchronous code, item by item as it is produced"""
+        items = queue.Queue(maxsize=buffer)
+        done = object()
+        errors = []
+
+        async def put(item):
+            # Never block the loop: back off while the consumer catches up
+            while True:
+                try:
+                    items.put_nowait(item)
+                    return
+                except queue.Full:
+                    await asyncio.sleep(0.005)
+
+        async def pump():
+            try:
+                async for item in async_iterable:
+                    await put(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                errors.append(e)
+            finally:
+                aclose = getattr(async_iterable, 'aclose', None)
+                if aclose is not None:
+                    await aclose()
+            await put(done)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    break
+                yield item
+            if errors:
+                raise errors[0]
+        finally:
+            future.cancel()
+
+    def get_json(self, url, params=None, timeout=None):
+        """Blocking JSON GET for synchronous callers"""
+        return self.run(self.fetch_json(url, params=params, timeout=timeout))
+
+    async def post(self, url, payload, timeout=None, parse=None, retries=0):
+        """POST a JSON payload and return the response status, or parse(response)
+
+        Not retried by default, since a POST may not be idempotent; callers
+        whose requests are (e.g. JSON-RPC reads) pass retries. With parse,
+        error statuses raise like request().
+        """
+        session = self._get_session()
+        host = urlsplit(url).hostname
+        async with self._host_semaphore(url):
+            for attempt in range(retries + 1):
+                started = time.perf_counter()
+                try:
+                    async with session.post(url, json=payload,
+                                            timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)) as response:
+                        self._record_status(host, response.status)
+                        if parse is None:
+                            HTTP_SECONDS.labels(host).observe(time.perf_counter() - started)
+                            return response.status
+                        if response.status in RETRY_STATUSES and attempt < retries:
+                            await self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+                            continue
+                        response.raise_for_status()
+                        result = await parse(response)
+                        HTTP_SECONDS.labels(host).observe(time.perf_counter() - started)
+                        return result
+                except aiohttp.ClientResponseError:
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    API_ERRORS.labels(host).inc()
+                    if attempt >= retries:
+                        raise
+                    await self._sleep_before_retry(attempt)
+
+    def post_json(self, url, payload, timeout=None):
+        """Blocking JSON POST for synchronous callers"""
+        return self.run(self.post(url, payload, timeout=timeout))
+
+    def get_json_many(self, urls, timeout=None):
+        """Fetch several URLs concurrently; failed requests come back as exceptions"""
+        async def gather():
+            return await asyncio.gather(
+                *(self.fetch_json(url, timeout=timeout) for url in urls),
+                return_exceptions=True
+            )
+        return self.run(gather())
+
+    def close(self):
+        """Close pooled connections and stop the loop thread"""
+        async def shutdown():
+            if self.session is not None and not self.session.closed:
+                await self.session.close()
+        self.run(shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client so every monitor shares one connection pool"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncHTTPClient()
+        return _client
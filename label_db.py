@@ -0,0 +1,184 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+MAGIC = b'WLDB'
+VERSION = 1
+# magic, version, address count, hash slot count, then the offsets of the
+# address records, hash slots, string pool and metadata sections
+HEADER = struct.Struct('<4sIIIQQQQQ')
+# Address records, sorted by address: pool offset, entity index, length
+RECORD = struct.Struct('<IIHxx')
+SLOT = struct.Struct('<I')  # Record index + 1; 0 is an empty slot
+
+
+def _slot_count(address_count):
+    # Power of two with the table at most half full, so probes stay short
+    slots = 8
+    while slots < address_count * 2:
+        slots *= 2
+    return slots
+
+
+def compile_labels(path, known_addresses, exchange_patterns=None, stablecoin_addresses=None, extra_labels=()):
+    """Write a label database to path, replacing any previous file atomically
+
+    known_addresses has the BitcoinWhaleTracker layout ({entity: {'type',
+    'addresses'}}); extra_labels adds (address, entity, type) tuples, for
+    label sets too large to keep as literals. When an address is listed
+    more than once the first entity wins, as in AddressClassifier.
+    Returns the number of addresses written.
+    """
+    entities = []
+    entity_ids = {}
+    labels = {}
+
+    def add(address, entity, entity_type):
+        if address in labels:
+            return
+        key = (entity, entity_type)
+        if key not in entity_ids:
+            entity_ids[key] = len(entities)
+            entities.append([entity, entity_type])
+        labels[address] = entity_ids[key]
+
+    for entity, info in known_addresses.items():
+        for address in info['addresses']:
+            add(address, entity, info['type'])
+    for address, entity, entity_type in extra_labels:
+        add(address, entity, entity_type)
+
+    addresses = sorted(labels)
+    pool = bytearray()
+    records = bytearray()
+    for address in addresses:
+        encoded = address.encode('utf-8')
+        records += RECORD.pack(len(pool), labels[address], len(encoded))
+        pool += encoded
+
+    slot_count = _slot_count(len(addresses))
+    slots = [0] * slot_count
+    mask = slot_count - 1
+    for index, address in enumerate(addresses):
+        slot = zlib.crc32(address.encode('utf-8')) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+
+    metadata = json.dumps({
+        'entities': entities,
+        'exchange_patterns': exchange_patterns or {},
+        'stablecoin_addresses': stablecoin_addresses or {}
+    }).encode('utf-8')
+
+    records_offset = HEADER.size
+    slots_offset = records_offset + len(records)
+    pool_offset = slots_offset + slot_count * SLOT.size
+    metadata_offset = pool_offset + len(pool)
+    header = HEADER.pack(MAGIC, VERSION, len(addresses), slot_count,
+                         records_offset, slots_offset, pool_offset, metadata_offset, len(metadata))
+
+    # Readers map the old file until they reload, so never write in place
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.labels-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(records)
+            f.write(struct.pack(f'<{slot_count}I', *slots))
+            f.write(pool)
+            f.write(metadata)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(addresses)
+
+
+class _Mapping:
+    """One opened version of the file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.version = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.count, slot_count, self.records, self.slots,
+         self.pool, metadata_offset, metadata_size) = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} label database")
+        self.mask = slot_count - 1
+        metadata = json.loads(self.data[metadata_offset:metadata_offset + metadata_size])
+        self.labels = [{'name': name, 'type': entity_type} for name, entity_type in metadata['entities']]
+        self.exchange_patterns = metadata['exchange_patterns']
+        self.stablecoin_addresses = metadata['stablecoin_addresses']
+
+    def get(self, address):
+        key = address.encode('utf-8')
+        data = self.data
+        slot = zlib.crc32(key) & self.mask
+        while True:
+            index, = SLOT.unpack_from(data, self.slots + slot * SLOT.size)
+            if not index:
+                return None
+            offset, entity, length = RECORD.unpack_from(data, self.records + (index - 1) * RECORD.size)
+            start = self.pool + offset
+            if length == len(key) and data[start:start + length] == key:
+                return self.labels[entity]
+            slot = (slot + 1) & self.mask
+
+
+class LabelDatabase:
+    """Read-only address labels memory-mapped from a file built by compile_labels()
+
+    Opening the file reads only the header and the small metadata section
+    (entity names and types, exchange patterns, stablecoin addresses), so
+    startup does not grow with the number of labels. Addresses are looked
+    up through an open-addressing hash table stored in the file, touching
+    a couple of pages per lookup. The pages live in the OS page cache and
+    are shared by every process that maps the file.
+
+    reload_if_changed() switches to a rebuilt file; lookups already running
+    finish against the old mapping, which stays valid because compile_labels
+    replaces the file rather than rewriting it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mapping = _Mapping(path)
+
+    def __len__(self):
+        return self.mapping.count
+
+    def __contains__(self, address):
+        return self.mapping.get(address) is not None
+
+    def get(self, address, default=None):
+        """{'name', 'type'} for a labelled address, else default; the dict is shared"""
+        label = self.mapping.get(address)
+        return default if label is None else label
+
+    @property
+    def exchange_patterns(self):
+        return self.mapping.exchange_patterns
+
+    @property
+    def stablecoin_addresses(self):
+        return self.mapping.stablecoin_addresses
+
+    def reload_if_changed(self):
+        """Map the file again if it was replaced; returns True when it was"""
+        try:
+            stat = os.stat(self.path)
+            if (stat.st_ino, stat.st_size, stat.st_mtime_ns) == self.mapping.version:
+                return False
+            self.mapping = _Mapping(self.path)
+        except Exception as e:
+            print(f"Error reloading label database {self.path}: {e}")
+            return False
+        print(f"Reloaded {len(self)} address labels from {self.path}")
+        return True
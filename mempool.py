@@ -0,0 +1,84 @@
+import asyncio
+import json
+import logging
+
+import aiohttp
+
+from block_parser import project_transaction
+
+logger = logging.getLogger('Mempool')
+
+
+class BlockchainInfoMempoolSource:
+    """Unconfirmed transactions pushed by the blockchain.info websocket feed
+
+    A message that cannot be read is logged and skipped. Any failure of
+    the connection itself reconnects, after a delay that doubles from
+    reconnect_delay up to max_reconnect_delay while connections keep failing.
+    """
+
+    url = "wss://ws.blockchain.info/inv"
+
+    def __init__(self, http, reconnect_delay=5, max_reconnect_delay=300):
+        self.http = http
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+    def _transaction(self, message):
+        """The projected transaction of one feed message, or None for other messages"""
+        try:
+            data = message.json()
+            if data.get('op') != 'utx':
+                return None
+            return project_transaction(data['x'])
+        except Exception as e:
+            logger.warning(f"Skipping unreadable mempool message: {e}")
+            return None
+
+    async def transactions(self):
+        """Yield unconfirmed transactions as they are announced, reconnecting on errors"""
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self.http.websocket(self.url) as ws:
+                    await ws.send_json({'op': 'unconfirmed_sub'})
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            tx = self._transaction(message)
+                            if tx is not None:
+                                delay = self.reconnect_delay  # The connection works
+                                yield tx
+                        elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                logger.warning("Mempool feed closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Mempool feed disconnected: {e}")
+            await asyncio.sleep(delay)
+            delay = min(self.max_reconnect_delay, delay * 2)
+
+
+class ReplayMempoolSource:
+    """Replays recorded unconfirmed transactions, for tests and offline runs
+
+    Takes a list of transaction dicts or the path of a JSON-lines file with
+    one blockchain.info transaction per line.
+    """
+
+    def __init__(self, transactions, delay=0):
+        self.source = transactions
+        self.delay = delay
+
+    def _load(self):
+        if not isinstance(self.source, str):
+            return self.source
+        with open(self.source, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    async def transactions(self):
+        """Yield the recorded transactions in order"""
+        for tx in self._load():
+            yield project_transaction(tx)
+            if self.delay:
+                await asyncio.sleep(self.delay)
@@ -0,0 +1,253 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; covers sub-millisecond classification up to slow block downloads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    """A named family of values, one per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, *values, **kwargs):
+        """The child for one set of label values, created on first use"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.label_names)
+        values = tuple(str(value) for value in values)
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            children = sorted(self.children.items())
+        for values, child in children:
+            lines.extend(child.render(self.name, self.label_names, values))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+    def render(self, name, label_names, values):
+        return [f"{name}{_format_labels(label_names, values)} {self.value}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or errors"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. the last block height"""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._default().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the wall time of a with block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name, label_names, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += count
+            labels = _format_labels(label_names, values, [('le', bound)])
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(label_names, values)
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observations, e.g. latencies, in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics, rendered in the Prometheus text format
+
+    Registering a name twice returns the existing metric, so several
+    monitors in one process can declare the same metrics.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, labels, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Shared by every monitor; 'monitor' tells them apart when they share a process
+POLL_SECONDS = REGISTRY.histogram('whale_poll_seconds', 'Time to poll an API for new data', ['monitor'])
+ALERTS = REGISTRY.counter('whale_alerts_total', 'Alerts emitted', ['monitor', 'profile'])
+API_ERRORS = REGISTRY.counter('whale_api_errors_total', 'Failed API requests', ['host'])
+RATE_LIMITED = REGISTRY.counter('whale_rate_limited_total', 'API responses that signalled a rate limit', ['host'])
+HTTP_SECONDS = REGISTRY.histogram('whale_http_request_seconds', 'HTTP request latency', ['host'])
+LAST_BLOCK = REGISTRY.gauge('whale_last_block_height', 'Height of the last block processed', ['monitor'])
+TRANSACTIONS = REGISTRY.counter('whale_transactions_total', 'Transactions or transfers examined', ['monitor'])
+
+# Bitcoin block pipeline stages
+BLOCK_FETCH_SECONDS = REGISTRY.histogram('whale_block_fetch_seconds',
+                                         'Time spent waiting for block data from the network or cache')
+BLOCK_BYTES = REGISTRY.counter('whale_block_bytes_total', 'Raw block JSON read', ['source'])
+BLOCK_PARSE_SECONDS = REGISTRY.histogram('whale_block_parse_seconds', 'Time spent parsing block JSON')
+CLASSIFY_SECONDS = REGISTRY.histogram('whale_classify_seconds',
+                                      'Per-block time for clustering, whale filtering and labelling')
+BLOCK_ALERT_LAG_SECONDS = REGISTRY.histogram(
+    'whale_block_to_alert_seconds', 'Time from a block\'s timestamp until it was fully processed',
+    buckets=(30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+)
+
+# Alert delivery, between detection and the sinks
+ALERT_QUEUE_DEPTH = REGISTRY.gauge('whale_alert_queue_depth', 'Alerts waiting for a sink', ['sink'])
+ALERTS_DROPPED = REGISTRY.counter('whale_alerts_dropped_total', 'Alerts dropped or coalesced on a full queue',
+                                  ['sink', 'reason'])
+ALERT_DELIVERY_SECONDS = REGISTRY.histogram(
+    'whale_alert_delivery_seconds', 'Time from detection until a sink delivered the alert', ['sink'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 900)
+)
+ALERT_DELIVERY_ERRORS = REGISTRY.counter('whale_alert_delivery_errors_total', 'Failed alert deliveries', ['sink'])
+
+# Client-side API rate limiting (see rate_limiter.TokenBucket)
+RATE_LIMIT_QUEUE_DEPTH = REGISTRY.gauge('whale_rate_limit_waiting', 'Requests waiting for a rate-limit token',
+                                        ['limiter'])
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram('whale_rate_limit_wait_seconds',
+                                             'Time requests waited for a rate-limit token', ['limiter'])
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the monitors' output
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics from a daemon thread; returns the server, or None if the port is taken"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        print(f"Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
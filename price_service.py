@@ -0,0 +1,193 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from http_client import get_client
+
+logger = logging.getLogger('PriceService')
+
+COIN_IDS = {'BTC': 'bitcoin', 'ETH': 'ethereum'}
+
+
+def _coingecko_spot(http, symbols):
+    ids = ','.join(COIN_IDS[symbol] for symbol in symbols)
+    data = http.get_json(f"https://api.coingecko.com/api/v3/simple/price?ids={ids}&vs_currencies=usd")
+    return {symbol: float(data[COIN_IDS[symbol]]['usd']) for symbol in symbols}
+
+
+def _cryptocompare_spot(http, symbols):
+    data = http.get_json(f"https://min-api.cryptocompare.com/data/pricemulti?fsyms={','.join(symbols)}&tsyms=USD")
+    return {symbol: float(data[symbol]['USD']) for symbol in symbols}
+
+
+def _coinstats_spot(http, symbols):
+    urls = [f"https://api.coinstats.app/public/v1/markets?coinId={COIN_IDS[symbol]}" for symbol in symbols]
+    prices = {}
+    for symbol, data in zip(symbols, http.get_json_many(urls)):
+        if isinstance(data, Exception):
+            raise data
+        prices[symbol] = float(data['pairs'][0]['price'])
+    return prices
+
+
+def _cryptocompare_history(http, symbol, timestamp):
+    data = http.get_json(
+        f"https://min-api.cryptocompare.com/data/v2/histohour?fsym={symbol}&tsym=USD&limit=1&toTs={int(timestamp)}")
+    return float(data['Data']['Data'][-1]['close'])
+
+
+def _coingecko_history(http, symbol, timestamp):
+    date = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%d-%m-%Y')
+    data = http.get_json(f"https://api.coingecko.com/api/v3/coins/{COIN_IDS[symbol]}/history?date={date}")
+    return float(data['market_data']['current_price']['usd'])
+
+
+# Tried in order until one answers
+SPOT_PROVIDERS = (
+    ('CoinGecko', _coingecko_spot),
+    ('CryptoCompare', _cryptocompare_spot),
+    ('CoinStats', _coinstats_spot)
+)
+HISTORY_PROVIDERS = (
+    ('CryptoCompare', _cryptocompare_history),  # Hourly closes
+    ('CoinGecko', _coingecko_history)  # Daily snapshot
+)
+
+
+class PriceService:
+    """Shared USD prices with TTL caching, single-flight refreshes and provider failover
+
+    Spot prices for every symbol in COIN_IDS are refreshed together, at most
+    once per ttl seconds; concurrent callers that find the cache stale wait
+    for the one refresh in flight instead of issuing their own. When every
+    provider fails the last known price is served. Historical prices are
+    cached per hour, since they do not change.
+    """
+
+    def __init__(self, http=None, ttl=60, max_history=4096):
+        self.http = http or get_client()
+        self.ttl = ttl
+        self.max_history = max_history
+        self.spot = {}  # symbol -> USD price
+        self.spot_time = 0.0
+        self.history = OrderedDict()  # (symbol, hour) -> USD price
+        self.history_failures = {}  # (symbol, hour) -> time of the last failed lookup
+        self.lock = threading.Lock()
+        self.in_flight = {}  # key -> Event set when that fetch finishes
+
+    def _single_flight(self, key, is_fresh, fetch):
+        """Run fetch() unless is_fresh(), with concurrent callers sharing one call"""
+        while True:
+            with self.lock:
+                if is_fresh():
+                    return
+                event = self.in_flight.get(key)
+                if event is None:
+                    event = self.in_flight[key] = threading.Event()
+                    break
+            event.wait()
+            # The leader's fetch may have failed; only the leader retries
+            with self.lock:
+                if key not in self.in_flight:
+                    return
+        try:
+            fetch()
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            event.set()
+
+    def _refresh_spot(self):
+        symbols = list(COIN_IDS)
+        for name, provider in SPOT_PROVIDERS:
+            try:
+                prices = provider(self.http, symbols)
+            except Exception as e:
+                logger.warning(f"Error fetching prices from {name}: {e}")
+                continue
+            with self.lock:
+                self.spot.update(prices)
+                self.spot_time = time.monotonic()
+            return
+        logger.error("Every price provider failed; serving the last known prices")
+        # Back off for a full ttl rather than retrying every provider per call
+        with self.lock:
+            self.spot_time = time.monotonic()
+
+    def prices(self):
+        """Current USD price of every symbol in COIN_IDS; empty if never fetched"""
+        self._single_flight('spot', lambda: time.monotonic() - self.spot_time < self.ttl, self._refresh_spot)
+        return dict(self.spot)
+
+    def price(self, symbol='BTC'):
+        """Current USD price of a symbol, or None if it could never be fetched"""
+        return self.prices().get(symbol)
+
+    def historical_price(self, timestamp, symbol='BTC'):
+        """USD price of a symbol at a Unix timestamp (hourly resolution), or None"""
+        # The current hour has no close yet; the spot price is closer
+        if time.time() - timestamp < 3600:
+            return self.price(symbol)
+
+        key = (symbol, int(timestamp) // 3600)
+
+        def fetch():
+            for name, provider in HISTORY_PROVIDERS:
+                try:
+                    value = provider(self.http, symbol, timestamp)
+                except Exception as e:
+                    logger.warning(f"Error fetching historical price from {name}: {e}")
+                    continue
+                with self.lock:
+                    self.history[key] = value
+                    self.history_failures.pop(key, None)
+                    while len(self.history) > self.max_history:
+                        self.history.popitem(last=False)
+                return
+            with self.lock:
+                self.history_failures[key] = time.monotonic()
+
+        def is_fresh():
+            failed = self.history_failures.get(key)
+            return key in self.history or (failed is not None and time.monotonic() - failed < self.ttl)
+
+        self._single_flight(key, is_fresh, fetch)
+        with self.lock:
+            if key in self.history:
+                self.history.move_to_end(key)
+                return self.history[key]
+        return None
+
+
+class StaticPriceService:
+    """Fixed USD prices with the PriceService interface, for offline replays and tests
+
+    Symbols without a price are unknown (None), never looked up.
+    """
+
+    def __init__(self, prices):
+        self.spot = dict(prices)
+
+    def prices(self):
+        return dict(self.spot)
+
+    def price(self, symbol='BTC'):
+        return self.spot.get(symbol)
+
+    def historical_price(self, timestamp, symbol='BTC'):
+        return self.price(symbol)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_price_service():
+    """Return the process-wide price service so every monitor shares one cache"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PriceService()
+        return _service
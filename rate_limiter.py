@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from metrics import RATE_LIMIT_QUEUE_DEPTH, RATE_LIMIT_WAIT_SECONDS
+
+
+class TokenBucket:
+    """Token-bucket limiter for an API quota, shared by every request to that API
+
+    Tokens refill continuously at rate per second up to capacity, which is
+    how large a burst may be. acquire() takes one token, waiting in FIFO
+    order when the bucket is empty. The limiter lives on one event loop (the
+    shared HTTP client's); waiters and wait times are exported as metrics.
+    """
+
+    def __init__(self, rate, capacity=None, name='api'):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.name = name
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.lock = None  # Created on the loop that first uses it
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait for and take one token; returns the seconds waited"""
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        started = time.monotonic()
+        self.waiting += 1
+        RATE_LIMIT_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        try:
+            # The lock is FIFO, so the first caller in is the first served
+            async with self.lock:
+                self._refill()
+                while self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+            RATE_LIMIT_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        waited = time.monotonic() - started
+        RATE_LIMIT_WAIT_SECONDS.labels(self.name).observe(waited)
+        return waited
+
+    def penalize(self, seconds):
+        """Hold back every caller for about seconds, e.g. after the API reported a rate limit"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Whale pipeline benchmark
+
+Generates deterministic rawblock-shaped JSON blocks and times the
+classification hot path of BitcoinWhaleTracker: block parsing (through
+the cache, and in memory with json.loads and with the ijson stream), the
+per-block pipeline, process_transaction, identify_address,
+determine_transaction_type and print_transaction. Results are written as
+JSON and compared against a stored baseline to catch regressions.
+
+Timings depend on the machine, so no baseline is committed: record one
+with --save-baseline on the machine that runs the comparison (it is
+written to scripts/benchmark_baseline.json, which git ignores).
+"""
+
+import os
+import sys
+import argparse
+import asyncio
+import io
+import json
+import logging
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from block_parser import iter_block_transactions
+from btc_monitor import BitcoinWhaleTracker
+from price_service import StaticPriceService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'benchmark_baseline.json'
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BECH32 = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the whale classification pipeline')
+    parser.add_argument('--blocks', type=int, default=3, help='Synthetic blocks to generate')
+    parser.add_argument('--txs', type=int, default=3000, help='Transactions per block')
+    parser.add_argument('--max-inputs', type=int, default=4, help='Maximum inputs per transaction')
+    parser.add_argument('--max-outputs', type=int, default=4, help='Maximum outputs per transaction')
+    parser.add_argument('--payout-share', type=float, default=0.01,
+                        help='Share of transactions that are 100-500 output payouts')
+    parser.add_argument('--whale-share', type=float, default=0.02,
+                        help='Share of transactions over the alert threshold')
+    parser.add_argument('--labeled-share', type=float, default=0.2, help='Share of known addresses')
+    parser.add_argument('--pattern-share', type=float, default=0.3,
+                        help='Share of addresses matching exchange patterns')
+    parser.add_argument('--repeat', type=int, default=7, help='Timed repetitions per benchmark')
+    parser.add_argument('--seed', type=int, default=1, help='Generator seed')
+    parser.add_argument('--output', type=str, default='benchmark_results.json',
+                        help='Where to write the results')
+    parser.add_argument('--baseline', type=str, default=str(DEFAULT_BASELINE),
+                        help='Baseline results to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline before failing (0.25 = 25%%)')
+    return parser.parse_args()
+
+
+class AddressMix:
+    """Deterministic source of labelled, pattern-matching and random addresses"""
+
+    def __init__(self, rng, tracker, labeled_share, pattern_share):
+        self.rng = rng
+        self.labeled = [address for info in tracker.known_addresses.values() for address in info['addresses']]
+        self.prefixes = [prefix for patterns in tracker.exchange_patterns.values()
+                         for prefix in patterns['known_ranges'] if len(prefix) > 1]
+        self.labeled_share = labeled_share
+        self.pattern_share = pattern_share
+
+    def random_address(self, prefix=None):
+        kind = self.rng.random()
+        if prefix is None:
+            prefix = 'bc1q' if kind < 0.5 else ('1' if kind < 0.75 else '3')
+        alphabet = BECH32 if prefix.startswith('bc1') else BASE58
+        length = 42 if prefix.startswith('bc1') else 34
+        return prefix + ''.join(self.rng.choice(alphabet) for _ in range(max(1, length - len(prefix))))
+
+    def address(self):
+        draw = self.rng.random()
+        if draw < self.labeled_share:
+            return self.rng.choice(self.labeled)
+        if draw < self.labeled_share + self.pattern_share:
+            return self.random_address(self.rng.choice(self.prefixes))
+        return self.random_address()
+
+
+def generate_block(rng, mix, height, args):
+    """One rawblock-shaped block, with the extra fields the real API returns"""
+    transactions = []
+    block_time = 1700000000 + height * 600
+    for index in range(args.txs):
+        whale = rng.random() < args.whale_share
+        payout = rng.random() < args.payout_share
+        input_count = rng.randint(1, args.max_inputs)
+        output_count = rng.randint(100, 500) if payout else rng.randint(1, args.max_outputs)
+        total = rng.randint(1000, 5000) * 10 ** 8 if whale else rng.randint(10 ** 4, 10 ** 9)
+
+        inputs = []
+        for n in range(input_count):
+            value = total // input_count + (total % input_count if n == 0 else 0)
+            inputs.append({
+                'sequence': 4294967295,
+                'witness': '02' + 'ab' * 70,
+                'script': '',
+                'index': n,
+                'prev_out': {
+                    'addr': mix.address(),
+                    'n': rng.randint(0, 3),
+                    'script': '0014' + 'cd' * 20,
+                    'spending_outpoints': [{'n': n, 'tx_index': index}],
+                    'spent': True,
+                    'tx_index': rng.randint(10 ** 15, 10 ** 16),
+                    'type': 0,
+                    'value': value
+                }
+            })
+        spendable = total - rng.randint(1000, 50000)
+        outputs = []
+        for n in range(output_count):
+            value = spendable // output_count + (spendable % output_count if n == 0 else 0)
+            outputs.append({
+                'type': 0,
+                'spent': False,
+                'value': value,
+                'spending_outpoints': [],
+                'n': n,
+                'tx_index': rng.randint(10 ** 15, 10 ** 16),
+                'script': '0014' + 'ef' * 20,
+                'addr': mix.address()
+            })
+        transactions.append({
+            'hash': f"{height:08x}{index:056x}",
+            'ver': 2,
+            'vin_sz': input_count,
+            'vout_sz': output_count,
+            'size': 100 + 68 * input_count + 31 * output_count,
+            'weight': 400 + 272 * input_count + 124 * output_count,
+            'fee': total - spendable,
+            'relayed_by': '0.0.0.0',
+            'lock_time': 0,
+            'tx_index': rng.randint(10 ** 15, 10 ** 16),
+            'double_spend': False,
+            'time': block_time,
+            'block_index': height,
+            'block_height': height,
+            'inputs': inputs,
+            'out': outputs
+        })
+    return {
+        'hash': f"{height:064x}",
+        'ver': 536870912,
+        'prev_block': f"{height - 1:064x}",
+        'mrkl_root': '00' * 32,
+        'time': block_time,
+        'bits': 386089497,
+        'nonce': rng.randint(0, 2 ** 32),
+        'n_tx': len(transactions),
+        'size': sum(tx['size'] for tx in transactions),
+        'block_index': height,
+        'main_chain': True,
+        'height': height,
+        'tx': transactions
+    }
+
+
+class BytesReader:
+    """Async read() over an in-memory body"""
+
+    def __init__(self, body):
+        self.f = io.BytesIO(body)
+
+    async def read(self, n=-1):
+        return self.f.read(n)
+
+
+def timed(function, repeat, setup=None):
+    """Run function repeat times; return min and median seconds
+
+    With setup, each run is function(setup()), and setup is not timed.
+    """
+    samples = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        started = time.perf_counter()
+        function(*args)
+        samples.append(time.perf_counter() - started)
+    return {'min': min(samples), 'median': statistics.median(samples)}
+
+
+def run_benchmarks(args):
+    """Generate the blocks and time each pipeline stage"""
+    rng = random.Random(args.seed)
+    cache_dir = tempfile.mkdtemp(prefix='whale-bench-')
+    tracker = BitcoinWhaleTracker(min_btc=1000, block_cache_dir=cache_dir)
+    tracker.quiet = True
+    tracker.price_service = StaticPriceService({'BTC': 65000.0})
+    mix = AddressMix(rng, tracker, args.labeled_share, args.pattern_share)
+
+    blocks = [generate_block(rng, mix, 800000 + i, args) for i in range(args.blocks)]
+    for block in blocks:
+        tracker.block_cache.store(block['hash'], json.dumps(block).encode(), block['height'])
+    parsed = [list(tracker.get_block_transactions(block['hash'])) for block in blocks]
+    transactions = [tx for block in parsed for tx in block]
+    whales = [tx for tx in transactions
+              if sum(inp['prev_out']['value'] for inp in tx['inputs']) / tracker.satoshi_to_btc >= tracker.min_btc]
+    addresses = [mix.address() for _ in range(20000)]
+    pairs = list(zip(addresses[::2], addresses[1::2]))
+    alerts = [tracker.process_transaction(tx, record_stats=False) for tx in whales]
+    logger.info(f"{len(blocks)} blocks, {len(transactions)} transactions, {len(whales)} whales")
+
+    def parse_blocks():
+        for block in blocks:
+            for _ in tracker.get_block_transactions(block['hash']):
+                pass
+
+    bodies = [json.dumps(block).encode() for block in blocks]
+    loop = asyncio.new_event_loop()
+
+    async def drain(body, stream_threshold):
+        async for _ in iter_block_transactions(BytesReader(body), 'tx', {}, stream_threshold):
+            pass
+
+    def parse_json():
+        for body in bodies:
+            loop.run_until_complete(drain(body, len(body)))
+
+    def parse_stream():
+        for body in bodies:
+            loop.run_until_complete(drain(body, 0))
+
+    # process_block keeps chain, cluster and stats state, so every run gets
+    # a fresh tracker rather than replaying blocks it has already seen
+    block_trackers = []
+
+    def new_block_tracker():
+        block_tracker = BitcoinWhaleTracker(min_btc=1000, block_cache_dir=None)
+        block_tracker.quiet = True
+        block_tracker.price_service = tracker.price_service
+        block_trackers.append(block_tracker)
+        return block_tracker
+
+    def process_blocks(block_tracker):
+        for height, block in enumerate(parsed):
+            block_tracker.process_block(height, block)
+
+    def process_whales():
+        for tx in whales:
+            tracker.process_transaction(tx, record_stats=False)
+
+    def identify():
+        for address in addresses:
+            tracker.identify_address(address)
+
+    def determine():
+        for sender, receiver in pairs:
+            tracker.determine_transaction_type(sender, receiver)
+
+    def format_alerts():
+        for alert in alerts:
+            tracker.print_transaction(alert)
+
+    # Per-item costs are reported in microseconds, per-block costs in milliseconds
+    stages = [
+        ('parse_block_ms', parse_blocks, None, 1000 / len(blocks)),
+        ('parse_block_json_ms', parse_json, None, 1000 / len(blocks)),
+        ('parse_block_stream_ms', parse_stream, None, 1000 / len(blocks)),
+        ('process_block_ms', process_blocks, new_block_tracker, 1000 / len(blocks)),
+        ('process_transaction_us', process_whales, None, 1e6 / max(1, len(whales))),
+        ('identify_address_us', identify, None, 1e6 / len(addresses)),
+        ('determine_transaction_type_us', determine, None, 1e6 / len(pairs)),
+        ('print_transaction_us', format_alerts, None, 1e6 / max(1, len(alerts)))
+    ]
+    results = {}
+    try:
+        for name, function, setup, scale in stages:
+            timing = timed(function, args.repeat, setup)
+            results[name] = {key: round(value * scale, 3) for key, value in timing.items()}
+            logger.info(f"{name}: min {results[name]['min']:,.3f} | median {results[name]['median']:,.3f}")
+    finally:
+        for block_tracker in block_trackers:
+            block_tracker.close()
+        tracker.close()
+        loop.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        'config': {key: getattr(args, key) for key in (
+            'blocks', 'txs', 'max_inputs', 'max_outputs', 'payout_share', 'whale_share',
+            'labeled_share', 'pattern_share', 'seed')},
+        'python': sys.version.split()[0],
+        'results': results
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Log each stage against the baseline; return the stages that regressed"""
+    regressions = []
+    if baseline.get('config') != report['config']:
+        logger.warning("Baseline was recorded with a different configuration; comparison is indicative only")
+    for name, result in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        change = result['min'] / previous['min'] - 1 if previous['min'] else 0
+        status = 'REGRESSION' if change > tolerance else 'ok'
+        logger.info(f"{name}: {previous['min']:,.3f} -> {result['min']:,.3f} ({change:+.1%}) {status}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    """Run the benchmarks, write results and check them against the baseline."""
+    args = parse_args()
+    report = run_benchmarks(args)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logger.warning(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        logger.error(f"Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
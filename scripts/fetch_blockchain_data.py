@@ -21,6 +21,7 @@ from tqdm import tqdm
 import yaml
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
+from block_cache import BlockCache, is_rawblock
 from src.utils.config import load_config
 from src.data.blockchain_api import BlockchainAPI
 from src.data.bitcoin_rpc import BitcoinRPC
@@ -44,6 +45,8 @@ def parse_args():
                         help='Use Bitcoin Core RPC instead of public API')
     parser.add_argument('--config', type=str, default='config.yml',
                         help='Path to configuration file')
+    parser.add_argument('--cache-dir', type=str, default='block_cache',
+                        help='Local block cache shared with the monitors (empty to disable)')
     return parser.parse_args()
 
 def ensure_directory(directory):
@@ -51,7 +54,22 @@ def ensure_directory(directory):
     os.makedirs(directory, exist_ok=True)
     return directory
 
-def fetch_blocks_by_date_range(api, start_date, end_date, output_dir):
+def get_block(api, height, cache=None):
+    """Get a block by height, from the local block cache when possible."""
+    if cache is not None:
+        block_hash = cache.hash_at(height)
+        if block_hash and cache.format_of(block_hash) == 'rawblock':
+            block_data = cache.load(block_hash)
+            if block_data:
+                return block_data
+    
+    block_data = api.get_block_by_height(height)
+    # Only blockchain.info bodies: the monitors cannot read bitcoind's format
+    if cache is not None and is_rawblock(block_data):
+        cache.store(block_data['hash'], json.dumps(block_data).encode(), height)
+    return block_data
+
+def fetch_blocks_by_date_range(api, start_date, end_date, output_dir, cache=None):
     """Fetch block data for a date range."""
     start_datetime = datetime.datetime.strptime(start_date, '%Y-%m-%d')
     end_datetime = datetime.datetime.strptime(end_date, '%Y-%m-%d')
@@ -64,7 +82,7 @@ def fetch_blocks_by_date_range(api, start_date, end_date, output_dir):
     
     # Fetch each block and its transactions
     for height in tqdm(block_heights, desc="Fetching blocks"):
-        block_data = api.get_block_by_height(height)
+        block_data = get_block(api, height, cache)
         if block_data:
             # Save block data
             block_file = os.path.join(output_dir, f"block_{height}.json")
@@ -126,8 +144,11 @@ def main():
         logger.info("Using public blockchain API")
         api = BlockchainAPI(config['api']['url'], config['api']['key'])
     
+    # Reuse blocks the monitors (or earlier runs) already downloaded
+    cache = BlockCache(args.cache_dir) if args.cache_dir else None
+    
     # Fetch data
-    fetch_blocks_by_date_range(api, args.start_date, args.end_date, output_dir)
+    fetch_blocks_by_date_range(api, args.start_date, args.end_date, output_dir, cache)
     
     logger.info("Data collection complete")
 
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from erc20_logs import JSONRPCError, TransferLogs
+from http_client import get_client
+
+COLUMNS = ('block', 'log_index', 'token', 'sender', 'recipient', 'limbs', 'tx_hash', 'timestamp')
+
+
+def plan_partitions(start_block, end_block, partition_size):
+    """Cover an inclusive block range with (start, end) partitions aligned to partition_size
+
+    The range is widened to whole partitions, except that the last one
+    ends at end_block, so partitions line up across runs and a later run
+    over a wider range reuses them rather than fetching them again.
+    """
+    first = start_block - start_block % partition_size
+    return [(start, min(start + partition_size - 1, end_block))
+            for start in range(first, end_block + 1, partition_size)]
+
+
+class TileSizer:
+    """Block span of eth_getLogs requests, adapted to the provider's result cap
+
+    Shared by every partition: a refused request halves the span, and
+    each accepted one grows it by half again, up to max_span.
+    """
+
+    def __init__(self, max_span=2000):
+        self.max_span = max_span
+        self.span = max_span
+        self.splits = 0
+
+    def shrink(self, span):
+        self.splits += 1
+        self.span = max(1, min(self.span, span // 2))
+        return self.span
+
+    def grow(self):
+        self.span = min(self.max_span, self.span + max(1, self.span // 2))
+
+
+class BackfillStore:
+    """Partition files of a stablecoin backfill, one .npz of columns per block range
+
+    A partition is written to a temporary file and renamed into place, so
+    a file that exists is complete and the partitions still missing are
+    the ones a rerun fetches. Files are named by their block range; a
+    partition that was cut short at the chain head is fetched again in
+    full by a later run, which replaces it. manifest.json binds the
+    directory to one set of tokens and filters.
+    """
+
+    def __init__(self, directory, config):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, 'manifest.json')
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = None
+        if manifest is None:
+            temp_path = f"{manifest_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(config, f, indent=4, sort_keys=True)
+            os.replace(temp_path, manifest_path)
+        elif manifest != config:
+            raise ValueError(f"{directory} belongs to a backfill with different settings: {manifest}")
+
+        self.saved = {}  # Partition start -> end of its saved file
+        for name in os.listdir(directory):
+            if name.startswith('transfers_') and name.endswith('.npz'):
+                start, end = name[len('transfers_'):-len('.npz')].split('_')
+                self.saved[int(start)] = int(end)
+
+    def path(self, start, end):
+        return os.path.join(self.directory, f"transfers_{start:09d}_{end:09d}.npz")
+
+    def completed(self, partition):
+        return self.saved.get(partition[0], -1) >= partition[1]
+
+    def save(self, partition, columns):
+        start, end = partition
+        path = self.path(start, end)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(temp_path, path)
+        previous = self.saved.get(start)
+        if previous is not None and previous != end:
+            os.remove(self.path(start, previous))
+        self.saved[start] = end
+
+
+def load_backfill(directory):
+    """All saved partitions of a backfill, concatenated in block order
+
+    Returns the columns of COLUMNS, 'amount' as float64 whole tokens for
+    analysis (the exact values stay in 'limbs'), and the manifest's tokens,
+    which 'token' indexes.
+    """
+    with open(os.path.join(directory, 'manifest.json'), 'r') as f:
+        tokens = json.load(f)['tokens']
+    parts = {name: [] for name in COLUMNS}
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('transfers_') and name.endswith('.npz'):
+            with np.load(os.path.join(directory, name)) as partition:
+                for column in COLUMNS:
+                    parts[column].append(partition[column])
+    columns = {name: np.concatenate(arrays) if arrays else np.zeros(0) for name, arrays in parts.items()}
+    if not parts['block']:
+        return dict(columns, amount=np.zeros(0), tokens=tokens)
+    scale = np.array([10.0 ** -token['decimals'] for token in tokens])[columns['token']]
+    limbs = columns['limbs'].astype(np.float64)
+    amount = ((limbs[:, 0] * 2.0 ** 64 + limbs[:, 1]) * 2.0 ** 64 + limbs[:, 2]) * 2.0 ** 64 + limbs[:, 3]
+    return dict(columns, amount=amount * scale, tokens=tokens)
+
+
+async def fetch_range(source, addresses, start_block, end_block, sizer):
+    """Every log of a block range, in requests of the sizer's span, split further when refused"""
+    logs = []
+    while start_block <= end_block:
+        span = min(sizer.span, end_block - start_block + 1)
+        try:
+            logs.extend(await source.get_logs(addresses, start_block, start_block + span - 1))
+        except JSONRPCError as e:
+            if not e.result_cap or span == 1:
+                raise
+            sizer.shrink(span)
+            continue
+        sizer.grow()
+        start_block += span
+    return logs
+
+
+def backfill_transfers(source, tokens, start_block, end_block, output_dir='stablecoin_backfill',
+                       partition_size=10000, concurrency=8, max_span=2000, min_amount=0, keep_addresses=(),
+                       http=None):
+    """Transfer history of several tokens over a block range, fetched in parallel
+
+    The range, up to the source's latest block, is split into aligned
+    partitions of partition_size blocks (see plan_partitions), up to
+    concurrency of which are fetched at once; the request rate is
+    bounded by the source's rate limiter, not by concurrency. Each
+    partition is read in tiles of contiguous blocks whose span adapts to
+    the provider's result cap (see TileSizer), decoded with TransferLogs
+    and saved as one columnar file. Mints and burns are always kept, as
+    are transfers from or to keep_addresses (e.g. treasuries); other
+    transfers from min_amount whole tokens up. Partitions already on disk
+    are skipped, so an interrupted backfill resumes where it stopped.
+    Returns a report of the run.
+    """
+    config = {
+        'tokens': [dict(token) for token in tokens],
+        'partition_size': partition_size,
+        'min_amount': str(Decimal(str(min_amount)).normalize()),
+        'keep_addresses': sorted(address.lower() for address in keep_addresses)
+    }
+    store = BackfillStore(output_dir, config)
+    http = http or get_client()
+    end_block = min(end_block, http.run(source.block_number()))
+    partitions = plan_partitions(start_block, end_block, partition_size)
+    pending = [partition for partition in partitions if not store.completed(partition)]
+    addresses = [token['address'] for token in tokens]
+    sizer = TileSizer(max_span)
+    print(f"Backfilling blocks {start_block}-{end_block} in {len(partitions)} partitions "
+          f"({len(partitions) - len(pending)} already done), {concurrency} at a time...")
+
+    totals = {'logs': 0, 'kept': 0, 'finished': 0, 'blocks': 0}
+
+    async def backfill_partition(partition, semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            logs = await fetch_range(source, addresses, partition[0], partition[1], sizer)
+            batch = TransferLogs(logs, tokens)
+            keep = batch.mints | batch.burns | batch.at_least(min_amount)
+            if config['keep_addresses']:
+                keep |= batch.touches(config['keep_addresses'])
+            indexes = batch.indexes(keep)
+            # Compressing is CPU-bound; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, store.save, partition, batch.columns(indexes))
+            totals['logs'] += len(batch)
+            totals['kept'] += len(indexes)
+            totals['finished'] += 1
+            totals['blocks'] += partition[1] - partition[0] + 1
+            print(f"Partition {partition[0]}-{partition[1]}: {len(batch)} transfers, {len(indexes)} kept "
+                  f"in {time.perf_counter() - started:.1f}s ({totals['finished']}/{len(pending)}, "
+                  f"span {sizer.span})")
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(backfill_partition(partition, semaphore) for partition in pending),
+                                    return_exceptions=True)
+
+    started = time.perf_counter()
+    results = http.run(run_all())
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    failed = 0
+    for partition, result in zip(pending, results):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"Error backfilling blocks {partition[0]}-{partition[1]}: {result}")
+
+    report = {
+        'partitions': len(partitions),
+        'fetched_partitions': totals['finished'],
+        'failed_partitions': failed,
+        'transfers': totals['logs'],
+        'kept': totals['kept'],
+        'tile_splits': sizer.splits,
+        'tile_span': sizer.span,
+        'seconds': elapsed,
+        'blocks_per_second': totals['blocks'] / elapsed  # This run only, not resumed partitions
+    }
+    print(f"\nFetched {totals['finished']} partitions ({failed} failed): {totals['logs']:,} transfers, "
+          f"{totals['kept']:,} kept in {elapsed:.2f}s ({report['blocks_per_second']:,.0f} blocks/s, "
+          f"{sizer.splits} tile splits)")
+    return report
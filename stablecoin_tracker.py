@@ -1,21 +1,29 @@
+import asyncio
 import requests
 import time
 import json
 from datetime import datetime
 import logging
 from typing import Dict, List, Optional
-from web3 import Web3
-from eth_typing import HexStr
+from erc20_logs import JSONRPCLogSource, TransferLogs
+from http_client import get_client
+from stablecoin_backfill import TileSizer, fetch_range
 from keys import ETHERSCAN_API_KEY, TRON_API_KEY
 
 class StablecoinTracker:
-    def __init__(self, min_amount=100000):
+    def __init__(self, min_amount=100000, rpc_url='https://mainnet.infura.io/v3/YOUR-PROJECT-ID', log_source=None):
         # Setup logging
         self.logger = self._setup_logging()
         
         # Initialize tracking parameters
         self.min_amount = min_amount
-        self.web3 = Web3(Web3.HTTPProvider('https://mainnet.infura.io/v3/YOUR-PROJECT-ID'))
+        self.http = get_client()
+        # Raw Transfer logs of every ETH contract, one eth_getLogs per poll
+        # when keeping up; after a stall, catch-up reads are capped per poll
+        # and split into tiles the provider's result cap allows
+        self.log_source = log_source or JSONRPCLogSource(rpc_url, http=self.http)
+        self.max_poll_blocks = 2000
+        self.tile_sizer = TileSizer(max_span=self.max_poll_blocks)
         
         # Contract addresses
         self.contracts = {
@@ -29,6 +37,7 @@ class StablecoinTracker:
                 'BSC': '0x8AC76a51cc950d9822D68b83fE1Ad97B32Cd580d'
             }
         }
+        self.decimals = {'USDT': 6, 'USDC': 6}  # On Ethereum
         
         # Known addresses
         self.known_addresses = {
@@ -59,47 +68,61 @@ class StablecoinTracker:
         )
         return logging.getLogger('StablecoinTracker')
 
-    async def track_eth_stablecoin_events(self):
-        """Track USDT/USDC events on Ethereum"""
-        # ABI for Transfer events
-        transfer_event = self.web3.eth.contract(
-            address=self.contracts['USDT']['ETH'],
-            abi=[{
-                "anonymous": False,
-                "inputs": [
-                    {"indexed": True, "name": "from", "type": "address"},
-                    {"indexed": True, "name": "to", "type": "address"},
-                    {"indexed": False, "name": "value", "type": "uint256"}
-                ],
-                "name": "Transfer",
-                "type": "event"
-            }]
-        )
+    async def _rpc(self, coro):
+        """Await a log source call on the shared HTTP client's loop"""
+        return await asyncio.wrap_future(self.http.submit(coro))
+
+    def _eth_tokens(self):
+        return [{'symbol': token, 'address': chains['ETH'], 'decimals': self.decimals[token]}
+                for token, chains in self.contracts.items() if 'ETH' in chains]
 
-        def handle_event(event):
+    async def poll_eth_events(self, last_block, latest):
+        """Report the ETH stablecoin events after last_block, up to latest
+
+        Reads at most max_poll_blocks blocks, in as few eth_getLogs as the
+        provider allows (see fetch_range), and decodes them in bulk; mints
+        and burns are always reported, other transfers from min_amount up.
+        Returns the last block read.
+        """
+        tokens = self._eth_tokens()
+        end = min(latest, last_block + self.max_poll_blocks)
+        logs = await self._rpc(fetch_range(self.log_source, [token['address'] for token in tokens],
+                                           last_block + 1, end, self.tile_sizer))
+        batch = TransferLogs(logs, tokens)
+
+        def handle_event(i):
+            transfer = batch.transfer(i)
             event_data = {
-                'token': 'USDT' if event.address == self.contracts['USDT']['ETH'] else 'USDC',
-                'from': event.args['from'],
-                'to': event.args['to'],
-                'value': event.args['value'] / (10 ** 6),  # Convert from wei
+                'token': transfer['token'],
+                'from': transfer['from'],
+                'to': transfer['to'],
+                'value': transfer['amount'],  # Exact Decimal
                 'timestamp': datetime.now().isoformat()
             }
 
-            if event_data['from'] == '0x0000000000000000000000000000000000000000':
+            if batch.mints[i]:
                 self._handle_mint(event_data)
-            elif event_data['to'] == '0x0000000000000000000000000000000000000000':
+            elif batch.burns[i]:
                 self._handle_burn(event_data)
-            elif event_data['value'] >= self.min_amount:
+            else:
                 self._handle_transfer(event_data)
 
-        # Create filters for both USDT and USDC
-        transfer_filter = transfer_event.events.Transfer.createFilter(fromBlock='latest')
-        
+        for i in batch.indexes(batch.mints | batch.burns | batch.at_least(self.min_amount)):
+            handle_event(i)
+        return end
+
+    async def track_eth_stablecoin_events(self):
+        """Track USDT/USDC events on Ethereum, polling for new blocks"""
+        last_block = None
         while True:
             try:
-                for event in transfer_filter.get_new_entries():
-                    handle_event(event)
-                await asyncio.sleep(1)
+                latest = await self._rpc(self.log_source.block_number())
+                if last_block is None:
+                    last_block = latest - 1
+                if latest > last_block:
+                    last_block = await self.poll_eth_events(last_block, latest)
+                if last_block >= latest:
+                    await asyncio.sleep(1)
             except Exception as e:
                 self.logger.error(f"Error processing ETH events: {e}")
                 await asyncio.sleep(5)
@@ -131,15 +154,16 @@ class StablecoinTracker:
 
     def _get_address_label(self, address: str) -> str:
         """Get label for known addresses"""
+        # Decoded log addresses are lowercase; compare EVM addresses without case
+        address = address.lower()
         for entity_type, addresses in self.known_addresses.items():
-            if isinstance(addresses, dict):
-                for token, chain_addresses in addresses.items():
-                    if address in chain_addresses.values():
-                        return f"{token} {entity_type}"
-            else:
-                for name, addr_list in addresses.items():
-                    if address in addr_list:
-                        return f"{name} ({entity_type})"
+            for name, entries in addresses.items():
+                # Treasuries map chains to addresses; exchanges list them
+                if isinstance(entries, dict):
+                    if address in (a.lower() for a in entries.values()):
+                        return f"{name} {entity_type}"
+                elif address in (a.lower() for a in entries):
+                    return f"{name} ({entity_type})"
         return f"{address[:6]}...{address[-4:]}"
 
     async def start_tracking(self):
@@ -156,8 +180,6 @@ class StablecoinTracker:
         await asyncio.gather(*tasks)
 
 if __name__ == "__main__":
-    import asyncio
-    
     tracker = StablecoinTracker(min_amount=100000)  # Track transfers >= $100k
     
     try:
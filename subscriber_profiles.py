@@ -0,0 +1,229 @@
+# -*- coding: UTF-8 -*-
+from address_classifier import AddressClassifier
+
+
+class SubscriberProfile:
+    """One audience for whale alerts: its own threshold, labels and message format
+
+    known_addresses / exchange_patterns are overrides merged onto the
+    engine's tables; mapping an entity to None removes it. formatter takes
+    an alert dict and returns the message; None uses the engine's
+    format_transaction.
+    """
+
+    def __init__(self, name, min_btc, known_addresses=None, exchange_patterns=None, formatter=None):
+        self.name = name
+        self.min_btc = min_btc
+        self.known_addresses = known_addresses or {}
+        self.exchange_patterns = exchange_patterns or {}
+        self.formatter = formatter
+        self.classifier = None  # Set by bind() when the profile overrides labels
+        self.alert_count = 0
+
+    def bind(self, known_addresses, exchange_patterns, clusters=None, database=None):
+        """Build this profile's classifier from the engine's tables plus its overrides
+
+        With a label database the engine's addresses stay in the file and the
+        overrides are layered on top of it (see AddressClassifier).
+        """
+        if not self.known_addresses and not self.exchange_patterns:
+            return
+        if database is not None:
+            known_addresses = dict(self.known_addresses)
+        else:
+            known_addresses = _merge(known_addresses, self.known_addresses)
+        self.classifier = AddressClassifier(
+            known_addresses,
+            _merge(exchange_patterns, self.exchange_patterns),
+            clusters,
+            database
+        )
+
+
+def _merge(base, overrides):
+    merged = dict(base)
+    for name, value in overrides.items():
+        if value is None:
+            merged.pop(name, None)
+        else:
+            merged[name] = value
+    return merged
+
+
+def concise_format(tx):
+    """Format transaction alerts to match the requested concise format"""
+    # Determine emoji based on type and amount
+    tx_type = tx['tx_type']
+    btc_amount = tx['btc_volume']
+    
+    # Select emoji based on transaction type
+    if '_MINT' in tx_type:
+        emoji = "💵"
+    elif '_BURN' in tx_type:
+        emoji = "🔥"
+    elif '_TREASURY' in tx_type:
+        emoji = "🏦"
+    else:
+        # Standard whale alert emoji with count based on amount
+        emoji_count = min(8, max(1, int(btc_amount / 500)))
+        emoji = "🚨" * emoji_count
+
+    # Format amounts
+    btc_formatted = f"{btc_amount:,.0f}"
+    btc_price = tx.get('btc_price')
+    # Without a known price the USD values are left out rather than shown as $0
+    usd_part = f" ({btc_amount * btc_price:,.0f} USD)" if btc_price else ""
+    
+    # Format fee
+    fee_sats = tx['fee_btc'] * 100000000
+    fee_usd_part = f" (${tx['fee_btc'] * btc_price:.0f})" if btc_price else ""
+    
+    # Get entity names (uppercase for consistency)
+    from_entity = tx['from_entity']['name'].upper() if tx['from_entity'] else "UNKNOWN"
+    to_entity = tx['to_entity']['name'].upper() if tx['to_entity'] else "UNKNOWN"
+    
+    # Format transaction type more cleanly
+    clean_type = tx_type.replace('_', ' ').title()
+    
+    # Build message in the requested format
+    message = (
+        f"{emoji}{btc_formatted} #BTC{usd_part} transferred "
+        f"({clean_type}) from #{from_entity} to #{to_entity} "
+        f"for {fee_sats:.2f} sats{fee_usd_part} fees"
+    )
+    
+    # Add MEGA WHALE prefix for very large transactions
+    if btc_amount > 1000:
+        message = "🐋 MEGA WHALE ALERT 🐋\n" + message
+    
+    # Flag mempool alerts that have not been mined yet
+    if tx.get('confirmed') is False:
+        message = "⏳ Unconfirmed:\n" + message
+    
+    return message
+
+
+# Neither the 100 nor the 500 BTC monitor labels the institutional desks
+# of the 1000 BTC monitor; the 100 BTC monitor also tracks these extra
+# exchange hot and cold wallets
+SMALL_WHALE_ADDRESSES = {
+    'mexc': {
+        'type': 'exchange',
+        'addresses': [
+            'bc1qmxjzz8fpu5n6mrtz3xtpzexcxvq8w37nrjg3mk',  # MEXC Hot Wallet
+            'bc1q4ks0gxjmwc5qwpzz7gx8nj6xjz0x2l3atpx9f5',  # MEXC Cold Storage
+            '38FkXQzYGxYmYM5UqTSzKzUXecJGDwHhps',          # MEXC Reserve
+        ]
+    },
+    'kucoin_new': {
+        'type': 'exchange',
+        'addresses': [
+            'bc1qf5eh4p3gfvazdkj5qw7p9c6m5qxz7v8qt3ahnw',  # KuCoin New Hot
+            'bc1qv6zmgk9hf4kw9kj5t3z5q9k8xv8j5x3q9yv7f2',  # KuCoin Cold New
+        ]
+    },
+    'bitget': {
+        'type': 'exchange',
+        'addresses': [
+            'bc1qx2xmgj8vn4ywrk2t6gqz9qn5w5z2j5x3q9yv7f2',  # Bitget Hot
+            '3BitGetXxYyZzWw9q8n5w5z2j5x3q9yv7f2KLmN',      # Bitget Cold
+        ]
+    },
+    'phemex': {
+        'type': 'exchange',
+        'addresses': [
+            'bc1qphemexj8vn4ywrk2t6gqz9qn5w5z2j5x3q9yv7f2',  # Phemex Hot
+            '3PhemexXxYyZzWw9q8n5w5z2j5x3q9yv7f2KLmN',       # Phemex Cold
+        ]
+    },
+    'poloniex': {
+        'type': 'exchange',
+        'addresses': [
+            '39JiKPcbD8yKdYuxzKgM5bU7YGJ8PhKxJ4',           # Poloniex Hot
+            'bc1qpoloniexk2t6gqz9qn5w5z2j5x3q9yv7f2KLmN',   # Poloniex Cold
+        ]
+    },
+    'deribit': {
+        'type': 'exchange',
+        'addresses': [
+            'bc1qderibitj8vn4ywrk2t6gqz9qn5w5z2j5x3q9yv7f2',  # Deribit Hot
+            '3DeribitXxYyZzWw9q8n5w5z2j5x3q9yv7f2KLmN',       # Deribit Cold
+        ]
+    }
+}
+
+SMALL_WHALE_PATTERNS = {
+    "MEXC": {
+        "prefixes": ["bc1q", "38"],
+        "patterns": [
+            r"^bc1qmexc[a-zA-Z0-9]{30}$",
+            r"^38[A-Z][a-zA-Z0-9]{33}$"
+        ],
+        "known_ranges": ["bc1qm", "38F"]
+    },
+    "BITGET": {
+        "prefixes": ["bc1q", "3Bit"],
+        "patterns": [
+            r"^bc1qbitget[a-zA-Z0-9]{28}$",
+            r"^3BitGet[a-zA-Z0-9]{30}$"
+        ],
+        "known_ranges": ["bc1qb", "3Bit"]
+    },
+    "PHEMEX": {
+        "prefixes": ["bc1q", "3Ph"],
+        "patterns": [
+            r"^bc1qphemex[a-zA-Z0-9]{28}$",
+            r"^3Phemex[a-zA-Z0-9]{30}$"
+        ],
+        "known_ranges": ["bc1qp", "3Ph"]
+    },
+    "POLONIEX": {
+        "prefixes": ["bc1q", "39J"],
+        "patterns": [
+            r"^39J[a-zA-Z0-9]{31}$",
+            r"^bc1qpolo[a-zA-Z0-9]{30}$"
+        ],
+        "known_ranges": ["39J", "bc1qp"]
+    },
+    "DERIBIT": {
+        "prefixes": ["bc1q", "3Der"],
+        "patterns": [
+            r"^bc1qder[a-zA-Z0-9]{30}$",
+            r"^3Deribit[a-zA-Z0-9]{28}$"
+        ],
+        "known_ranges": ["bc1qd", "3Der"]
+    }
+}
+
+INSTITUTION_ENTITIES = (
+    'blackrock', 'jpmorgan', 'fidelity', 'goldman_sachs', 'falconx', 'galaxy_digital',
+    'mirana', 'ark_invest', 'grayscale_new', 'ibit', 'otc_desks', 'fidelity_updated'
+)
+INSTITUTION_PATTERNS = ('BLACKROCK', 'JPMORGAN', 'FALCONX', 'GALAXY', 'MIRANA', 'ARK', 'IBIT')
+
+
+def concise_profile(name, min_btc, known_addresses=None, exchange_patterns=None):
+    """Profile without the institutional labels, in concise_format, plus any extra tables"""
+    overrides = dict.fromkeys(INSTITUTION_ENTITIES)
+    overrides.update(known_addresses or {})
+    pattern_overrides = dict.fromkeys(INSTITUTION_PATTERNS)
+    pattern_overrides.update(exchange_patterns or {})
+    return SubscriberProfile(name, min_btc, overrides, pattern_overrides, concise_format)
+
+
+def small_whale_profile(name, min_btc):
+    """Profile of the former btc_monitor100 script: concise, with the extra exchange tables"""
+    return concise_profile(name, min_btc, SMALL_WHALE_ADDRESSES, SMALL_WHALE_PATTERNS)
+
+
+# Profiles selectable by name, e.g. btc_monitor.py --profiles 1000,500,100
+PROFILES = {
+    '1000': lambda: SubscriberProfile('1000', 1000),
+    '500': lambda: concise_profile('500', 500),
+    '100': lambda: small_whale_profile('100', 100)
+}
+
+
+def build_profiles(names):
+    """Instantiate profiles by name"""
+    return [PROFILES[name]() for name in names]
@@ -0,0 +1,122 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from address_classifier import AddressClassifier, PrefixTrie
+from btc_monitor import BitcoinWhaleTracker
+
+KNOWN = {
+    'binance': {'type': 'exchange', 'addresses': ['bc1qlisted', '3Shared']},
+    'whale': {'type': 'individual', 'addresses': ['3Shared', 'regexlisted']},
+}
+PATTERNS = {
+    # Rank 0 only matches by regex, rank 1 by prefix and rank 2 by both
+    'RegexFirst': {'prefixes': [], 'patterns': [r'^reg.*'], 'known_ranges': []},
+    'PrefixSecond': {'prefixes': ['re', 'bc1'], 'patterns': [], 'known_ranges': ['pre']},
+    'Third': {'prefixes': ['bc1q'], 'patterns': [r'^pref.*', r'^x'], 'known_ranges': []},
+}
+
+
+class Clusters:
+    def __init__(self, anchors):
+        self.anchors = anchors
+
+    def anchor(self, address):
+        return self.anchors.get(address)
+
+
+def scan(known_addresses, exchange_patterns, address):
+    """identify_address as a plain scan over the tables, in insertion order"""
+    for entity, info in known_addresses.items():
+        if address in info['addresses']:
+            return {'name': entity, 'type': info['type']}
+    for exchange, patterns in exchange_patterns.items():
+        if (any(address.startswith(prefix) for prefix in patterns['prefixes'] + patterns['known_ranges'])
+                or any(re.match(pattern, address) for pattern in patterns['patterns'])):
+            return {'name': exchange, 'type': 'exchange'}
+    return None
+
+
+def name(label):
+    return label['name'] if label else None
+
+
+@pytest.fixture
+def classifier():
+    return AddressClassifier(KNOWN, PATTERNS)
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('bc1qlisted', 'binance'),  # The dict beats the prefixes of PrefixSecond and Third
+    ('regexlisted', 'whale'),  # ... and the regex of RegexFirst
+    ('3Shared', 'binance'),  # The first entity listing an address wins
+    ('regular', 'RegexFirst'),  # A regex entity ranked above the trie hit wins
+    ('rest', 'PrefixSecond'),  # A prefix without a better-ranked regex
+    ('prefix', 'PrefixSecond'),  # A known range beats the regex of a later entity
+    ('bc1qother', 'PrefixSecond'),  # The shorter prefix of the better rank wins
+    ('xyz', 'Third'),  # A regex alone
+    ('nothing', None),
+])
+def test_precedence(classifier, address, expected):
+    assert name(classifier.classify(address)) == expected
+    assert name(classifier.classify_many([address]).get(address)) == expected
+
+
+def test_matches_a_scan_over_the_builtin_tables():
+    tables = SimpleNamespace()
+    BitcoinWhaleTracker.load_default_labels(tables)
+    classifier = AddressClassifier(tables.known_addresses, tables.exchange_patterns)
+    addresses = [address for info in tables.known_addresses.values() for address in info['addresses']]
+    addresses += ['1FzWLkAahHooV3kzTgyx6qsswXJ6sCXkSR', 'bc1q' + 'a' * 40, 'bc1q' + 'a' * 10, '3' + 'b' * 30,
+                  '3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy', '1NDyJtNTjmwk5xPNhjgAMu4HDHigtobu1s', '0xdead', 'bnb1x',
+                  'bc1p' + 'c' * 58, '1' + 'd' * 33, '']
+
+    for address in addresses:
+        assert classifier.classify(address) == scan(tables.known_addresses, tables.exchange_patterns, address), address
+
+
+def test_cluster_anchor_comes_between_the_dict_and_the_patterns():
+    clusters = Clusters({'regcospent': 'bc1qlisted', 'bc1qlisted': 'bc1qlisted', 'regorphan': 'unlabelled'})
+    classifier = AddressClassifier(KNOWN, PATTERNS, clusters=clusters)
+
+    assert name(classifier.classify('regcospent')) == 'binance'
+    assert name(classifier.classify('bc1qlisted')) == 'binance'
+    # An anchor without a label of its own falls through to the patterns
+    assert name(classifier.classify('regorphan')) == 'RegexFirst'
+
+
+def test_overrides_come_before_the_database():
+    database = {'bc1qdb': {'name': 'kraken', 'type': 'exchange'},
+                'bc1qlisted': {'name': 'kraken', 'type': 'exchange'},
+                'bc1qhidden': {'name': 'whale', 'type': 'individual'},
+                'regdropped': {'name': 'dropped', 'type': 'exchange'}}
+    known = dict(KNOWN, dropped=None)
+    classifier = AddressClassifier(known, PATTERNS, database=database)
+
+    assert name(classifier.classify('bc1qlisted')) == 'binance'
+    assert name(classifier.classify('bc1qdb')) == 'kraken'
+    # Entities named in the overrides ignore their database addresses, and None hides one
+    assert name(classifier.classify('bc1qhidden')) == 'PrefixSecond'
+    assert name(classifier.classify('regdropped')) == 'RegexFirst'
+    assert {address: name(label) for address, label in classifier.classify_many(database).items()} == {
+        'bc1qdb': 'kraken', 'bc1qlisted': 'binance', 'bc1qhidden': 'PrefixSecond', 'regdropped': 'RegexFirst'}
+
+
+def test_classify_returns_copies(classifier):
+    classifier.classify('bc1qlisted')['name'] = 'changed'
+
+    assert name(classifier.classify('bc1qlisted')) == 'binance'
+
+
+def test_trie_keeps_the_lowest_rank():
+    trie = PrefixTrie()
+    trie.insert('bc1', 3)
+    trie.insert('bc1', 1)
+    trie.insert('bc1q', 2)
+    trie.insert('bc1q', 5)
+
+    assert trie.best_rank('bc1qxyz') == 1
+    assert trie.best_rank('bc') is None
+    trie.insert('', 0)
+    assert trie.best_rank('anything') == 0
@@ -0,0 +1,75 @@
+from address_clusters import AddressClusters
+
+
+def spend(*addresses):
+    return {'inputs': [{'prev_out': {'addr': address, 'value': 1000}} for address in addresses],
+            'out': [{'addr': 'change', 'value': 900}]}
+
+
+def test_co_spent_addresses_inherit_the_anchor():
+    clusters = AddressClusters(max_addresses=100)
+    clusters.mark('exchange')
+    clusters.add_transactions([spend('a', 'b'), spend('b', 'exchange'), spend('c', 'd')])
+
+    assert clusters.anchor('a') == 'exchange'
+    assert clusters.anchor('c') is None
+    assert clusters.anchor('unseen') is None
+
+
+def test_coinjoins_are_not_merged():
+    clusters = AddressClusters(max_addresses=100)
+    clusters.mark('exchange')
+    coinjoin = dict(spend('a', 'exchange'), out=[{'addr': f'o{i}', 'value': 500} for i in range(4)])
+    clusters.add_transactions([coinjoin])
+
+    assert clusters.anchor('a') is None
+
+
+def test_no_dirty_rows_without_a_checkpoint():
+    clusters = AddressClusters(max_addresses=1000)
+    clusters.add_transactions([spend(f'a{i}', f'b{i}') for i in range(200)])
+
+    assert clusters.new_nodes == [] and clusters.changed == set()
+    assert clusters.take_dirty() == ([], [], False)
+
+
+def test_full_forest_keeps_only_labelled_clusters():
+    clusters = AddressClusters(max_addresses=100, track_dirty=True)
+    clusters.mark('exchange')
+    clusters.add_transactions([spend('hot', 'exchange')])
+    clusters.take_dirty()
+    clusters.add_transactions([spend(f'a{i}', f'b{i}') for i in range(200)])
+
+    assert len(clusters) <= 100
+    assert clusters.compactions > 0
+    assert clusters.anchor('hot') == 'exchange'
+    assert clusters.anchor('a0') is None and 'a0' not in clusters.ids
+    # Later co-spends still reach the anchor
+    clusters.add_transactions([spend('late', 'hot')])
+    assert clusters.anchor('late') == 'exchange'
+    new_rows, changed_rows, reset = clusters.take_dirty()
+    assert reset
+    assert sorted(row[1] for row in new_rows) == sorted(clusters.ids)
+
+
+def test_forest_stops_growing_when_labelled_clusters_fill_it(caplog):
+    clusters = AddressClusters(max_addresses=10)
+    for i in range(8):
+        clusters.mark(f'exchange-{i}')
+    clusters.add_transactions([spend(f'a{i}', f'b{i}') for i in range(20)])
+    clusters.add_transactions([spend(f'c{i}', f'd{i}') for i in range(20)])
+
+    assert len(clusters) <= 10
+    assert clusters.full
+    assert sum('no longer clustered' in record.message for record in caplog.records) == 1
+    assert clusters.anchor('exchange-3') == 'exchange-3'
+
+
+def test_compaction_in_the_middle_of_a_transaction():
+    clusters = AddressClusters(max_addresses=6)
+    clusters.mark('exchange')
+    clusters.add_transactions([spend('x', 'y'), spend('z', 'w')])
+    clusters.add_transactions([spend('exchange', 'p', 'q')])
+
+    assert clusters.anchor('q') == 'exchange'
+    assert clusters.anchor('p') == 'exchange'
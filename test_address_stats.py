@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from address_stats import AddressStatsStore
+
+SEEN = datetime(2024, 1, 1)
+
+
+def fill(store, count):
+    for i in range(count):
+        store.update(f'address-{i}', i % 2 == 0, 1.5, SEEN)
+
+
+def test_entries_stay_bounded_without_a_checkpoint():
+    store = AddressStatsStore(max_entries=100)
+    fill(store, 10_000)
+
+    assert len(store) <= 100
+    assert store.dirty is None
+    assert store.take_dirty() == []
+
+
+def test_checkpointed_store_hands_over_each_update_once():
+    store = AddressStatsStore(max_entries=100, track_dirty=True)
+    fill(store, 250)
+
+    rows = store.take_dirty()
+    assert len(rows) == 250  # Evicted entries included, so none are lost
+    assert store.take_dirty() == []
+    store.update('address-3', False, 2.0, SEEN)
+    assert [row[0] for row in store.take_dirty()] == ['address-3']
+
+
+def test_spilled_entries_come_back(tmp_path):
+    store = AddressStatsStore(max_entries=10, spill_path=str(tmp_path / 'spill.db'))
+    fill(store, 50)
+    store.update('address-0', True, 1.0, SEEN)
+
+    stats = store.get('address-0')
+    assert (stats.sent_count, stats.total_sent) == (2, 2.5)
+    assert store.get('address-1').received_count == 1
+    store.close()
@@ -0,0 +1,55 @@
+import types
+
+import pytest
+
+from alert_dispatch import AlertSink, TwitterSink
+
+
+class TwitterError(Exception):
+    """Shaped like tweepy's HTTPException, which keeps the HTTP response"""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status} {message}")
+        self.response = types.SimpleNamespace(status_code=status)
+
+
+class FakeClient:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def create_tweet(self, text):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return types.SimpleNamespace(data={'id': '1'})
+
+
+def tweet(errors):
+    client = FakeClient(errors)
+    sink = TwitterSink(client, min_interval=0, retries=3, retry_delay=0)
+    sink.start()
+    sink.submit('alert')
+    sink.close()
+    return client, sink
+
+
+def test_alert_sink_requires_deliver():
+    with pytest.raises(TypeError):
+        AlertSink('incomplete')
+
+
+def test_rate_limits_are_retried():
+    client, sink = tweet([TwitterError(429, 'Too Many Requests'), RuntimeError('Rate limit exceeded')])
+    assert client.calls == 3
+    assert sink.delivered == 1
+
+
+@pytest.mark.parametrize('error', [
+    TwitterError(401, 'Unauthorized'),
+    TwitterError(403, 'You are not allowed to create a Tweet with duplicate content.'),
+])
+def test_other_errors_are_not_retried(error):
+    client, sink = tweet([error])
+    assert client.calls == 1
+    assert sink.delivered == 0
@@ -0,0 +1,71 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from block_parser import STREAM_THRESHOLD, iter_block_transactions
+
+
+class ChunkedReader:
+    """Async read() over a body, served in small chunks like a download"""
+
+    def __init__(self, body, chunk_size=4096):
+        self.f = io.BytesIO(body)
+        self.chunk_size = chunk_size
+
+    async def read(self, n=-1):
+        return self.f.read(self.chunk_size if n < 0 else min(n, self.chunk_size))
+
+
+def block(tx_count):
+    return {'hash': 'ab' * 32, 'height': 800_000, 'prev_block': 'cd' * 32, 'tx': [
+        {'hash': f'{i:064x}', 'time': 1_700_000_000, 'size': 250, 'weight': 1000,
+         'inputs': [{'prev_out': {'addr': f'in-{i}', 'value': 1000 + i, 'script': '00' * 40}, 'witness': 'ff' * 60}],
+         'out': [{'addr': f'out-{i}', 'value': 900 + i, 'script': '00' * 25, 'spent': False}]}
+        for i in range(tx_count)]}
+
+
+def parse(body, stream_threshold, tx_prefix='tx'):
+    header = {}
+
+    async def run():
+        return [tx async for tx in iter_block_transactions(ChunkedReader(body), tx_prefix, header, stream_threshold)]
+
+    return asyncio.run(run()), header
+
+
+@pytest.mark.parametrize('stream_threshold', [0, STREAM_THRESHOLD])
+def test_streamed_and_loaded_bodies_agree(stream_threshold):
+    body = json.dumps(block(50)).encode()
+    transactions, header = parse(body, stream_threshold)
+
+    assert len(transactions) == 50
+    assert transactions[7] == {'hash': f'{7:064x}', 'time': 1_700_000_000,
+                               'inputs': [{'prev_out': {'value': 1007, 'addr': 'in-7'}}],
+                               'out': [{'value': 907, 'addr': 'out-7'}]}
+    assert header['hash'] == 'ab' * 32 and header['height'] == 800_000
+
+
+def test_block_height_bodies_skip_side_chain_blocks():
+    # blockchain.info sends main_chain ahead of the transaction list
+    stale = dict({'main_chain': False}, **dict(block(3), hash='ee' * 32))
+    body = json.dumps({'blocks': [stale, dict({'main_chain': True}, **block(2))]}).encode()
+
+    for stream_threshold in (0, STREAM_THRESHOLD):
+        transactions, header = parse(body, stream_threshold, 'blocks.item.tx')
+        assert len(transactions) == 2
+        assert header['hash'] == 'ab' * 32
+
+
+def test_downloads_are_classified_before_they_finish():
+    body = json.dumps(block(2000)).encode()
+    reader = ChunkedReader(body)
+
+    async def first_transaction():
+        async for tx in iter_block_transactions(reader, 'tx', {}):
+            return tx, reader.f.tell()
+
+    tx, read = asyncio.run(first_transaction())
+    assert tx['hash'] == f'{0:064x}'
+    assert read < len(body) // 10
@@ -0,0 +1,118 @@
+import pytest
+
+from alert_dispatch import AlertSink
+from btc_monitor import BitcoinWhaleTracker
+from price_service import StaticPriceService
+
+
+def block(height):
+    return {'hash': f'{height:064x}', 'prev_block': f'{height - 1:064x}', 'height': height}
+
+
+class Chain:
+    """Stands in for blockchain.info: a tip, and heights whose download fails"""
+
+    def __init__(self, tip):
+        self.tip = tip
+        self.failing = set()
+        self.failing_after = {}  # Height -> transactions streamed before its download fails
+        self.transactions = {}
+        self.fetched = []
+
+    def get_json(self, url):
+        return block(self.tip)
+
+    async def stream_block(self, height, block_hash, header=None):
+        if height is None:
+            height = int(block_hash, 16)
+        self.fetched.append(height)
+        if height in self.failing:
+            raise ConnectionError(f"download of {height} failed")
+        if header is not None:
+            header.update(block(height))
+        for index, tx in enumerate(self.transactions.get(height, [])):
+            if self.failing_after.get(height) == index:
+                raise ConnectionError(f"download of {height} broke off")
+            yield tx
+
+
+class ListSink(AlertSink):
+    def __init__(self):
+        super().__init__('list')
+        self.alerts = []
+
+    def deliver(self, message, alert, profile):
+        self.alerts.append(alert)
+
+
+def whale(tx_hash):
+    return {'hash': tx_hash, 'time': 1_700_000_000,
+            'inputs': [{'prev_out': {'addr': '1AC4fMwgY8j9onSbXEWeH6Zan8QGMSdmtA', 'value': 1500 * 10 ** 8}}],
+            'out': [{'addr': '3FzScn724foqFRWvL1kCZwitQvcxrnSQ4K', 'value': 1500 * 10 ** 8 - 10_000}]}
+
+
+@pytest.fixture
+def chain(monkeypatch, tmp_path):
+    chain = Chain(100)
+    tracker = BitcoinWhaleTracker(block_cache_dir=None, state_path=str(tmp_path / 'state.db'))
+    tracker.quiet = True
+    tracker.price_service = StaticPriceService({})
+    monkeypatch.setattr(tracker.http, 'get_json', chain.get_json)
+    monkeypatch.setattr(tracker, 'stream_block', chain.stream_block)
+    chain.tracker = tracker
+    yield chain
+    tracker.close()
+
+
+def test_failed_block_is_fetched_again_by_the_next_poll(chain):
+    tracker = chain.tracker
+    tracker.poll()
+    assert tracker.last_block_height == 100
+
+    chain.tip = 104
+    chain.failing = {102}
+    with pytest.raises(RuntimeError, match='102'):
+        tracker.poll()
+    # 101 was processed; nothing from the failed height on was
+    assert tracker.last_block_height == 101
+    assert tracker.state.get_meta('last_block_height') == 101
+    assert f'{103:064x}' not in tracker.chain
+
+    chain.failing = set()
+    chain.fetched = []
+    tracker.poll()
+    assert chain.fetched == [102, 103, 104]
+    assert tracker.last_block_height == 104
+    assert all(f'{height:064x}' in tracker.chain for height in range(100, 105))
+
+
+def test_failed_first_block_is_not_skipped(chain):
+    tracker = chain.tracker
+    chain.failing = {100}
+    with pytest.raises(ConnectionError):
+        tracker.poll()
+    assert tracker.last_block_height is None
+
+    chain.failing = set()
+    tracker.poll()
+    assert tracker.last_block_height == 100
+
+
+def test_block_that_breaks_off_is_not_alerted_twice(chain):
+    tracker = chain.tracker
+    tracker.filter_chunk_size = 1
+    sink = tracker.dispatcher.add_sink(ListSink())
+    tracker.poll()
+
+    chain.tip = 101
+    chain.transactions[101] = [whale('aa' * 32), whale('bb' * 32)]
+    chain.failing_after[101] = 1
+    with pytest.raises(ConnectionError):
+        tracker.poll()
+    assert tracker.last_block_height == 100
+
+    del chain.failing_after[101]
+    tracker.poll()
+    tracker.dispatcher.close()
+    assert tracker.last_block_height == 101
+    assert sorted(alert['transaction_hash'] for alert in sink.alerts) == ['aa' * 32, 'bb' * 32]
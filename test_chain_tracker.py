@@ -0,0 +1,109 @@
+import pytest
+
+from alert_dispatch import AlertSink
+from btc_monitor import BitcoinWhaleTracker
+from chain_tracker import ChainTipTracker
+from price_service import StaticPriceService
+
+
+def h(name):
+    return name.ljust(64, '0')
+
+
+def alert(tx_hash, btc=1500):
+    return {'transaction_hash': tx_hash, 'btc_volume': btc}
+
+
+def test_extending_the_tip_orphans_nothing():
+    chain = ChainTipTracker()
+    assert chain.connect(100, h('a'), h('9')) == []
+    assert chain.connect(101, h('b'), h('a')) == []
+    assert chain.tip == (101, h('b'), h('a'))
+    assert chain.connect(101, h('b'), h('a')) == []  # Seen already
+    assert len(chain) == 2
+
+
+def test_competing_tip_orphans_the_old_one():
+    chain = ChainTipTracker()
+    chain.connect(100, h('a'), h('9'))
+    chain.connect(101, h('b'), h('a'), [alert('tx1'), alert('tx2')])
+
+    assert chain.is_fork(101, h('c'))
+    assert chain.connect(101, h('c'), h('a')) == [(101, h('b'))]
+    assert h('b') not in chain
+    assert chain.tip[1] == h('c')
+    assert sorted(a['transaction_hash'] for a in chain.take_retractions()) == ['tx1', 'tx2']
+    assert not chain.is_alerted('tx1')
+    assert chain.take_retractions() == []
+
+
+def test_block_on_a_different_parent_orphans_the_parent():
+    chain = ChainTipTracker()
+    chain.connect(100, h('a'), h('9'))
+    chain.connect(101, h('b'), h('a'))
+    chain.connect(102, h('c'), h('b'))
+
+    # 102' builds on 101', which we never saw: 101 and 102 are orphaned
+    assert chain.connect(102, h('e'), h('d')) == [(102, h('c')), (101, h('b'))]
+    assert [block[1] for block in chain.blocks] == [h('a'), h('e')]
+
+
+def test_re_mined_alerts_move_to_the_new_branch():
+    chain = ChainTipTracker()
+    chain.connect(100, h('a'), h('9'))
+    chain.connect(101, h('b'), h('a'), [alert('kept'), alert('dropped')])
+
+    chain.connect(101, h('c'), h('a'), [alert('kept')])
+    retracted = chain.take_retractions()
+
+    assert [a['transaction_hash'] for a in retracted] == ['dropped']
+    assert chain.is_alerted('kept')
+    assert chain.alerts[h('c')] == {'kept': alert('kept')}
+
+
+def test_window_evicts_the_oldest_blocks():
+    chain = ChainTipTracker(depth=3)
+    previous = h('0')
+    for height in range(1, 6):
+        chain.connect(height, h(str(height)), previous, [alert(f'tx{height}')])
+        previous = h(str(height))
+
+    assert [block[0] for block in chain.blocks] == [3, 4, 5]
+    assert h('2') not in chain
+    assert not chain.is_alerted('tx2')
+    assert chain.is_alerted('tx3')
+    assert not chain.is_fork(1, h('x'))  # Below the window, nothing to compare
+    assert chain.take_retractions() == []
+
+
+class ListSink(AlertSink):
+    def __init__(self):
+        super().__init__('list')
+        self.received = []
+
+    def deliver(self, message, alert, profile):
+        self.received.append((message, alert, profile))
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    tracker = BitcoinWhaleTracker(block_cache_dir=None)
+    tracker.quiet = True
+    tracker.price_service = StaticPriceService({})
+    yield tracker
+    tracker.close()
+
+
+def test_retractions_go_to_the_sinks(tracker, capsys):
+    sink = tracker.dispatcher.add_sink(ListSink())
+    tracker.connect_block(100, {'hash': h('a'), 'prev_block': h('9')}, [])
+    tracker.connect_block(101, {'hash': h('b'), 'prev_block': h('a')}, [alert('ab' * 32)])
+    tracker.connect_block(101, {'hash': h('c'), 'prev_block': h('a')}, [])
+    tracker.dispatcher.close()
+
+    [(message, retraction, profile)] = sink.received
+    assert message.startswith('↩️ Retracted: 1,500 #btc transfer abababab')
+    assert retraction['retracted'] is True
+    assert retraction['transaction_hash'] == 'ab' * 32
+    assert profile == 'default'
+    assert capsys.readouterr().out == ''  # Quiet: nothing printed
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import numpy as np
+
+from erc20_logs import ZERO_ADDRESS, TransferLogs, transfer_log
+
+USDT = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+USDC = '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48'
+TOKENS = [{'symbol': 'USDT', 'address': USDT, 'decimals': 6},
+          {'symbol': 'USDC', 'address': USDC, 'decimals': 6}]
+ALICE = '0x' + 'a1' * 20
+BOB = '0x' + 'b2' * 20
+
+
+def test_decodes_transfers():
+    logs = [transfer_log(USDC, ALICE, BOB, 1_500_000, 101, 7),
+            transfer_log(USDT, BOB, ALICE, 2 ** 200 + 5, 100, 3, tx_hash='0x' + 'cd' * 32)]
+    batch = TransferLogs(logs, TOKENS)
+
+    assert len(batch) == 2
+    assert list(batch.indexes(np.ones(2, dtype=bool))) == [1, 0]  # Block order
+    usdc = batch.transfer(0)
+    assert usdc['token'] == 'USDC'
+    assert usdc['from'] == ALICE and usdc['to'] == BOB
+    assert usdc['block'] == 101 and usdc['log_index'] == 7
+    assert usdc['amount'] == Decimal('1.5')
+    usdt = batch.transfer(1)
+    assert usdt['value'] == 2 ** 200 + 5
+    assert usdt['hash'] == '0x' + 'cd' * 32
+
+
+def test_skips_removed_and_foreign_logs():
+    removed = dict(transfer_log(USDT, ALICE, BOB, 1, 100, 0), removed=True)
+    foreign = transfer_log('0x' + 'ee' * 20, ALICE, BOB, 1, 100, 1)
+    batch = TransferLogs([removed, foreign, transfer_log(USDT, ALICE, BOB, 1, 100, 2)], TOKENS)
+
+    assert len(batch) == 1
+    assert batch.skipped == 2
+
+
+def test_mints_and_burns():
+    batch = TransferLogs([transfer_log(USDT, ZERO_ADDRESS, ALICE, 10, 100, 0),
+                          transfer_log(USDT, ALICE, ZERO_ADDRESS, 10, 100, 1),
+                          transfer_log(USDT, ALICE, BOB, 10, 100, 2)], TOKENS)
+
+    assert list(batch.mints) == [True, False, False]
+    assert list(batch.burns) == [False, True, False]
+
+
+def test_at_least_compares_every_limb():
+    # 2^64 base units differ from the threshold only below the top limb
+    threshold = Decimal(2 ** 64 + 1).scaleb(-6)
+    values = [2 ** 64, 2 ** 64 + 1, 2 ** 64 + 2, 2 ** 128, 2 ** 192 - 1, 5]
+    batch = TransferLogs([transfer_log(USDT, ALICE, BOB, value, 100, i) for i, value in enumerate(values)], TOKENS)
+
+    assert list(batch.at_least(threshold)) == [False, True, True, True, True, False]
+    assert list(batch.over_threshold(threshold)) == [1, 2, 3, 4]
+
+
+def test_at_least_rounds_fractional_thresholds_up():
+    batch = TransferLogs([transfer_log(USDT, ALICE, BOB, value, 100, i)
+                          for i, value in enumerate([1_000_000, 1_000_001])], TOKENS)
+
+    assert list(batch.at_least('1.0000005')) == [False, True]
+
+
+def test_empty_batch():
+    batch = TransferLogs([], TOKENS)
+
+    assert len(batch) == 0
+    assert batch.at_least(1).shape == (0,)
+    assert len(batch.over_threshold(0)) == 0
+    columns = batch.columns(batch.indexes(batch.mints | batch.burns))
+    assert columns['tx_hash'].shape == (0, 32)
+    assert columns['limbs'].shape == (0, 4)
@@ -0,0 +1,66 @@
+import pytest
+
+from evm_addresses import EVMLabelIndex, normalize_evm_address
+from usdt_monitor import USDTWhaleTracker
+
+BINANCE_HOT = '0xF977814e90dA44bFA03b6295A0616a897441aceC'
+UNKNOWN = '0x' + 'c3' * 20
+
+
+@pytest.fixture
+def index():
+    return EVMLabelIndex({
+        'binance': {'type': 'exchange', 'addresses': [BINANCE_HOT, 'not an address']},
+        'tether': {'type': 'issuer', 'addresses': [BINANCE_HOT.lower(), '0x' + 'ab' * 20]},
+    })
+
+
+@pytest.fixture
+def tracker(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # The monitor logs to a file in the working directory
+    return USDTWhaleTracker(cursor_path=str(tmp_path / 'cursors.json'))
+
+
+@pytest.mark.parametrize('spelling', [BINANCE_HOT, BINANCE_HOT.lower(), '0x' + BINANCE_HOT[2:].upper(),
+                                      f'  {BINANCE_HOT}\n'])
+def test_any_spelling_hits(index, spelling):
+    assert index.get(spelling) == {'name': 'binance', 'type': 'exchange'}
+
+
+@pytest.mark.parametrize('address', [UNKNOWN, BINANCE_HOT[:-1], BINANCE_HOT[2:], '0X' + BINANCE_HOT[2:],
+                                     BINANCE_HOT + '00', '', None, 42])
+def test_misses(index, address):
+    assert index.get(address) is None
+
+
+def test_normalized_key_is_the_address_bytes():
+    assert normalize_evm_address(BINANCE_HOT) == bytes.fromhex(BINANCE_HOT[2:])
+    assert normalize_evm_address('0x' + 'zz' * 20) is None
+
+
+def test_first_entity_wins_and_problems_are_recorded(index):
+    assert len(index) == 2
+    assert index.get('0x' + 'AB' * 20)['name'] == 'tether'
+    assert index.problems == [
+        "binance: 'not an address' is not a valid address",
+        f"{BINANCE_HOT.lower()} is listed by both binance and tether; keeping binance",
+    ]
+
+
+def test_tracker_identifies_any_spelling(tracker):
+    assert tracker.identify_address(BINANCE_HOT.lower()) == {'name': 'binance', 'type': 'exchange'}
+    assert tracker.identify_address(BINANCE_HOT.upper().replace('0X', '0x')) == {'name': 'binance', 'type': 'exchange'}
+    assert tracker.identify_address(UNKNOWN) is None
+    # Callers get a copy, not the shared label
+    tracker.identify_address(BINANCE_HOT)['name'] = 'changed'
+    assert tracker.identify_address(BINANCE_HOT)['name'] == 'binance'
+
+
+def test_added_addresses_reach_the_index_and_the_message(tracker):
+    tracker.add_known_addresses({'binance': {'type': 'exchange', 'addresses': [UNKNOWN.upper().replace('0X', '0x')]}})
+
+    assert tracker.identify_address(UNKNOWN)['name'] == 'binance'
+    assert UNKNOWN.upper().replace('0X', '0x') in tracker.known_addresses['binance']['addresses']
+    message = tracker.format_transfer_message({'amount': 5_000_000, 'chain': 'ethereum', 'token': 'USDT',
+                                               'from': UNKNOWN, 'to': '0x' + 'd4' * 20, 'hash': '0x' + '00' * 32})
+    assert '#Binance to #Unknown' in message
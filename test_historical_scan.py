@@ -0,0 +1,34 @@
+import json
+import threading
+
+import historical_scan
+from http_client import get_client
+
+
+def block(height):
+    whale = {
+        'hash': f'{height:064x}', 'time': 1_700_000_000 + height,
+        'inputs': [{'prev_out': {'addr': '1AC4fMwgY8j9onSbXEWeH6Zan8QGMSdmtA', 'value': 2000 * 10 ** 8}}],
+        'out': [{'addr': '3FzScn724foqFRWvL1kCZwitQvcxrnSQ4K', 'value': 1999 * 10 ** 8}]
+    }
+    return {'hash': f'{height:064x}', 'height': height, 'time': 1_700_000_000 + height, 'tx': [whale]}
+
+
+def test_shards_close_their_trackers(tmp_path):
+    replay_dir = tmp_path / 'blocks'
+    replay_dir.mkdir()
+    for height in range(100, 106):
+        (replay_dir / f'block_{height}.json').write_text(json.dumps(block(height)))
+    historical_scan._init_worker({
+        'min_btc': 1000, 'profiles': [], 'label_db': None, 'btc_price': None, 'online_prices': False,
+        'replay_dir': str(replay_dir), 'block_cache_dir': str(tmp_path / 'block_cache')
+    })
+
+    get_client()  # The shared client's loop thread outlives every tracker
+    threads = threading.active_count()
+    results = [historical_scan.scan_shard(shard) for shard in historical_scan.plan_shards(100, 105, 2)]
+
+    assert threading.active_count() == threads
+    assert [result['blocks'] for result in results] == [2, 2, 2]
+    assert sum(len(result['alerts']) for result in results) == 6
+    assert all(alert['btc_price'] is None for result in results for alert in result['alerts'])
@@ -0,0 +1,134 @@
+import importlib.util
+import os
+import zlib
+from pathlib import Path
+
+import pytest
+
+from label_db import HEADER, MAGIC, RECORD, SLOT, VERSION, LabelDatabase, compile_labels
+
+KNOWN = {
+    'Binance': {'type': 'exchange', 'addresses': ['1AC4fMwgY8j9onSbXEWeH6Zan8QGMSdmtA', 'bc1qbinance']},
+    'Coinbase': {'type': 'exchange', 'addresses': ['3FzScn724foqFRWvL1kCZwitQvcxrnSQ4K', 'bc1qbinance']},
+}
+
+
+def load_script(name):
+    path = Path(__file__).resolve().parent / 'scripts' / f'{name}.py'
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def colliding_addresses(count, slot_count=8):
+    """Addresses that all hash to slot 0 of a table with slot_count slots"""
+    addresses = []
+    i = 0
+    while len(addresses) < count:
+        address = f'1Collide{i}'
+        if zlib.crc32(address.encode('utf-8')) & (slot_count - 1) == 0:
+            addresses.append(address)
+        i += 1
+    return addresses
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'labels.db')
+
+
+def test_header_and_sections(path):
+    count = compile_labels(path, KNOWN, {'Binance': ['^bnb']}, {'USDT': ['0xdac1']})
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    (magic, version, address_count, slot_count, records, slots,
+     pool, metadata, metadata_size) = HEADER.unpack_from(data)
+    assert (magic, version) == (MAGIC, VERSION)
+    assert count == address_count == 3
+    assert slot_count == 8
+    assert records == HEADER.size
+    assert slots == records + address_count * RECORD.size
+    assert pool == slots + slot_count * SLOT.size
+    assert metadata + metadata_size == len(data)
+    # Records are sorted by address and point into the string pool
+    addresses = []
+    for index in range(address_count):
+        offset, entity, length = RECORD.unpack_from(data, records + index * RECORD.size)
+        addresses.append(data[pool + offset:pool + offset + length].decode('utf-8'))
+    assert addresses == sorted(addresses)
+
+
+def test_round_trip_hits_and_misses(path):
+    compile_labels(path, KNOWN, {'Binance': ['^bnb']}, {'USDT': ['0xdac1']},
+                   [('bc1qcold', 'Kraken', 'exchange'), ('1AC4fMwgY8j9onSbXEWeH6Zan8QGMSdmtA', 'Other', 'unknown')])
+    db = LabelDatabase(path)
+
+    assert len(db) == 4
+    assert db.get('1AC4fMwgY8j9onSbXEWeH6Zan8QGMSdmtA') == {'name': 'Binance', 'type': 'exchange'}
+    assert db.get('bc1qcold') == {'name': 'Kraken', 'type': 'exchange'}
+    # The first entity listing an address wins
+    assert db.get('bc1qbinance')['name'] == 'Binance'
+    assert 'bc1qunknown' not in db
+    assert db.get('bc1qunknown', 'missing') == 'missing'
+    assert db.get('') is None
+    assert db.exchange_patterns == {'Binance': ['^bnb']}
+    assert db.stablecoin_addresses == {'USDT': ['0xdac1']}
+
+
+def test_colliding_addresses_probe_to_their_own_records(path):
+    addresses = colliding_addresses(3)
+    compile_labels(path, {}, extra_labels=[(address, f'entity{i}', 'exchange') for i, address in enumerate(addresses)])
+    db = LabelDatabase(path)
+
+    assert [db.get(address)['name'] for address in addresses] == ['entity0', 'entity1', 'entity2']
+    # A miss in the same chain probes past every colliding slot
+    assert db.get(colliding_addresses(4)[3]) is None
+
+
+def test_reload_after_recompile(path):
+    compile_labels(path, KNOWN)
+    db = LabelDatabase(path)
+    old = db.mapping
+
+    assert db.reload_if_changed() is False
+    compile_labels(path, {}, extra_labels=[('bc1qnew', 'Kraken', 'exchange')])
+    assert db.reload_if_changed() is True
+
+    assert len(db) == 1
+    assert db.get('bc1qnew')['name'] == 'Kraken'
+    assert db.get('bc1qbinance') is None
+    # A lookup holding the old mapping still reads the replaced file
+    assert old.get('bc1qbinance')['name'] == 'Binance'
+
+
+def test_reload_keeps_the_mapping_when_the_file_is_gone(path):
+    compile_labels(path, KNOWN)
+    db = LabelDatabase(path)
+    os.unlink(path)
+
+    assert db.reload_if_changed() is False
+    assert db.get('bc1qbinance')['name'] == 'Binance'
+
+
+def test_open_rejects_other_files(path):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+
+    with pytest.raises(ValueError):
+        LabelDatabase(path)
+
+
+def test_compile_labels_script(path, tmp_path, monkeypatch):
+    labels_csv = tmp_path / 'labels.csv'
+    labels_csv.write_text('address,entity,type\nbc1qcsv,Kraken,\n,Nobody,exchange\n')
+    script = load_script('compile_labels')
+    monkeypatch.setattr('sys.argv', ['compile_labels.py', '--output', path, '--csv', str(labels_csv), '--no-builtin'])
+
+    script.main()
+
+    db = LabelDatabase(path)
+    assert len(db) == 1
+    assert db.get('bc1qcsv') == {'name': 'Kraken', 'type': 'unknown'}
+    assert db.exchange_patterns == script.builtin_tables().exchange_patterns
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import aiohttp
+import pytest
+
+from alert_dispatch import AlertSink
+from btc_monitor import BitcoinWhaleTracker
+from mempool import BlockchainInfoMempoolSource, ReplayMempoolSource
+from price_service import StaticPriceService
+
+BINANCE = '1AC4fMwgY8j9onSbXEWeH6Zan8QGMSdmtA'
+COINBASE = '3FzScn724foqFRWvL1kCZwitQvcxrnSQ4K'
+
+
+class ListSink(AlertSink):
+    def __init__(self):
+        super().__init__('list')
+        self.alerts = []
+
+    def deliver(self, message, alert, profile):
+        self.alerts.append(alert)
+
+
+def tx(tx_hash, btc):
+    return {'hash': tx_hash, 'time': 1_700_000_000,
+            'inputs': [{'prev_out': {'addr': BINANCE, 'value': int(btc * 10 ** 8)}}],
+            'out': [{'addr': COINBASE, 'value': int(btc * 10 ** 8) - 10_000}]}
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    tracker = BitcoinWhaleTracker(block_cache_dir=str(tmp_path / 'block_cache'))
+    tracker.quiet = True
+    tracker.price_service = StaticPriceService({'BTC': 60000.0})
+    tracker.sink = tracker.dispatcher.add_sink(ListSink())
+    yield tracker
+    tracker.close()
+
+
+def test_replayed_mempool_whale_is_alerted_once(tracker, tmp_path):
+    recording = tmp_path / 'mempool.jsonl'
+    recording.write_text('\n'.join(json.dumps(t) for t in [tx('aa' * 32, 1500), tx('bb' * 32, 2), tx('aa' * 32, 1500)]))
+
+    tracker.monitor_mempool(ReplayMempoolSource(str(recording)))
+    tracker.dispatcher.close()
+
+    assert [alert['transaction_hash'] for alert in tracker.sink.alerts] == ['aa' * 32]
+    alert = tracker.sink.alerts[0]
+    assert alert['confirmed'] is False
+    assert alert['btc_volume'] == 1500
+    assert alert['btc_price'] == 60000.0
+
+
+def test_mined_mempool_whale_is_not_alerted_again(tracker):
+    tracker.monitor_mempool(ReplayMempoolSource([tx('aa' * 32, 1500)]))
+    alerts = tracker.process_block(800_000, [tx('aa' * 32, 1500)])
+    tracker.dispatcher.close()
+
+    assert len(alerts) == 1
+    assert len(tracker.sink.alerts) == 1
+    assert tracker.mempool_alerts == {}
+
+
+class Message:
+    def __init__(self, text):
+        self.type = aiohttp.WSMsgType.TEXT
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSocket:
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def __aenter__(self):
+        if isinstance(self.messages, Exception):
+            raise self.messages
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send_json(self, data):
+        pass
+
+    def __aiter__(self):
+        return self._messages()
+
+    async def _messages(self):
+        for message in self.messages:
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+
+class FakeHttp:
+    """Each websocket() call opens the next scripted connection"""
+
+    def __init__(self, *connections):
+        self.connections = list(connections)
+
+    def websocket(self, url):
+        return FakeSocket(self.connections.pop(0))
+
+
+def utx(tx_hash):
+    return Message(json.dumps({'op': 'utx', 'x': tx(tx_hash, 1500)}))
+
+
+def feed(source, count, monkeypatch):
+    """The first count transactions of source and the reconnect delays slept on the way"""
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+
+    async def take():
+        hashes = []
+        async for transaction in source.transactions():
+            hashes.append(transaction['hash'])
+            if len(hashes) == count:
+                return hashes
+
+    return asyncio.run(take()), delays
+
+
+def test_feed_skips_unreadable_messages(monkeypatch):
+    http = FakeHttp([Message('{not json'), Message(json.dumps({'op': 'utx'})), Message('{"op": "status"}'), utx('aa' * 32)])
+
+    assert feed(BlockchainInfoMempoolSource(http), 1, monkeypatch) == (['aa' * 32], [])
+
+
+def test_feed_reconnects_with_backoff_on_any_connection_error(monkeypatch):
+    http = FakeHttp(ConnectionResetError('reset'), OSError('unreachable'), [utx('aa' * 32), ValueError('torn frame')],
+                    RuntimeError('refused'), [utx('bb' * 32)])
+
+    hashes, delays = feed(BlockchainInfoMempoolSource(http, reconnect_delay=1), 2, monkeypatch)
+
+    assert hashes == ['aa' * 32, 'bb' * 32]
+    assert delays == [1, 2, 1, 2]
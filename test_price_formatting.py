@@ -0,0 +1,40 @@
+import pytest
+
+from btc_monitor import BitcoinWhaleTracker
+from price_service import StaticPriceService
+from subscriber_profiles import concise_format
+
+
+@pytest.fixture(scope='module')
+def tracker(tmp_path_factory):
+    return BitcoinWhaleTracker(block_cache_dir=str(tmp_path_factory.mktemp('block_cache')))
+
+
+@pytest.fixture(params=['btc_monitor', 'concise'])
+def format_alert(request, tracker):
+    return tracker.format_transaction if request.param == 'btc_monitor' else concise_format
+
+
+def alert(btc_price):
+    return {'tx_type': 'unknown_transfer', 'btc_volume': 1500.0, 'fee_btc': 0.0002, 'btc_price': btc_price,
+            'from_entity': None, 'to_entity': None}
+
+
+def test_priced_alert_shows_usd(format_alert):
+    message = format_alert(alert(60000.0))
+    assert '(90,000,000 USD)' in message
+    assert '($12)' in message
+
+
+def test_unpriced_alert_omits_usd(format_alert):
+    message = format_alert(alert(None))
+    assert 'USD' not in message
+    assert '$' not in message
+    assert 'sats fees' in message
+
+
+def test_static_prices_are_unknown_when_missing():
+    service = StaticPriceService({})
+    assert service.price() is None
+    assert service.historical_price(1_600_000_000) is None
+    assert StaticPriceService({'BTC': 60000.0}).historical_price(1_600_000_000) == 60000.0
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """monotonic() and asyncio.sleep() for rate_limiter, advanced only by sleeping"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self.real_sleep = asyncio.sleep
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        await self.real_sleep(0)  # Let the other tasks run, as a real sleep would
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Only the limiter's clock; the event loop keeps the real one
+    monkeypatch.setattr(rate_limiter, 'time', SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(rate_limiter.asyncio, 'sleep', clock.sleep)
+    return clock
+
+
+def acquire(bucket, count=1):
+    async def run():
+        return [await bucket.acquire() for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_burst_up_to_capacity_then_wait(clock):
+    bucket = TokenBucket(2, capacity=3)
+
+    assert acquire(bucket, 3) == [0, 0, 0]
+    assert clock.sleeps == []
+    assert acquire(bucket) == [0.5]
+    assert clock.sleeps == [0.5]
+
+
+def test_refill_is_continuous_and_capped(clock):
+    bucket = TokenBucket(4, capacity=2)
+    acquire(bucket, 2)
+
+    clock.now += 0.25
+    assert acquire(bucket) == [0]
+    assert bucket.tokens == 0
+    # A long idle spell refills only up to capacity
+    clock.now += 60
+    assert acquire(bucket, 3) == [0, 0, 0.25]
+
+
+def test_capacity_defaults_to_rate(clock):
+    bucket = TokenBucket(5)
+
+    assert acquire(bucket, 6) == [0] * 5 + [0.2]
+
+
+def test_concurrent_acquires_are_served_in_order(clock):
+    bucket = TokenBucket(2, capacity=2)
+    served = []
+
+    async def take(i):
+        waited = await bucket.acquire()
+        served.append(i)
+        return waited
+
+    async def run():
+        return await asyncio.gather(*(take(i) for i in range(5)))
+
+    assert asyncio.run(run()) == [0, 0, 0.5, 1.0, 1.5]
+    assert served == [0, 1, 2, 3, 4]
+    assert bucket.waiting == 0
+
+
+def test_penalize_holds_back_every_caller(clock):
+    bucket = TokenBucket(2, capacity=2)
+
+    bucket.penalize(3)
+
+    assert acquire(bucket) == [3.5]
+    assert sum(clock.sleeps) == 3.5
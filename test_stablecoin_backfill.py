@@ -0,0 +1,120 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from erc20_logs import ZERO_ADDRESS, JSONRPCError, StubLogSource, TransferLogs, transfer_log
+from stablecoin_backfill import TileSizer, backfill_transfers, fetch_range, load_backfill, plan_partitions
+
+USDT = '0xdac17f958d2ee523a2206206994597c13d831ec7'
+USDC = '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48'
+TOKENS = [{'symbol': 'USDT', 'address': USDT, 'decimals': 6},
+          {'symbol': 'USDC', 'address': USDC, 'decimals': 18}]
+ALICE = '0x' + 'a1' * 20
+BOB = '0x' + 'b2' * 20
+
+
+def logs(start, end, per_block=1):
+    return [transfer_log(USDT if block % 2 else USDC, ALICE, BOB, (block + 1) * 10 ** 12, block, i)
+            for block in range(start, end + 1) for i in range(per_block)]
+
+
+def backfill(source, directory, start, end, **kwargs):
+    return backfill_transfers(source, TOKENS, start, end, output_dir=str(directory), partition_size=100,
+                              concurrency=2, max_span=50, **kwargs)
+
+
+def test_plan_partitions_align_to_the_partition_size():
+    assert plan_partitions(150, 420, 100) == [(100, 199), (200, 299), (300, 399), (400, 420)]
+
+
+def test_tiles_split_under_the_result_cap():
+    source = StubLogSource(logs(0, 99), max_results=7)
+    sizer = TileSizer(max_span=64)
+
+    fetched = asyncio.run(fetch_range(source, [USDT, USDC], 0, 99, sizer))
+
+    assert [int(log['blockNumber'], 16) for log in fetched] == list(range(100))
+    assert sizer.splits > 0
+    assert sizer.span <= 64
+
+
+def test_tiles_split_down_to_one_block_then_raise():
+    source = StubLogSource(logs(10, 12, per_block=3), max_results=2)
+    sizer = TileSizer(max_span=8)
+
+    with pytest.raises(JSONRPCError):
+        asyncio.run(fetch_range(source, [USDT, USDC], 10, 12, sizer))
+    assert sizer.span == 1
+
+
+def test_other_errors_are_not_split():
+    class FailingSource(StubLogSource):
+        async def get_logs(self, addresses, from_block, to_block, topics=()):
+            raise JSONRPCError(-32000, 'header not found')
+
+    sizer = TileSizer(max_span=8)
+    with pytest.raises(JSONRPCError):
+        asyncio.run(fetch_range(FailingSource(), [USDT], 0, 99, sizer))
+    assert sizer.splits == 0
+
+
+def test_resume_skips_complete_partitions_and_refetches_a_truncated_one(tmp_path):
+    first = backfill(StubLogSource(logs(0, 349), latest_block=250), tmp_path, 0, 399)
+    assert first['fetched_partitions'] == 3
+    assert sorted(os.listdir(tmp_path)) == ['manifest.json', 'transfers_000000000_000000099.npz',
+                                            'transfers_000000100_000000199.npz', 'transfers_000000200_000000250.npz']
+
+    source = StubLogSource(logs(0, 399), latest_block=399)
+    second = backfill(source, tmp_path, 0, 399)
+
+    assert second['fetched_partitions'] == 2  # 200-299, cut short before, and 300-399
+    assert sorted(os.listdir(tmp_path)) == ['manifest.json', 'transfers_000000000_000000099.npz',
+                                            'transfers_000000100_000000199.npz', 'transfers_000000200_000000299.npz',
+                                            'transfers_000000300_000000399.npz']
+    assert list(load_backfill(str(tmp_path))['block']) == list(range(400))
+
+
+def test_manifest_mismatch_is_refused(tmp_path):
+    backfill(StubLogSource(logs(0, 99)), tmp_path, 0, 99, min_amount=1000)
+
+    with pytest.raises(ValueError):
+        backfill(StubLogSource(logs(0, 99)), tmp_path, 0, 99, min_amount=5000)
+
+
+def test_filters_keep_mints_burns_and_watched_addresses(tmp_path):
+    treasury = '0x' + 'c3' * 20
+    source = StubLogSource([transfer_log(USDT, ALICE, BOB, 10, 1, 0),
+                            transfer_log(USDT, ZERO_ADDRESS, ALICE, 10, 1, 1),
+                            transfer_log(USDT, ALICE, ZERO_ADDRESS, 10, 1, 2),
+                            transfer_log(USDT, treasury, BOB, 10, 1, 3),
+                            transfer_log(USDT, ALICE, BOB, 2000 * 10 ** 6, 1, 4)])
+    report = backfill(source, tmp_path, 0, 1, min_amount=1000, keep_addresses=[treasury.upper()])
+
+    assert report['transfers'] == 5
+    assert list(load_backfill(str(tmp_path))['log_index']) == [1, 2, 3, 4]
+
+
+def test_load_backfill_amounts_match_the_exact_limbs(tmp_path):
+    values = [1, 123_456_789, 2 ** 64 + 7, 10 ** 30, 2 ** 200]
+    source = StubLogSource([transfer_log(USDT if i % 2 else USDC, ALICE, BOB, value, 5, i)
+                            for i, value in enumerate(values)])
+    backfill(source, tmp_path, 0, 5)
+
+    loaded = load_backfill(str(tmp_path))
+    exact = [int.from_bytes(np.asarray(limbs, dtype='>u8').tobytes(), 'big') for limbs in loaded['limbs']]
+    assert exact == values
+    decimals = [loaded['tokens'][token]['decimals'] for token in loaded['token']]
+    assert np.allclose(loaded['amount'], [value / 10 ** d for value, d in zip(values, decimals)], rtol=1e-12)
+
+    batch = TransferLogs(source.logs, TOKENS)
+    assert [batch.raw_amount(i) for i in range(len(batch))] == values
+
+
+def test_load_backfill_of_an_empty_directory(tmp_path):
+    backfill(StubLogSource([], latest_block=10), tmp_path, 0, 10)
+
+    loaded = load_backfill(str(tmp_path))
+    assert len(loaded['block']) == 0
+    assert len(loaded['amount']) == 0
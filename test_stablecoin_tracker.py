@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from erc20_logs import ZERO_ADDRESS, StubLogSource, transfer_log
+from stablecoin_tracker import StablecoinTracker
+
+USDT = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+BINANCE = '0x28C6c06298d514Db089934071355E5743bf21d60'
+
+
+@pytest.fixture
+def tracker(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # The tracker may log to a file in the working directory
+    logs = [transfer_log(USDT, ZERO_ADDRESS, BINANCE, 5 * 10 ** 12, block, 0) for block in range(1000, 9000, 100)]
+    tracker = StablecoinTracker(min_amount=100000, log_source=StubLogSource(logs, max_results=10))
+    tracker.max_poll_blocks = 3000
+    tracker.events = []
+    monkeypatch.setattr(tracker, '_handle_mint', tracker.events.append)
+    return tracker
+
+
+def test_poll_is_capped_and_split_under_the_result_cap(tracker):
+    last_block = asyncio.run(tracker.poll_eth_events(999, 8999))
+
+    assert last_block == 3999
+    assert [event['value'] for event in tracker.events] == [5_000_000] * 30
+    assert tracker.tile_sizer.splits > 0
+
+
+def test_polls_catch_up_to_the_head(tracker):
+    last_block = 999
+    while last_block < 8999:
+        last_block = asyncio.run(tracker.poll_eth_events(last_block, 8999))
+
+    assert len(tracker.events) == 80
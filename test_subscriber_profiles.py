@@ -0,0 +1,43 @@
+import pytest
+
+from btc_monitor import BitcoinWhaleTracker
+from subscriber_profiles import build_profiles
+
+MEXC_HOT = 'bc1qmxjzz8fpu5n6mrtz3xtpzexcxvq8w37nrjg3mk'
+MEXC_RESERVE = '38FkXQzYGxYmYM5UqTSzKzUXecJGDwHhps'
+BITGET_COLD = '3BitGetXxYyZzWw9q8n5w5z2j5x3q9yv7f2KLmN'
+POLONIEX_HOT = '39JiKPcbD8yKdYuxzKgM5bU7YGJ8PhKxJ4'
+BLACKROCK_CUSTODY = 'bc1qmpvqxgx3jg0th9ykyl59tfrw8v0nz8czz8ez3z'
+
+
+@pytest.fixture(scope='module')
+def tracker(tmp_path_factory):
+    return BitcoinWhaleTracker(profiles=build_profiles(['1000', '500', '100']),
+                               block_cache_dir=str(tmp_path_factory.mktemp('block_cache')))
+
+
+def label(tracker, profile_name, address):
+    profile = next(profile for profile in tracker.profiles if profile.name == profile_name)
+    entity = (profile.classifier or tracker.address_classifier).classify(address)
+    return entity['name'] if entity else None
+
+
+# Labels of the former btc_monitor500.py and btc_monitor100.py scripts
+@pytest.mark.parametrize('profile_name, address, expected', [
+    ('500', MEXC_HOT, 'Binance'),
+    ('500', MEXC_RESERVE, 'Binance'),
+    ('500', BITGET_COLD, 'Coinbase'),
+    ('500', POLONIEX_HOT, 'Binance'),
+    ('100', MEXC_HOT, 'mexc'),
+    ('100', MEXC_RESERVE, 'mexc'),
+    ('100', BITGET_COLD, 'bitget'),
+    ('100', POLONIEX_HOT, 'poloniex'),
+])
+def test_small_whale_profile_labels(tracker, profile_name, address, expected):
+    assert label(tracker, profile_name, address) == expected
+
+
+def test_institutions_only_labelled_at_1000(tracker):
+    assert label(tracker, '1000', BLACKROCK_CUSTODY) == 'blackrock'
+    assert label(tracker, '500', BLACKROCK_CUSTODY) != 'blackrock'
+    assert label(tracker, '100', BLACKROCK_CUSTODY) != 'blackrock'
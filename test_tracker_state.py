@@ -0,0 +1,110 @@
+import sqlite3
+
+import pytest
+
+from alert_dispatch import AlertSink
+from btc_monitor import BitcoinWhaleTracker
+from price_service import StaticPriceService
+
+BINANCE = '1AC4fMwgY8j9onSbXEWeH6Zan8QGMSdmtA'
+
+
+class ListSink(AlertSink):
+    def __init__(self):
+        super().__init__('list')
+        self.alerts = []
+
+    def deliver(self, message, alert, profile):
+        self.alerts.append(alert)
+
+
+def block(height):
+    return {'hash': f'{height:064x}', 'prev_block': f'{height - 1:064x}', 'height': height}
+
+
+def whale(height, index):
+    """A 1500 BTC transaction co-spending a new address with Binance's"""
+    return {'hash': f'{height:032x}{index:032x}', 'time': 1_700_000_000 + height * 600,
+            'inputs': [{'prev_out': {'addr': f'1Sender{height}x{index}', 'value': 1000 * 10 ** 8}},
+                       {'prev_out': {'addr': BINANCE, 'value': 500 * 10 ** 8}}],
+            'out': [{'addr': f'3Receiver{height}x{index}', 'value': 1500 * 10 ** 8 - 10_000}]}
+
+
+def make_tracker(path):
+    tracker = BitcoinWhaleTracker(block_cache_dir=None, state_path=path)
+    tracker.quiet = True
+    tracker.price_service = StaticPriceService({})
+    tracker.sink = tracker.dispatcher.add_sink(ListSink())
+    # A tiny stats store, so most addresses are evicted between checkpoints
+    tracker.address_stats.max_entries = 3
+    tracker.address_stats.evict_batch = 1
+    return tracker
+
+
+def mine(tracker, height, checkpoint=True):
+    """What poll() does with one downloaded block"""
+    alerts = tracker.process_block(height, [whale(height, index) for index in range(2)])
+    tracker.connect_block(height, block(height), alerts)
+    tracker.last_block_height = height
+    if checkpoint:
+        tracker.checkpoint(height)
+
+
+def addresses(heights):
+    return [f'{prefix}{height}x{index}' for height in heights for index in range(2) for prefix in ('1Sender', '3Receiver')]
+
+
+def snapshot(tracker, heights):
+    return {
+        'height': tracker.last_block_height,
+        'chain': list(tracker.chain.blocks),
+        'alerted': [tracker.chain.is_alerted(whale(height, 0)['hash']) for height in heights],
+        'stats': {address: tracker.address_stats.get(address).as_row(address) for address in addresses(heights)},
+        'anchors': {address: tracker.clusters.anchor(address) for address in addresses(heights) + [BINANCE]},
+        'clustered': len(tracker.clusters),
+    }
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / 'state.db')
+
+
+def test_checkpoint_resumes_with_the_same_state(path):
+    tracker = make_tracker(path)
+    for height in range(100, 104):
+        mine(tracker, height)
+    saved = snapshot(tracker, range(100, 104))
+    tracker.close()
+
+    assert saved['height'] == 103
+    assert saved['anchors'][f'1Sender{100}x0'] == BINANCE
+    assert saved['stats'][f'1Sender{100}x1'][1:3] == (0, 1)
+    resumed = make_tracker(path)
+    try:
+        assert snapshot(resumed, range(100, 104)) == saved
+    finally:
+        resumed.close()
+
+
+def test_evictions_are_written_only_by_the_checkpoint(path):
+    tracker = make_tracker(path)
+    mine(tracker, 100)
+    saved = snapshot(tracker, [100])
+    mine(tracker, 101, checkpoint=False)
+
+    # Block 101's stats were evicted, but nothing reached the file before a checkpoint
+    assert tracker.address_stats.evicted > 0
+    with sqlite3.connect(path) as db:
+        assert {row[0] for row in db.execute("SELECT address FROM address_stats")} == set(addresses([100]))
+    # ... and they are still read back
+    assert tracker.address_stats.get('1Sender101x0').sent_count == 1
+    tracker.close()
+
+    resumed = make_tracker(path)
+    try:
+        assert snapshot(resumed, [100]) == saved
+        assert resumed.address_stats.get('1Sender101x0') is None
+    finally:
+        resumed.close()
@@ -0,0 +1,108 @@
+import pytest
+
+from tx_attribution import attribute_transaction
+
+LABELS = {
+    'bnb1': {'name': 'binance', 'type': 'exchange'},
+    'bnb2': {'name': 'binance', 'type': 'exchange'},
+    'krk1': {'name': 'kraken', 'type': 'exchange'},
+    'cb1': {'name': 'coinbase', 'type': 'exchange'},
+}
+
+
+class Classifier:
+    def __init__(self):
+        self.calls = []
+
+    def classify_many(self, addresses):
+        self.calls.append(addresses)
+        return {address: LABELS[address] for address in addresses if address in LABELS}
+
+
+def tx(inputs, outputs):
+    return {'inputs': [{'prev_out': {'addr': address, 'value': round(btc * 10 ** 8)}} for address, btc in inputs],
+            'out': [{'addr': address, 'value': round(btc * 10 ** 8)} for address, btc in outputs]}
+
+
+def attribute(inputs, outputs):
+    return attribute_transaction(tx(inputs, outputs), Classifier().classify_many)
+
+
+def name(label):
+    return label['name'] if label else None
+
+
+def test_change_back_to_the_sender_is_not_the_receiver():
+    # The change output is larger than the payment
+    attribution = attribute([('bnb1', 100)], [('cb1', 30), ('bnb2', 69.99)])
+
+    assert name(attribution['from_entity']) == 'binance'
+    assert name(attribution['to_entity']) == 'coinbase'
+    assert attribution['outputs'] == {'coinbase': 30, 'binance': 69.99}
+
+
+def test_change_to_an_unknown_address_is_an_unknown_receiver():
+    attribution = attribute([('bnb1', 100)], [('cb1', 30), ('fresh', 69.99)])
+
+    assert name(attribution['from_entity']) == 'binance'
+    assert attribution['to_entity'] is None
+
+
+def test_sender_keeping_everything_is_the_receiver():
+    attribution = attribute([('bnb1', 50), ('bnb2', 50)], [('bnb1', 99.99)])
+
+    assert name(attribution['from_entity']) == name(attribution['to_entity']) == 'binance'
+    assert attribution['flows'] == [{'from': 'binance', 'to': 'binance', 'btc': 99.99}]
+
+
+def test_unknown_sender_picks_the_largest_output():
+    attribution = attribute([('a', 10)], [('b', 6), ('cb1', 3.99)])
+
+    assert attribution['from_entity'] is None
+    assert attribution['to_entity'] is None
+    attribution = attribute([('a', 10)], [('b', 3), ('cb1', 6.99)])
+    assert name(attribution['to_entity']) == 'coinbase'
+
+
+def test_multi_input_sums_per_entity_and_splits_flows_by_input_share():
+    attribution = attribute([('bnb1', 30), ('krk1', 40), ('bnb2', 30), ('bnb1', 0.5)],
+                            [('cb1', 80), ('a', 20)])
+
+    assert attribution['inputs'] == {'binance': 60.5, 'kraken': 40}
+    assert name(attribution['from_entity']) == 'binance'
+    assert name(attribution['to_entity']) == 'coinbase'
+    # 0.5 BTC of fee flows nowhere
+    assert attribution['flows'] == [
+        {'from': 'binance', 'to': 'coinbase', 'btc': pytest.approx(80 * 60.5 / 100.5)},
+        {'from': 'kraken', 'to': 'coinbase', 'btc': pytest.approx(80 * 40 / 100.5)},
+        {'from': 'binance', 'to': 'unknown', 'btc': pytest.approx(20 * 60.5 / 100.5)},
+        {'from': 'kraken', 'to': 'unknown', 'btc': pytest.approx(20 * 40 / 100.5)},
+    ]
+    assert sum(flow['btc'] for flow in attribution['flows']) == pytest.approx(100)
+
+
+def test_addresses_are_classified_in_one_call_and_addressless_outputs_skipped():
+    classifier = Classifier()
+    transaction = tx([('bnb1', 10), ('bnb1', 5)], [('cb1', 14)])
+    transaction['out'].append({'value': 0, 'script': '6a'})  # OP_RETURN
+
+    attribution = attribute_transaction(transaction, classifier.classify_many)
+
+    assert classifier.calls == [['bnb1', 'cb1']]
+    assert attribution['outputs'] == {'coinbase': 14}
+
+
+def test_transaction_without_inputs():
+    attribution = attribute([], [('cb1', 3.125)])
+
+    assert attribution['inputs'] == {}
+    assert attribution['flows'] == []
+    assert attribution['from_entity'] is None
+    assert name(attribution['to_entity']) == 'coinbase'
+
+
+def test_labels_are_copies():
+    attribution = attribute([('bnb1', 1)], [('cb1', 1)])
+    attribution['from_entity']['name'] = 'changed'
+
+    assert LABELS['bnb1']['name'] == 'binance'
@@ -0,0 +1,103 @@
+import pytest
+
+from erc20_logs import StubLogSource, transfer_log
+from usdt_monitor import USDTWhaleTracker
+
+USDT = '0xdac17f958d2ee523a2206206994597c13d831ec7'
+ALICE = '0x' + 'a1' * 20
+BOB = '0x' + 'b2' * 20
+
+
+def record(block, log_index, value=5000 * 10 ** 6):
+    return {'blockNumber': str(block), 'hash': f"0x{block:060x}{log_index:04x}", 'logIndex': str(log_index),
+            'from': ALICE, 'to': BOB, 'value': str(value), 'tokenDecimal': '6', 'timeStamp': '1700000000'}
+
+
+class FakeEtherscan:
+    """tokentx pages over a growing list of USDT records, like Etherscan's API"""
+
+    def __init__(self):
+        self.records = []
+        self.calls = 0
+
+    async def __call__(self, params):
+        self.calls += 1
+        if params['contractaddress'] != USDT:
+            return {'status': '0', 'message': 'No transactions found', 'result': []}
+        matches = sorted((r for r in self.records if int(params['startblock']) <= int(r['blockNumber'])
+                          <= int(params['endblock'])), key=lambda r: (int(r['blockNumber']), int(r['logIndex'])))
+        page, offset = params['page'], params['offset']
+        result = matches[(page - 1) * offset:page * offset]
+        if not result:
+            return {'status': '0', 'message': 'No transactions found', 'result': []}
+        return {'status': '1', 'message': 'OK', 'result': result}
+
+
+@pytest.fixture
+def etherscan():
+    return FakeEtherscan()
+
+
+@pytest.fixture
+def tracker(monkeypatch, tmp_path, etherscan):
+    monkeypatch.chdir(tmp_path)  # The monitor logs to a file in the working directory
+    tracker = USDTWhaleTracker(cursor_path=str(tmp_path / 'cursors.json'))
+    monkeypatch.setattr(tracker, 'etherscan', etherscan)
+    return tracker
+
+
+def keys(transfers):
+    return [(transfer['hash'], transfer['log_index']) for transfer in transfers]
+
+
+def test_cursor_rereads_its_block_without_repeating_transfers(tracker, etherscan):
+    etherscan.records = [record(150, 0), record(151, 0)]
+    first = tracker.get_transfers(151)
+    assert keys(first) == [(record(150, 0)['hash'], '0'), (record(151, 0)['hash'], '0')]
+
+    # A transfer of block 151 that was not indexed yet, and a new block
+    etherscan.records += [record(151, 1), record(152, 0)]
+    second = tracker.get_transfers(151)
+    assert keys(second) == [(record(151, 1)['hash'], '1')]
+    third = tracker.get_transfers(152)
+    assert keys(third) == [(record(152, 0)['hash'], '0')]
+    assert tracker.get_transfers(152) == []
+
+
+def test_page_window_restart_drops_the_overlap(tracker, etherscan):
+    tracker.page_size = 2
+    tracker.page_window = 4
+    etherscan.records = [record(100 + i // 3, i % 3) for i in range(9)]  # Three blocks of three
+
+    transfers = tracker.get_transfers(102)
+
+    assert len(transfers) == 9
+    assert len(set(keys(transfers))) == 9
+
+
+def test_cursors_survive_a_restart(tracker, etherscan, tmp_path, monkeypatch):
+    etherscan.records = [record(150, 0)]
+    assert len(tracker.get_transfers(150)) == 1
+    tracker.save_cursors()
+
+    restarted = USDTWhaleTracker(cursor_path=str(tmp_path / 'cursors.json'))
+    monkeypatch.setattr(restarted, 'etherscan', etherscan)
+    assert restarted.get_transfers(150) == []
+
+
+def test_only_transfers_over_the_threshold(tracker, etherscan):
+    etherscan.records = [record(150, 0, value=10 * 10 ** 6), record(150, 1)]
+
+    assert keys(tracker.get_transfers(150)) == [(record(150, 1)['hash'], '1')]
+    assert tracker.cursors['usdt_ethereum']['seen'] == sorted(f"{record(150, i)['hash']}:{i}" for i in range(2))
+
+
+def test_log_cursor_reads_each_block_once(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    source = StubLogSource([transfer_log(USDT, ALICE, BOB, 5000 * 10 ** 6, block, 0) for block in range(100, 110)])
+    tracker = USDTWhaleTracker(cursor_path=str(tmp_path / 'cursors.json'), log_source=source)
+    tracker.log_block_range = 3
+
+    assert [transfer['block'] for transfer in tracker.get_transfers(105)] == list(range(100, 106))
+    assert [transfer['block'] for transfer in tracker.get_transfers(109)] == [106, 107, 108, 109]
+    assert tracker.get_transfers(109) == []
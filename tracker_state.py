@@ -0,0 +1,89 @@
+import json
+import sqlite3
+
+
+class TrackerCheckpoint:
+    """Incremental checkpoints of BitcoinWhaleTracker state in a SQLite (WAL) file
+
+    Each save() is a single transaction with the address stats updated
+    since the previous save, the blocks that entered or left the chain
+    window, new or merged address-cluster nodes, and the last block
+    height. A crash therefore leaves the last complete checkpoint. The
+    address_stats table has the same layout as the AddressStatsStore
+    spill table; a store given this connection as its checkpoint_db reads
+    evicted addresses back from it and leaves the writes to save().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; fsync on checkpoint only
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS address_stats ("
+                "address TEXT PRIMARY KEY, received_count INTEGER, sent_count INTEGER, "
+                "total_received REAL, total_sent REAL, last_seen REAL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS chain_blocks ("
+                "hash TEXT PRIMARY KEY, height INTEGER, prev_hash TEXT, alerts TEXT)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS cluster_nodes ("
+                "id INTEGER PRIMARY KEY, address TEXT, parent INTEGER, rank INTEGER)"
+            )
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.saved_blocks = {row[0] for row in self.db.execute("SELECT hash FROM chain_blocks")}
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def load_address_stats(self, limit):
+        """The `limit` most recently seen address rows, oldest first"""
+        rows = self.db.execute(
+            "SELECT address, received_count, sent_count, total_received, total_sent, last_seen "
+            "FROM address_stats ORDER BY last_seen DESC LIMIT ?", (limit,)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def load_chain(self):
+        """(height, hash, prev_hash, alerts) for the saved chain window, oldest first"""
+        return [
+            (height, block_hash, prev_hash, json.loads(alerts))
+            for block_hash, height, prev_hash, alerts in self.db.execute(
+                "SELECT hash, height, prev_hash, alerts FROM chain_blocks ORDER BY height"
+            )
+        ]
+
+    def load_clusters(self):
+        """(id, address, parent, rank) rows of the address clusters, by id"""
+        return self.db.execute("SELECT id, address, parent, rank FROM cluster_nodes ORDER BY id")
+
+    def save(self, stats_rows, chain, last_block_height, cluster_rows=((), (), False)):
+        """Write one checkpoint: changed stats, chain window diff, height and cluster nodes"""
+        current = {block_hash for _, block_hash, _ in chain.blocks}
+        added = [
+            (block_hash, height, prev_hash, json.dumps(list(chain.alerts.get(block_hash, {}).values())))
+            for height, block_hash, prev_hash in chain.blocks if block_hash not in self.saved_blocks
+        ]
+        dropped = [(block_hash,) for block_hash in self.saved_blocks - current]
+
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO address_stats VALUES (?, ?, ?, ?, ?, ?)", stats_rows)
+            self.db.executemany("DELETE FROM chain_blocks WHERE hash = ?", dropped)
+            self.db.executemany("INSERT OR REPLACE INTO chain_blocks VALUES (?, ?, ?, ?)", added)
+            new_nodes, changed_nodes, reset = cluster_rows
+            if reset:  # The forest was compacted and renumbered
+                self.db.execute("DELETE FROM cluster_nodes")
+            self.db.executemany("INSERT OR REPLACE INTO cluster_nodes VALUES (?, ?, ?, ?)", new_nodes)
+            self.db.executemany("UPDATE cluster_nodes SET parent = ?, rank = ? WHERE id = ?", changed_nodes)
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('last_block_height', ?)", (json.dumps(last_block_height),)
+            )
+        self.saved_blocks = current
+
+    def close(self):
+        self.db.close()
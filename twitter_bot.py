@@ -2,6 +2,8 @@ import time
 import tweepy
 import logging
 import random
+import threading
+from alert_dispatch import TwitterSink
 from btc_monitor import BitcoinWhaleTracker
 from alert_pricebar import test_display as btc_price_bar
 from eth_pricebar import test_display as eth_price_bar
@@ -56,23 +58,22 @@ class AlertSharkBot:
         
         # Define variable delays for rate limiting
         self.tweet_delays = [30, 45, 25, 75]  # Seconds between tweets
+        
+        # Tweets go through a queue with its own worker, which spaces them
+        # 30s apart and retries rate limits (60s, 120s, 180s); whale alerts
+        # reach it straight from the monitor, filtered to tracked entities
+        self.twitter = TwitterSink(
+            self.client, min_interval=30, retries=3, retry_delay=60,
+            accept=lambda message, alert: alert is None or self.filter_important_transactions(message)
+        )
+        self.btc_monitor.dispatcher.add_sink(self.twitter)
 
     def post_tweet_with_retry(self, message, max_retries=3):
-        """Post tweet with retry mechanism"""
-        for attempt in range(max_retries):
-            try:
-                tweet = self.client.create_tweet(text=message)
-                self.logger.info(f"Tweet posted successfully")
-                return True
-            except Exception as e:
-                if "Rate limit" in str(e):
-                    wait_time = 60 * (attempt + 1)  # Progressive waiting: 60s, 120s, 180s
-                    self.logger.warning(f"Rate limit hit, waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    self.logger.error(f"Failed to tweet: {e}")
-                    return False
-        return False
+        """Queue a tweet; the Twitter sink posts it, retrying rate limits"""
+        queued = self.twitter.submit(message)
+        if not queued:
+            self.logger.warning("Tweet queue full, update dropped")
+        return queued
 
     def filter_important_transactions(self, message):
         """Enhanced filter to check for all important entities"""
@@ -81,28 +82,13 @@ class AlertSharkBot:
                 return True
         return False
 
-    def handle_btc_updates(self, updates):
-        """Post BTC updates immediately and return whether any were posted"""
-        if not updates:
-            return False
-            
-        transactions_posted = False
-        if isinstance(updates, list):
-            for update in updates:
-                if self.filter_important_transactions(update):
-                    if self.post_tweet_with_retry(update):
-                        transactions_posted = True
-                        self.logger.info("Posted BTC transaction immediately")
-                        time.sleep(30)  # Brief delay between multiple tweets
-            return transactions_posted
-        elif self.filter_important_transactions(updates):
-            return self.post_tweet_with_retry(updates)
-        return False
-
     def run(self):
         """Main bot loop with immediate transaction posting"""
         self.logger.info("Starting Alert Shark Bot...")
         
+        # BTC monitor runs continuously; its alerts are tweeted as they are found
+        threading.Thread(target=self.btc_monitor.monitor_transactions, name='btc-monitor', daemon=True).start()
+        
         while True:
             try:
                 # 1. BTC Price Bar update
@@ -112,15 +98,7 @@ class AlertSharkBot:
                     self.post_tweet_with_retry(btc_price_update)
                 time.sleep(120)  # Standard 2-minute wait after price update
 
-                # 2. BTC Monitor updates - Post immediately when found
-                self.logger.info("Checking for BTC transactions...")
-                btc_updates = self.btc_monitor.monitor_transactions()
-                if btc_updates:
-                    self.handle_btc_updates(btc_updates)
-                    # No additional wait if transactions found - move directly to next update
-                self.logger.info("Moving to ETH price update...")
-
-                # 3. ETH Price Bar update
+                # 2. ETH Price Bar update
                 self.logger.info("Getting ETH price bar update...")
                 eth_update = eth_price_bar()
                 if eth_update:
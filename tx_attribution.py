@@ -0,0 +1,74 @@
+UNKNOWN_ENTITY = 'unknown'
+
+
+def _values_by_address(entries, value_of):
+    values = {}
+    for entry in entries:
+        address, value = value_of(entry)
+        if address is not None:
+            values[address] = values.get(address, 0) + value
+    return values
+
+
+def _values_by_entity(values, labels):
+    totals = {}
+    entity_labels = {}
+    for address, value in values.items():
+        label = labels.get(address)
+        name = label['name'] if label else UNKNOWN_ENTITY
+        totals[name] = totals.get(name, 0) + value
+        if label:
+            entity_labels.setdefault(name, label)
+    return totals, entity_labels
+
+
+def attribute_transaction(tx, classify_many, satoshi_to_btc=100000000):
+    """Attribute every input and output of a transaction to entities
+
+    All addresses are labelled with one classify_many() call and values
+    are summed per entity on each side. Inputs do not map to particular
+    outputs, so each output entity's receipts are split across the input
+    entities in proportion to what they put in; the fee flows nowhere.
+    The sender is the largest input entity. The receiver is the largest
+    output entity other than the sender's own, whose outputs are change,
+    unless the sender is unknown or keeps everything.
+
+    Returns inputs/outputs as {entity: btc}, flows as a list of
+    {'from', 'to', 'btc'} sorted by value, and from_entity/to_entity
+    labels (None when unknown).
+    """
+    inputs = _values_by_address(
+        tx.get('inputs', ()),
+        lambda inp: (inp.get('prev_out', {}).get('addr'), inp.get('prev_out', {}).get('value', 0))
+    )
+    outputs = _values_by_address(tx.get('out', ()), lambda out: (out.get('addr'), out.get('value', 0)))
+    labels = classify_many(list(inputs) + list(outputs))
+
+    input_totals, input_labels = _values_by_entity(inputs, labels)
+    output_totals, output_labels = _values_by_entity(outputs, labels)
+
+    total_in = sum(input_totals.values())
+    flows = []
+    if total_in:
+        for source, source_value in input_totals.items():
+            for target, target_value in output_totals.items():
+                flows.append({
+                    'from': source,
+                    'to': target,
+                    'btc': round(target_value * source_value / total_in / satoshi_to_btc, 8)
+                })
+    flows.sort(key=lambda flow: -flow['btc'])
+
+    sender = max(input_totals, key=input_totals.get) if input_totals else UNKNOWN_ENTITY
+    receivers = output_totals
+    if sender != UNKNOWN_ENTITY and any(name != sender for name in output_totals):
+        receivers = {name: value for name, value in output_totals.items() if name != sender}
+    receiver = max(receivers, key=receivers.get) if receivers else UNKNOWN_ENTITY
+
+    return {
+        'inputs': {name: round(value / satoshi_to_btc, 8) for name, value in input_totals.items()},
+        'outputs': {name: round(value / satoshi_to_btc, 8) for name, value in output_totals.items()},
+        'flows': flows,
+        'from_entity': dict(input_labels[sender]) if sender in input_labels else None,
+        'to_entity': dict(output_labels[receiver]) if receiver in output_labels else None
+    }
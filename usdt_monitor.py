@@ -1,23 +1,55 @@
-import requests
+import argparse
+import asyncio
+import json
+import os
 import time
 import logging
 from datetime import datetime
 from collections import defaultdict
+from decimal import Decimal
+from erc20_logs import JSONRPCLogSource, TransferLogs
+from evm_addresses import EVMLabelIndex, normalize_evm_address
+from http_client import get_client
 from keys import YOUR_ETHERSCAN_API_KEY
+from metrics import ALERTS, API_ERRORS, LAST_BLOCK, POLL_SECONDS, RATE_LIMITED, TRANSACTIONS, start_metrics_server
+from rate_limiter import TokenBucket
+from stablecoin_backfill import backfill_transfers
+
+ETHERSCAN_HOST = 'api.etherscan.io'
 
 class USDTWhaleTracker:
-    def __init__(self, min_usdt=2000):
+    def __init__(self, min_usdt=2000, cursor_path='usdt_cursors.json', calls_per_second=5, rpc_url=None,
+                 log_source=None):
         self.base_url = "https://api.etherscan.io/api"
+        self.http = get_client()  # Shared keep-alive connection pool
+        # Every Etherscan call takes a token, so concurrent fetches stay
+        # within the API key's quota (5 calls/s on the free tier); no
+        # bursts, since the quota is enforced per second
+        self.rate_limiter = TokenBucket(calls_per_second, capacity=1, name='etherscan')
+        # With a JSON-RPC endpoint (or a stub), raw Transfer logs of all
+        # contracts are read with one eth_getLogs per block range instead
+        if log_source is None and rpc_url:
+            log_source = JSONRPCLogSource(rpc_url, http=self.http,
+                                          rate_limiter=TokenBucket(calls_per_second, capacity=1, name='rpc'))
+        self.log_source = log_source
+        self.log_block_range = 500  # Blocks per eth_getLogs request
         self.min_usdt = min_usdt
         self.last_block = None
         self.processed_blocks = set()
         self.api_key = YOUR_ETHERSCAN_API_KEY
+        self.page_size = 100  # Records per tokentx page
+        self.page_window = 10000  # Etherscan returns at most page * offset = 10000 records per query
+        self.cursor_path = cursor_path  # Where each contract's ingestion cursor is kept
         
         # Only ETH stablecoins
         self.stablecoin_contracts = {
             'usdt_ethereum': '0xdac17f958d2ee523a2206206994597c13d831ec7',  # Ethereum USDT
             'usdc_ethereum': '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',  # Ethereum USDC
         }
+        self.tokens = [
+            {'symbol': 'USDT' if 'usdt' in token_name else 'USDC', 'address': contract, 'decimals': 6}
+            for token_name, contract in self.stablecoin_contracts.items()
+        ]
 
         # Known addresses database with additional addresses
         self.known_addresses = {
@@ -134,7 +166,10 @@ class USDTWhaleTracker:
             }
         }
         
-        self.known_addresses.update({
+        # Labels are looked up by normalized 20-byte address
+        self.label_index = EVMLabelIndex(self.known_addresses)
+        
+        self.add_known_addresses({
             'cryptocom': {
                 'type': 'exchange',
                 'addresses': [
@@ -262,89 +297,225 @@ class USDTWhaleTracker:
             ]
         )
         self.logger = logging.getLogger('USDTMonitor')
+        for problem in self.label_index.problems:
+            self.logger.warning(f"Address labels: {problem}")
         self.retry_count = 3    
         self.retry_delay = 5
-        self.rate_limit_delay = 0.2
+        self.load_cursors()
+
+    async def etherscan(self, params):
+        """One Etherscan API call through the shared rate limiter; returns the decoded JSON
+
+        Rate-limit answers hold back every pending call and are retried.
+        """
+        params = dict(params, apikey=self.api_key)
+        for attempt in range(self.retry_count):
+            await self.rate_limiter.acquire()
+            data = await self.http.fetch_json(self.base_url, params=params, timeout=15)
+            if data.get('status') == '0' and 'rate limit' in str(data.get('result', '')).lower():
+                RATE_LIMITED.labels(ETHERSCAN_HOST).inc()
+                self.logger.warning("Rate limit hit, slowing down")
+                self.rate_limiter.penalize(1.0 * (attempt + 1))
+                continue
+            return data
+        raise RuntimeError("Etherscan rate limit persisted")
+
+    async def fetch_latest_block(self):
+        if self.log_source is not None:
+            return await self.log_source.block_number()
+        data = await self.etherscan({"module": "proxy", "action": "eth_blockNumber"})
+        return int(data['result'], 16)
 
     def get_latest_block(self):
         """Get latest Ethereum block with retry mechanism"""
         for attempt in range(self.retry_count):
             try:
-                response = requests.get(
-                    f"{self.base_url}/proxy",
-                    params={
-                        "module": "eth",
-                        "action": "eth_blockNumber",
-                        "apikey": self.api_key
-                    }
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('message') == 'NOTOK':
-                        if 'rate limit' in data.get('result', '').lower():
-                            self.logger.warning("Rate limit hit, increasing delay")
-                            time.sleep(self.rate_limit_delay * 2)
-                            continue
-                    current_block = int(data['result'], 16)
-                    return current_block
+                return self.http.run(self.fetch_latest_block())
             except Exception as e:
+                API_ERRORS.labels(ETHERSCAN_HOST).inc()
                 self.logger.error(f"Attempt {attempt + 1} failed: {e}")
                 if attempt < self.retry_count - 1:
                     time.sleep(self.retry_delay)
         return None
 
-    def get_transfers(self, block_number):
-        """Get Ethereum stablecoin transfers"""
+    def load_cursors(self):
+        """Load the per-contract ingestion cursors"""
+        try:
+            with open(self.cursor_path, 'r') as f:
+                self.cursors = json.load(f)
+        except FileNotFoundError:
+            self.cursors = {}
+        except Exception as e:
+            self.logger.error(f"Could not read {self.cursor_path}, starting fresh: {e}")
+            self.cursors = {}
+
+    def save_cursors(self):
+        """Save the per-contract ingestion cursors, replacing the file atomically"""
+        temp_path = f"{self.cursor_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.cursors, f, indent=4)
+        os.replace(temp_path, self.cursor_path)
+
+    async def fetch_token_transfers(self, contract, start_block, end_block):
+        """A contract's token transfers in a block range, oldest first, read page by page
+
+        Etherscan serves at most page_window records per query, so once a
+        query is exhausted the next one restarts at the last block seen;
+        the caller's cursor drops the records seen twice.
+        """
+        records = []
+        page = 1
+        while start_block <= end_block:
+            data = await self.etherscan({
+                "module": "account",
+                "action": "tokentx",
+                "contractaddress": contract,
+                "startblock": str(start_block),
+                "endblock": str(end_block),
+                "sort": "asc",
+                "page": page,
+                "offset": self.page_size
+            })
+            result = data.get('result')
+            if data.get('status') != '1':
+                if isinstance(result, list) or 'no transactions' in str(data.get('message', '')).lower():
+                    break  # Nothing (more) in the range
+                raise RuntimeError(f"Etherscan error: {result}")
+
+            records.extend(result)
+            if len(result) < self.page_size:
+                break
+            if page * self.page_size >= self.page_window:
+                last_block = int(result[-1]['blockNumber'])
+                if last_block == start_block:
+                    self.logger.warning(f"Block {start_block} has more than {self.page_window} transfers "
+                                        f"of {contract}; the rest are skipped")
+                    last_block += 1
+                start_block, page = last_block, 1
+            else:
+                page += 1
+        return records
+
+    async def fetch_contract_transfers(self, token_name, contract, block_number):
+        """New transfers of one contract up to block_number, advancing its cursor"""
+        print(f"Checking {token_name}...")
+        cursor = self.cursors.get(token_name) or {'block': max(0, block_number - 100), 'seen': []}
+        cursor_block = cursor['block']
+        seen = set(cursor['seen'])
+        new_count = 0
         transfers = []
-        
-        for token_name, contract in self.stablecoin_contracts.items():
-            print(f"Checking {token_name}...")
-            try:
-                response = requests.get(
-                    self.base_url,
-                    params={
-                        "module": "account",
-                        "action": "tokentx",
-                        "contractaddress": contract,
-                        "startblock": str(block_number - 100),
-                        "endblock": str(block_number),
-                        "apikey": self.api_key,
-                        "sort": "desc",
-                        "page": 1,
-                        "offset": 100
-                    },
-                    timeout=15
-                )
+        try:
+            for tx in await self.fetch_token_transfers(contract, cursor_block, block_number):
+                tx_block = int(tx['blockNumber'])
+                # logIndex tells transfers of one transaction apart; fall back to their contents
+                key = f"{tx['hash']}:{tx.get('logIndex') or tx['from'] + tx['to'] + tx['value']}"
+                if tx_block < cursor_block or (tx_block == cursor_block and key in seen):
+                    continue
+                if tx_block > cursor_block:
+                    cursor_block, seen = tx_block, set()
+                seen.add(key)
+                new_count += 1
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('status') == '1' and data.get('result'):
-                        for tx in data['result']:
-                            amount = float(tx['value']) / (10 ** 6)
-                            if amount >= self.min_usdt:
-                                token_type = 'USDT' if 'usdt' in token_name else 'USDC'
-                                transfers.append({
-                                    'token': token_type,
-                                    'chain': 'ethereum',
-                                    'hash': tx['hash'],
-                                    'from': tx['from'],
-                                    'to': tx['to'],
-                                    'amount': amount,
-                                    'timestamp': int(tx['timeStamp'])
-                                })
-                                print(f"Found ETH {token_type} transfer: ${amount:,.2f}")
-            except Exception as e:
-                print(f"Error getting Ethereum transfers: {str(e)}")
-                self.logger.error(f"Error getting Ethereum transfers: {str(e)}")
+                amount = Decimal(int(tx['value'])).scaleb(-int(tx.get('tokenDecimal') or 6))
+                if amount >= self.min_usdt:
+                    token_type = 'USDT' if 'usdt' in token_name else 'USDC'
+                    transfers.append({
+                        'token': token_type,
+                        'chain': 'ethereum',
+                        'hash': tx['hash'],
+                        'log_index': tx.get('logIndex'),
+                        'from': tx['from'],
+                        'to': tx['to'],
+                        'value': int(tx['value']),
+                        'amount': amount,
+                        'timestamp': int(tx['timeStamp'])
+                    })
+                    print(f"Found ETH {token_type} transfer: ${amount:,.2f}")
+            # Drained: nothing later than block_number can still be missing
+            if block_number > cursor_block:
+                cursor_block, seen = block_number, set()
+        except Exception as e:
+            API_ERRORS.labels(ETHERSCAN_HOST).inc()
+            print(f"Error getting Ethereum transfers: {str(e)}")
+            self.logger.error(f"Error getting Ethereum transfers: {str(e)}")
+        
+        # Keep whatever was read; a failed poll resumes from here
+        TRANSACTIONS.labels('usdt').inc(new_count)
+        self.cursors[token_name] = {'block': cursor_block, 'seen': sorted(seen)}
+        return transfers
+
+    async def fetch_log_transfers(self, block_number):
+        """New transfers of every contract up to block_number, from raw Transfer logs
 
+        One eth_getLogs covers all contracts for up to log_block_range
+        blocks. The 'logs' cursor is the last block fully read: a log query
+        returns a whole range or fails, so no per-transfer keys are needed.
+        Logs are decoded in bulk and min_usdt is applied to the whole batch
+        on exact integer amounts.
+        """
+        cursor = self.cursors.get('logs') or {'block': max(0, block_number - 100)}
+        addresses = [token['address'] for token in self.tokens]
+        transfers = []
+        start_block = cursor['block'] + 1
+        try:
+            while start_block <= block_number:
+                end_block = min(block_number, start_block + self.log_block_range - 1)
+                batch = TransferLogs(await self.log_source.get_logs(addresses, start_block, end_block), self.tokens)
+                TRANSACTIONS.labels('usdt').inc(len(batch))
+                for i in batch.over_threshold(self.min_usdt):
+                    transfer = dict(batch.transfer(i), chain='ethereum')
+                    transfers.append(transfer)
+                    print(f"Found ETH {transfer['token']} transfer: ${transfer['amount']:,.2f}")
+                self.cursors['logs'] = {'block': end_block}
+                start_block = end_block + 1
+        except Exception as e:
+            API_ERRORS.labels('rpc').inc()
+            print(f"Error getting Ethereum transfer logs: {str(e)}")
+            self.logger.error(f"Error getting Ethereum transfer logs: {str(e)}")
         return transfers
 
+    def get_transfers(self, block_number):
+        """Get Ethereum stablecoin transfers mined since the last poll
+
+        Each contract keeps a cursor: the last block it was read up to and
+        the (hash, logIndex) keys of the transfers already seen in that
+        block, which is read again next time in case it was incomplete.
+        Transfers are read in pages until the window is drained, and each
+        one is returned once. The cursors are saved by save_cursors().
+
+        All contracts are fetched concurrently; the shared rate limiter,
+        not the number of contracts, bounds the request rate. With a log
+        source, fetch_log_transfers reads them all at once instead.
+        """
+        if self.log_source is not None:
+            return self.http.run(self.fetch_log_transfers(block_number))
+
+        async def fetch_all():
+            return await asyncio.gather(*(
+                self.fetch_contract_transfers(token_name, contract, block_number)
+                for token_name, contract in self.stablecoin_contracts.items()
+            ))
+        
+        transfers = []
+        for contract_transfers in self.http.run(fetch_all()):
+            transfers.extend(contract_transfers)
+        return transfers
+
+    def add_known_addresses(self, entities):
+        """Add labelled addresses; an entity that is already known gains the new addresses"""
+        self.label_index.add(entities)
+        for entity, info in entities.items():
+            known = self.known_addresses.get(entity)
+            if known is None:
+                self.known_addresses[entity] = info
+            else:
+                self.known_addresses[entity] = {'type': known['type'],
+                                                'addresses': known['addresses'] + info['addresses']}
+
     def identify_address(self, address):
         """Identify address from known addresses"""
-        for entity, info in self.known_addresses.items():
-            if address.lower() in [addr.lower() for addr in info['addresses']]:
-                return {'name': entity, 'type': info['type']}
-        return None
+        label = self.label_index.get(address)
+        return dict(label) if label is not None else None
 
     def format_transfer_message(self, transfer):
         """Format transfer message with small font institutional names"""
@@ -400,16 +571,21 @@ class USDTWhaleTracker:
                     time.sleep(1)
                     continue
                 
-                current_block = self.get_latest_block()
+                with POLL_SECONDS.labels('usdt').time():
+                    current_block = self.get_latest_block()
+                    transfers = self.get_transfers(current_block) if current_block else []
                 if current_block:
-                    transfers = self.get_transfers(current_block)
+                    LAST_BLOCK.labels('usdt').set(current_block)
                     
                     if transfers:
                         print(f"\nFound {len(transfers)} transfers")
                         for transfer in transfers:
                             message = self.format_transfer_message(transfer)
+                            ALERTS.labels('usdt', transfer['token']).inc()
                             print(message)
                             print("-" * 80)
+                    # Only after alerting, so a crash re-reads rather than skips
+                    self.save_cursors()
                     
                 last_check_time = current_time
                 
@@ -419,9 +595,41 @@ class USDTWhaleTracker:
                 time.sleep(self.retry_delay)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ethereum USDT/USDC whale monitor')
+    parser.add_argument('--min-usdt', type=float, default=2000, help='Smallest transfer to report')
+    parser.add_argument('--rpc-url', type=str, default=os.environ.get('ETH_RPC_URL'),
+                        help='Ethereum JSON-RPC endpoint to read Transfer logs from instead of Etherscan')
+    parser.add_argument('--backfill', type=int, nargs=2, metavar=('START', 'END'),
+                        help='Save the transfer history of a block range instead of monitoring (needs --rpc-url); '
+                             'keeps mints, burns, issuer transfers and transfers from --min-usdt up')
+    parser.add_argument('--backfill-dir', type=str, default='stablecoin_backfill',
+                        help='Directory of the backfill partitions; a rerun resumes it')
+    parser.add_argument('--partition-size', type=int, default=10000, help='Blocks per backfill partition')
+    parser.add_argument('--concurrency', type=int, default=8, help='Backfill partitions fetched at once')
+    parser.add_argument('--calls-per-second', type=float, default=5, help='Request rate allowed by the API')
+    args = parser.parse_args()
+    if args.backfill:
+        if not args.rpc_url:
+            parser.error('--backfill needs --rpc-url (or ETH_RPC_URL)')
+        tracker = USDTWhaleTracker(min_usdt=args.min_usdt, rpc_url=args.rpc_url,
+                                   calls_per_second=args.calls_per_second)
+        issuers = [address for info in tracker.known_addresses.values() if info['type'] == 'stablecoin_issuer'
+                   for address in info['addresses'] if normalize_evm_address(address)]
+        try:
+            backfill_transfers(tracker.log_source, tracker.tokens, *args.backfill, output_dir=args.backfill_dir,
+                               partition_size=args.partition_size, concurrency=args.concurrency,
+                               min_amount=args.min_usdt, keep_addresses=issuers, http=tracker.http)
+        except ValueError as e:
+            print(f"Error: {e}")
+            raise SystemExit(1)
+        except KeyboardInterrupt:
+            print("\nBackfill interrupted; rerun to resume")
+        raise SystemExit(0)
     try:
-        tracker = USDTWhaleTracker(min_usdt=2000)
+        start_metrics_server(9102)
+        tracker = USDTWhaleTracker(min_usdt=args.min_usdt, rpc_url=args.rpc_url,
+                                   calls_per_second=args.calls_per_second)
         tracker.monitor_transfers()
     except KeyboardInterrupt:
         print("\n👋 Shutting down ETH monitor...")
-        exit(0)
+        raise SystemExit(0)